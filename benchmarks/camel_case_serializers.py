@@ -0,0 +1,96 @@
+"""Стоимость сериализации одной строки до и после CamelCaseSerializerMixin.
+
+«До» — прежняя схема: обычное представление DRF, затем переименование
+каждого ключа через `to_camel_case` (миксы) или перестановка ключей в
+`params` (табаки). «После» — ключи, вычисленные один раз на класс.
+Объекты не сохраняются в БД.
+
+Запуск: python benchmarks/camel_case_serializers.py [--rows 1000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework import serializers  # noqa: E402
+
+from manufacturers.models import Manufacturers  # noqa: E402
+from mixes.models import Mixes  # noqa: E402
+from tobaccos.models import Tobaccos  # noqa: E402
+from tobaccos.serializers import TobaccosListSerializer  # noqa: E402
+from utils.to_camel_case import CamelCaseSerializerMixin, to_camel_case  # noqa: E402
+
+MIX_FIELDS = ['id', 'name', 'description', 'created', 'likes_count', 'favorites_count']
+
+
+class LegacyMixRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Mixes
+        fields = MIX_FIELDS
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        camel_case_representation = {}
+        for key, value in representation.items():
+            camel_case_key = to_camel_case(key)
+            camel_case_representation[camel_case_key] = value
+        return camel_case_representation
+
+
+class MixRowSerializer(CamelCaseSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Mixes
+        fields = MIX_FIELDS
+
+
+class LegacyTobaccosListSerializer(TobaccosListSerializer):
+    def to_representation(self, instance):
+        representation = serializers.ModelSerializer.to_representation(self, instance)
+        representation['params'] = {
+            'strength': representation.pop('tobacco_strength'),
+            'resistance': representation.pop('tobacco_resistance'),
+            'smokiness': representation.pop('tobacco_smokiness')
+        }
+        return representation
+
+
+def per_row(serializer_class, rows, repeat):
+    total = timeit.timeit(lambda: serializer_class(rows, many=True).data, number=repeat)
+    return total / repeat / len(rows) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Строк в выборке")
+    parser.add_argument("--repeat", type=int, default=20, help="Число повторов")
+    args = parser.parse_args()
+
+    now = timezone.now()
+    manufacturer = Manufacturers(name="Darkside")
+    mixes = [Mixes(id=uuid.uuid4(), name=f"Микс {i}", description="Сладкий микс", created=now, likes_count=i)
+             for i in range(args.rows)]
+    tobaccos = [Tobaccos(id=uuid.uuid4(), taste=f"Вкус {i}", manufacturer=manufacturer) for i in range(args.rows)]
+
+    assert LegacyMixRowSerializer(mixes[0]).data == MixRowSerializer(mixes[0]).data
+    assert LegacyTobaccosListSerializer(tobaccos[0]).data == TobaccosListSerializer(tobaccos[0]).data
+
+    for name, legacy, current, rows in (
+            ("микс", LegacyMixRowSerializer, MixRowSerializer, mixes),
+            ("табак", LegacyTobaccosListSerializer, TobaccosListSerializer, tobaccos),
+    ):
+        before = per_row(legacy, rows, args.repeat)
+        after = per_row(current, rows, args.repeat)
+        print(f"{name:<6} до: {before:.2f} мкс/строка, после: {after:.2f} мкс/строка ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
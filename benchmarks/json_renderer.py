@@ -0,0 +1,52 @@
+"""Сравнение JSONRenderer/JSONParser DRF с вариантами на orjson.
+
+Запуск: python benchmarks/json_renderer.py [--mixes 100] [--repeat 200]
+"""
+import argparse
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from benchmarks.response_envelope import mix_page  # noqa: E402
+from main.parsers import ORJSONParser  # noqa: E402
+from main.renderers import ORJSONRenderer  # noqa: E402
+
+
+def measure(func, repeat):
+    return timeit.timeit(func, number=repeat) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mixes", type=int, default=100, help="Миксов на странице")
+    parser.add_argument("--repeat", type=int, default=200, help="Число повторов")
+    args = parser.parse_args()
+
+    data = mix_page(args.mixes)
+    body = JSONRenderer().render(data)
+    assert ORJSONRenderer().render(data) == body
+
+    rows = [
+        ("render JSONRenderer", measure(lambda: JSONRenderer().render(data), args.repeat)),
+        ("render ORJSONRenderer", measure(lambda: ORJSONRenderer().render(data), args.repeat)),
+        ("parse JSONParser", measure(lambda: JSONParser().parse(io.BytesIO(body)), args.repeat)),
+        ("parse ORJSONParser", measure(lambda: ORJSONParser().parse(io.BytesIO(body)), args.repeat)),
+    ]
+    print(f"Миксов на странице: {args.mixes}, размер ответа: {len(body)} байт")
+    for name, value in rows:
+        print(f"{name:<24}{value:.3f} мс")
+
+
+if __name__ == "__main__":
+    main()
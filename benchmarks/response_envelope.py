@@ -0,0 +1,93 @@
+"""Сравнение старой и новой схемы формирования общего конверта ответа.
+
+Старая схема: DRF кодирует данные `JSONRenderer`, затем `ResponseMiddleware`
+выбрасывает результат, собирает конверт и кодирует его ещё раз через
+`JsonResponse`, печатая данные в stdout. Новая: `EnvelopeJSONRenderer`
+кодирует конверт один раз.
+
+Запуск: python benchmarks/response_envelope.py [--mixes 100] [--repeat 200]
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import timeit
+import uuid
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import JsonResponse  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from main.middleware import build_envelope  # noqa: E402
+from main.renderers import EnvelopeJSONRenderer  # noqa: E402
+
+
+class FakeResponse:
+    status_code = 200
+
+
+def mix_page(size):
+    """Страница списка миксов в форме ответа `MixesSerializer`."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "count": 10000,
+        "next": size,
+        "previous": None,
+        "results": [
+            {
+                "id": str(uuid.uuid4()),
+                "author": {"id": str(uuid.uuid4()), "username": f"user{i}", "avatar": None},
+                "name": f"Микс {i}",
+                "description": "Сладкий тропический микс с холодком " * 4,
+                "banner": f"http://localhost:8000/media/banner_{i}.jpg",
+                "created": now.isoformat(),
+                "likesCount": i,
+                "isLiked": False,
+                "isFavorited": False,
+                "categories": [{"id": str(uuid.uuid4()), "name": "Фруктовые"}],
+                "tobaccos": [
+                    {"id": str(uuid.uuid4()), "taste": f"Вкус {j}", "manufacturer": "Darkside", "weight": 30}
+                    for j in range(3)
+                ],
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def old_path(data):
+    JSONRenderer().render(data)
+    with redirect_stdout(io.StringIO()):
+        print(data)
+    return JsonResponse(build_envelope(200, data)).content
+
+
+def new_path(data):
+    return EnvelopeJSONRenderer().render(data, renderer_context={"response": FakeResponse()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mixes", type=int, default=100, help="Миксов на странице")
+    parser.add_argument("--repeat", type=int, default=200, help="Число повторов")
+    args = parser.parse_args()
+
+    data = mix_page(args.mixes)
+    old = timeit.timeit(lambda: old_path(data), number=args.repeat) / args.repeat
+    new = timeit.timeit(lambda: new_path(data), number=args.repeat) / args.repeat
+    print(f"Миксов на странице: {args.mixes}, размер ответа: {len(new_path(data))} байт")
+    print(f"render + JsonResponse + print: {old * 1000:.3f} мс/запрос")
+    print(f"EnvelopeJSONRenderer:          {new * 1000:.3f} мс/запрос")
+    print(f"Экономия: {(old - new) * 1000:.3f} мс/запрос ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
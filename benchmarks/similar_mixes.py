@@ -0,0 +1,67 @@
+"""Время запроса похожих миксов по индексу в памяти на синтетическом каталоге.
+
+Миксы собираются случайно: 2–4 табака из каталога с весами, кратными 5,
+1–2 категории и тип вкуса. База данных не нужна.
+
+Запуск: python benchmarks/similar_mixes.py [--mixes 100000] [--tobaccos 3000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from mixes.models import MixTasteType  # noqa: E402
+from mixes.similarity import MixVectors, mix_vector  # noqa: E402
+
+
+def random_mix(rng, tobaccos, categories):
+    count = rng.randint(2, 4)
+    weights = [5 * rng.randint(1, 10) for _ in range(count)]
+    goods = list(zip(rng.sample(range(tobaccos), count), weights))
+    return mix_vector(goods, rng.sample(range(categories), rng.randint(1, 2)),
+                      rng.choice(MixTasteType.values))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mixes", type=int, default=100_000)
+    parser.add_argument("--tobaccos", type=int, default=3000)
+    parser.add_argument("--categories", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    started = time.perf_counter()
+    index = MixVectors()
+    for mix_id in range(args.mixes):
+        index.set(mix_id, random_mix(rng, args.tobaccos, args.categories))
+    print(f"сборка {args.mixes} миксов: {time.perf_counter() - started:.2f} с")
+
+    queries = [rng.randrange(args.mixes) for _ in range(args.queries)]
+    index.similar(queries[0], args.limit)  # первый запрос строит массивы признаков
+    timings = []
+    for mix_id in queries:
+        started = time.perf_counter()
+        index.similar(mix_id, args.limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"запрос: медиана {timings[len(timings) // 2]:.2f} мс, "
+          f"p95 {timings[int(len(timings) * 0.95)]:.2f} мс")
+
+    started = time.perf_counter()
+    for mix_id in queries:
+        index.set(mix_id, random_mix(rng, args.tobaccos, args.categories))
+    print(f"обновление: {(time.perf_counter() - started) * 1000 / len(queries):.3f} мс на микс")
+
+
+if __name__ == "__main__":
+    main()
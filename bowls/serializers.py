@@ -2,9 +2,12 @@
 from rest_framework import serializers
 
 from bowls.models import Bowls
+from utils.media import ImageVariantField, MediaURLSerializerMixin
 
 
-class BowlsSerializer(serializers.ModelSerializer):
+class BowlsSerializer(MediaURLSerializerMixin, serializers.ModelSerializer):
+    thumbnail = ImageVariantField('thumb', source='image')  # Миниатюра WebP
+
     class Meta:
         model = Bowls
-        fields = ['id', 'type', 'description', 'howTo', 'image']  # Поля, которые будут включены в сериализатор
+        fields = ['id', 'type', 'description', 'howTo', 'image', 'thumbnail']  # Поля, которые будут включены в сериализатор
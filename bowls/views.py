@@ -89,12 +89,7 @@ class BowlsListAPIView(APIView):
         page = paginator.paginate_queryset(queryset, request)
         if page is not None:
             serializer = BowlsSerializer(page, many=True)
-            return paginator.get_paginated_response({
-                "status": "ok",
-                "code": status.HTTP_200_OK,
-                "message": "Список чаш успешно получен",
-                "data": serializer.data
-            })
+            return paginator.get_paginated_response(serializer.data)
         serializer = BowlsSerializer(queryset, many=True)
         return Response({
             "status": "ok",
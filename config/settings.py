@@ -1,5 +1,5 @@
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import sentry_sdk
@@ -43,7 +43,9 @@ INSTALLED_APPS = [
     'mixes',
     'users',
     'tastecategories',
-    'selection'
+    'selection',
+    'search',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -135,12 +137,55 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+# Адрес CDN для медиафайлов (например, https://cdn.example.com); пусто — ссылки на хост запроса
+MEDIA_CDN_ORIGIN = os.getenv('MEDIA_CDN_ORIGIN', '')
+
+# Уменьшенные копии изображений: вариант -> максимальная сторона в пикселях.
+# thumb отдаётся в списках, large — в деталях
+IMAGE_DERIVATIVE_SIZES = {'thumb': 320, 'large': 1280}
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv('IMAGE_DERIVATIVE_QUALITY', 80))
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))
+# Сколько секунд помнить, что копии нет в хранилище (ссылки ведут на оригинал без проверки хранилища)
+IMAGE_DERIVATIVE_MISSING_TTL = 60
+# False — строить копии в потоке, сохранившем модель (без пула процессов)
+IMAGE_DERIVATIVES_ASYNC = os.getenv('IMAGE_DERIVATIVES_ASYNC', 'True') == 'True'
+# process — пул процессов внутри веб-процесса, jobs — задача очереди (воркер run_jobs)
+IMAGE_DERIVATIVES_BACKEND = os.getenv('IMAGE_DERIVATIVES_BACKEND', 'process')
+# Число компонент BlurHash по горизонтали и вертикали
+IMAGE_PLACEHOLDER_COMPONENTS = (4, 3)
+
+# Генерация баннеров миксов в Fusionbrain (mixes/banners.py)
+FUSIONBRAIN_API_URL = os.getenv('FUSSIONBRAIN_API_URL', '')
+FUSIONBRAIN_API_KEY = os.getenv('FUSSIONBRAIN_API_KEY', '')
+FUSIONBRAIN_SECRET_KEY = os.getenv('FUSSIONBRAIN_SECRET_KEY', '')
+# Таймауты соединения и чтения (секунды), повторы временных ошибок и размыкатель клиента
+FUSIONBRAIN_TIMEOUT = (3.05, 30)
+FUSIONBRAIN_RETRIES = 3
+FUSIONBRAIN_BREAKER_THRESHOLD = 5
+FUSIONBRAIN_BREAKER_RESET = 60
+# Ставить генерацию в очередь при создании микса без баннера
+BANNER_GENERATION_ENABLED = os.getenv('BANNER_GENERATION_ENABLED', 'True' if FUSIONBRAIN_API_URL else 'False') == 'True'
+# Сколько генераций одновременно может идти в Fusionbrain (квота API)
+BANNER_GENERATION_CONCURRENCY = int(os.getenv('BANNER_GENERATION_CONCURRENCY', 2))
+BANNER_WIDTH = 1024
+BANNER_HEIGHT = 576
+# Опрос статуса: задержка удваивается от начальной до максимальной (секунды)
+BANNER_POLL_INITIAL_DELAY = 5
+BANNER_POLL_MAX_DELAY = 60
+BANNER_POLL_MAX_ATTEMPTS = 20
+# Сколько секунд генерация числится за воркером, который её запускает (секунды)
+BANNER_START_LEASE = 120
+# True — очередь разбирает поток внутри процесса; иначе команда generate_banners
+BANNER_WORKER_IN_PROCESS = os.getenv('BANNER_WORKER_IN_PROCESS', 'False') == 'True'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Кодирование и разбор JSON через orjson; False — стандартный json из DRF
+FAST_JSON = os.getenv('FAST_JSON', 'True') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -151,16 +196,86 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # Количество записей на одной странице
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # Сразу отдаёт ответ в общем формате API
+        'main.renderers.EnvelopeORJSONRenderer' if FAST_JSON else 'main.renderers.EnvelopeJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'main.parsers.ORJSONParser' if FAST_JSON else 'rest_framework.parsers.JSONParser',
     ],
     'EXCEPTION_HANDLER': 'utils.exception_handler.custom_exception_handler',  # Путь к кастомному обработчику
 }
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Сколько секунд кэшируется COUNT(*) неотфильтрованных списков (0 — считать каждый раз)
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))
+
+# Максимальное число результатов полнотекстового поиска, которое ранжируется и пагинируется
+SEARCH_RESULTS_LIMIT = int(os.getenv('SEARCH_RESULTS_LIMIT', 500))
+
+# Минимальное триграммное сходство для нечёткого поиска табаков
+FUZZY_SEARCH_THRESHOLD = float(os.getenv('FUZZY_SEARCH_THRESHOLD', 0.3))
+
+# Число шардов для счётчиков лайков/избранного миксов (0 — без шардирования)
+MIX_COUNTER_SHARDS = int(os.getenv('MIX_COUNTER_SHARDS', 0))
+
+# Индекс автодополнения в памяти воркера: полная пересборка раз в N секунд (0 — никогда),
+# сколько ключей просматривать на запрос и строить ли индекс при старте воркера
+AUTOCOMPLETE_REBUILD_INTERVAL = int(os.getenv('AUTOCOMPLETE_REBUILD_INTERVAL', 300))
+AUTOCOMPLETE_SCAN_LIMIT = int(os.getenv('AUTOCOMPLETE_SCAN_LIMIT', 2000))
+AUTOCOMPLETE_WARM_ON_STARTUP = os.getenv('AUTOCOMPLETE_WARM_ON_STARTUP', 'True') == 'True'
+
+# Индекс похожих миксов в памяти воркера: полная пересборка раз в N секунд (0 — никогда),
+# веса блоков признаков (табаки с долями, категории, тип вкуса) и лимиты выдачи
+SIMILAR_MIXES_REBUILD_INTERVAL = int(os.getenv('SIMILAR_MIXES_REBUILD_INTERVAL', 900))
+SIMILAR_MIXES_WEIGHTS = {'tobacco': 1.0, 'category': 0.5, 'taste_type': 0.3}
+SIMILAR_MIXES_DEFAULT_LIMIT = 10
+SIMILAR_MIXES_MAX_LIMIT = 50
+SIMILAR_MIXES_WARM_ON_STARTUP = os.getenv('SIMILAR_MIXES_WARM_ON_STARTUP', 'True') == 'True'
+
+# Инвертированный индекс табак -> миксы для поиска по набору табаков: полная пересборка
+# раз в N секунд (0 — никогда) и построение при старте воркера
+CONTAINMENT_REBUILD_INTERVAL = int(os.getenv('CONTAINMENT_REBUILD_INTERVAL', 900))
+CONTAINMENT_WARM_ON_STARTUP = os.getenv('CONTAINMENT_WARM_ON_STARTUP', 'True') == 'True'
+
+# Подбор табаков к выбранным в конструкторе микса по совместной встречаемости (PMI) в составах.
+# Снимок матрицы на диске ускоряет старт воркера; снимок старше интервала пересборки не используется
+PAIRING_REBUILD_INTERVAL = int(os.getenv('PAIRING_REBUILD_INTERVAL', 3600))
+PAIRING_SNAPSHOT_PATH = os.getenv('PAIRING_SNAPSHOT_PATH', os.path.join(BASE_DIR, 'var', 'tobacco_pairs.npz'))
+PAIRING_MIN_SUPPORT = int(os.getenv('PAIRING_MIN_SUPPORT', 2))
+PAIRING_DEFAULT_LIMIT = 10
+PAIRING_MAX_LIMIT = 50
+PAIRING_WARM_ON_STARTUP = os.getenv('PAIRING_WARM_ON_STARTUP', 'True') == 'True'
+
+# Сколько табаков микса может не хватать на полке пользователя при подборе миксов «с полки»
+SHELF_MAX_MISSING = 3
+
+# Рекомендации «для вас» (item-item по лайкам и избранному): веса взаимодействий, число соседей
+# микса и длина списка пользователя, ограничения подсчёта совпадений и задержка пересчёта после лайка
+RECOMMENDATIONS_LIKE_WEIGHT = 1.0
+RECOMMENDATIONS_FAVORITE_WEIGHT = 2.0
+RECOMMENDATIONS_NEIGHBORS = 20
+RECOMMENDATIONS_PER_USER = 50
+RECOMMENDATIONS_MAX_USER_ITEMS = 500
+RECOMMENDATIONS_MAX_ITEM_USERS = 5000
+RECOMMENDATIONS_REFRESH_DELAY = 60
+
+# Лента трендов: период полураспада вклада лайка (в секундах), веса лайка и избранного и оценка,
+# ниже которой микс выпадает из ленты. Эпоха — точка отсчёта хранимых логарифмов оценок
+TRENDING_HALF_LIFE = int(os.getenv('TRENDING_HALF_LIFE', 24 * 60 * 60))
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_FAVORITE_WEIGHT = 2.0
+TRENDING_MIN_SCORE = 0.05
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Лента подписок: сколько последних миксов хранится и показывается пользователю и с какого числа
+# подписчиков миксы автора не рассылаются по лентам, а подмешиваются при чтении
+TIMELINE_MAX_ENTRIES = 500
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv('TIMELINE_FANOUT_MAX_FOLLOWERS', 10000))
+
+# Как часто (в секундах) воркер сверяет поколение снимка каталога для выборок
+CATALOG_SNAPSHOT_CHECK_INTERVAL = int(os.getenv('CATALOG_SNAPSHOT_CHECK_INTERVAL', 5))
+
 DJOSER = {
     'USER_CREATE_PASSWORD_RETYPE': False,
     'USERNAME_CHANGED_EMAIL_CONFIRMATION': False,
@@ -246,3 +361,26 @@ if os.getenv('SENTRY_LOG_ACTIVE', False):
             "continuous_profiling_auto_start": True,
         },
     )
+
+# Очередь фоновых задач на таблице app_jobs (приложение jobs, воркер manage.py run_jobs)
+JOBS_WORKER_CONCURRENCY = int(os.getenv('JOBS_WORKER_CONCURRENCY', 4))
+JOBS_POLL_INTERVAL = 1.0
+# Воркер продлевает захват выполняющихся задач каждые JOBS_HEARTBEAT_INTERVAL секунд;
+# задача без продления дольше JOBS_LEASE_SECONDS считается брошенной и возвращается в очередь
+JOBS_HEARTBEAT_INTERVAL = 60
+JOBS_LEASE_SECONDS = 15 * 60
+JOBS_RETRY_BASE_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_RETENTION_DAYS = 7
+# Периодические задачи: имя -> {'task': задача, 'interval': секунды, 'args': [...], 'kwargs': {...}}
+JOBS_PERIODIC = {
+    'reconcile-mix-counters': {'task': 'mixes.reconcile_counters', 'interval': 60 * 60},
+    'fold-mix-counter-shards': {'task': 'mixes.fold_counter_shards', 'interval': 60},
+    'banner-generation': {'task': 'mixes.process_banners', 'interval': 15},
+    'flush-expired-tokens': {'task': 'users.flush_expired_tokens', 'interval': 24 * 60 * 60},
+    'prune-finished-jobs': {'task': 'jobs.prune_finished', 'interval': 60 * 60},
+    'train-recommendations': {'task': 'mixes.train_recommendations', 'interval': 6 * 60 * 60},
+    'save-tobacco-pairs': {'task': 'mixes.save_tobacco_pairs', 'interval': 30 * 60},
+    'rollup-trending': {'task': 'mixes.rollup_trending', 'interval': 60 * 60},
+    'trim-timelines': {'task': 'mixes.trim_timelines', 'interval': 60 * 60},
+}
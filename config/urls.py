@@ -33,6 +33,7 @@ urlpatterns = [
     path('', include('users.urls')),  # Добавляем маршруты из users
     path('', include('tastecategories.urls')),  # Добавляем маршруты из tastecategories
     path('', include('selection.urls')),  # Добавляем маршруты из selection
+    path('', include('search.urls')),  # Добавляем маршруты из search
 
 ]
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
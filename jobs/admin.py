@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "priority", "run_at", "attempts", "max_attempts", "started", "finished"]
+    list_filter = ["status", "name"]
+    search_fields = ["name", "dedupe_key"]
+    readonly_fields = ["created", "started", "heartbeat", "finished", "locked_by", "last_error"]
@@ -0,0 +1,15 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from jobs.metrics import queue_stats
+
+
+class Command(BaseCommand):
+    help = "Выводит метрики очереди фоновых задач в JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=3600, help="Окно для задержек и длительностей, секунды")
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(queue_stats(window=options['window']), ensure_ascii=False, indent=2))
@@ -0,0 +1,29 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Запускает воркер очереди фоновых задач (таблица app_jobs)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_WORKER_CONCURRENCY,
+                            help="Сколько задач выполнять одновременно")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help="Пул потоков (ввод-вывод) или процессов (тяжёлые вычисления)")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Пауза между проверками пустой очереди, секунды")
+        parser.add_argument('--once', action='store_true', help="Выполнить готовые задачи и выйти")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], pool=options['pool'],
+                        poll_interval=options['poll_interval'])
+        if not options['once']:
+            # Мягкая остановка: новые задачи не забираются, начатые дорабатывают
+            signal.signal(signal.SIGTERM, worker.stop)
+            signal.signal(signal.SIGINT, worker.stop)
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f"Воркер {worker.worker_id} остановлен, выполнено задач: {worker.processed}."))
@@ -0,0 +1,46 @@
+"""Метрики очереди задач: глубина очереди, задержка до запуска и длительность выполнения."""
+from datetime import timedelta
+
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from jobs.models import Job, JobStatus
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _summary(values):
+    if not values:
+        return {'avg': None, 'p95': None, 'max': None}
+    return {'avg': round(sum(values) / len(values), 3), 'p95': round(_percentile(values, 0.95), 3),
+            'max': round(max(values), 3)}
+
+
+def queue_stats(now=None, window=3600):
+    """Состояние очереди и задержки задач, завершённых за последние `window` секунд.
+
+    `latency` — сколько задача ждала воркера после `run_at`, `duration` — сколько выполнялась."""
+    now = now or timezone.now()
+    by_status = dict(Job.objects.order_by().values_list('status').annotate(total=Count('id')))
+    due = Job.objects.filter(status=JobStatus.QUEUED, run_at__lte=now).aggregate(total=Count('id'),
+                                                                                  oldest=Min('run_at'))
+    recent = list(Job.objects.filter(finished__gte=now - timedelta(seconds=window), started__isnull=False)
+                  .values_list('run_at', 'started', 'finished', 'status'))
+    latency = [(started - run_at).total_seconds() for run_at, started, _, _ in recent if started >= run_at]
+    duration = [(finished - started).total_seconds() for _, started, finished, _ in recent]
+    return {
+        'queued': by_status.get(JobStatus.QUEUED, 0),
+        'due': due['total'],
+        'running': by_status.get(JobStatus.RUNNING, 0),
+        'failed': by_status.get(JobStatus.FAILED, 0),
+        'oldest_due_age': round((now - due['oldest']).total_seconds(), 3) if due['oldest'] else 0,
+        'finished_in_window': sum(1 for *_, status in recent if status == JobStatus.DONE),
+        'failed_in_window': sum(1 for *_, status in recent if status != JobStatus.DONE),
+        'latency': _summary(latency),
+        'duration': _summary(duration),
+    }
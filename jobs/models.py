@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+class JobStatus(models.TextChoices):
+    """Состояния фоновой задачи."""
+    QUEUED = 'queued', 'в очереди'
+    RUNNING = 'running', 'выполняется'
+    DONE = 'done', 'выполнена'
+    FAILED = 'failed', 'ошибка'
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди на таблице базы данных.
+
+    Воркер (`manage.py run_jobs`) забирает готовые к запуску строки через
+    `SELECT ... FOR UPDATE SKIP LOCKED`, поэтому несколько воркеров не
+    выполняют одну задачу дважды. `dedupe_key` не даёт поставить одну и ту
+    же задачу повторно (например, периодическую задачу в одном интервале)."""
+    name = models.CharField("Задача", max_length=200, db_index=True)
+    args = models.JSONField("Позиционные аргументы", default=list, blank=True)
+    kwargs = models.JSONField("Именованные аргументы", default=dict, blank=True)
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=10,
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED
+    )
+    priority = models.SmallIntegerField("Приоритет (меньше — раньше)", default=0)
+    run_at = models.DateTimeField("Запустить не раньше", default=timezone.now)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Максимум попыток", default=3)
+    dedupe_key = models.CharField("Ключ уникальности", max_length=200, unique=True, null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", default='', blank=True)
+    locked_by = models.CharField("Воркер", max_length=100, default='', blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField("Начало выполнения", null=True, blank=True)
+    # Воркер продлевает захват выполняющейся задачи; без продления она считается брошенной
+    heartbeat = models.DateTimeField("Последний сигнал воркера", null=True, blank=True)
+    finished = models.DateTimeField("Окончание выполнения", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        db_table = "app_jobs"
+        indexes = [
+            # Выборка воркера: готовые задачи по приоритету и времени
+            models.Index(fields=['status', 'priority', 'run_at'], name='app_jobs_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
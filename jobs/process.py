@@ -0,0 +1,15 @@
+"""Точки входа для пула процессов воркера.
+
+Модуль импортируется в дочернем процессе до `django.setup()`, поэтому
+на верхнем уровне не должен импортировать модели."""
+import django
+
+
+def setup():
+    django.setup()
+
+
+def execute(job_id, worker_id):
+    from jobs.worker import _execute
+
+    return _execute(job_id, worker_id)
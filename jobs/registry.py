@@ -0,0 +1,63 @@
+"""Реестр фоновых задач и постановка их в очередь.
+
+Задача — обычная функция из модуля `tasks.py` приложения, помеченная
+декоратором `@task`. Аргументы сохраняются в JSON, поэтому передавать
+нужно идентификаторы и строки, а не модели."""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts=3, priority=0):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь на немедленное выполнение."""
+        return enqueue(self.name, args, kwargs)
+
+
+def task(name=None, max_attempts=3, priority=0):
+    """Регистрирует функцию как фоновую задачу: `@task('mixes.reconcile_counters')`."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = Task(func, task_name, max_attempts=max_attempts, priority=priority)
+        return registry[task_name]
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, priority=None, max_attempts=None, dedupe_key=None):
+    """Создаёт строку задачи в текущей транзакции: задача станет видна воркеру вместе с остальными правками.
+
+    Возвращает `Job` или None, если задача с тем же `dedupe_key` уже есть."""
+    if name not in registry:
+        raise ValueError(f"Неизвестная фоновая задача: {name}")
+    registered = registry[name]
+    job = Job(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at or timezone.now(),
+        priority=registered.priority if priority is None else priority,
+        max_attempts=registered.max_attempts if max_attempts is None else max_attempts,
+        dedupe_key=dedupe_key,
+    )
+    if dedupe_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
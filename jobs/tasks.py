@@ -0,0 +1,14 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.models import Job, JobStatus
+from jobs.registry import task
+
+
+@task('jobs.prune_finished')
+def prune_finished():
+    """Удаляет выполненные и окончательно упавшие задачи старше `JOBS_RETENTION_DAYS`."""
+    threshold = timezone.now() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    Job.objects.filter(status__in=[JobStatus.DONE, JobStatus.FAILED], finished__lt=threshold).delete()
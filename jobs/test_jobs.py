@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from jobs.metrics import queue_stats
+from jobs.models import Job
+from jobs.registry import enqueue, task
+from jobs.worker import Worker, claim, enqueue_periodic, heartbeat, requeue_stale, run_job
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError("Бум")
+
+
+@pytest.fixture(autouse=True)
+def clean_calls(settings):
+    settings.JOBS_PERIODIC = {}
+    calls.clear()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_runs_queued_jobs():
+    """Воркер выполняет готовые задачи в пуле потоков и отмечает их выполненными."""
+    for value in range(5):
+        record.delay(value)
+    enqueue('tests.record', [99], run_at=timezone.now() + datetime.timedelta(hours=1))
+
+    worker = Worker(concurrency=2, poll_interval=0.01)
+    worker.run(once=True)
+
+    assert sorted(calls) == [0, 1, 2, 3, 4]
+    assert worker.processed == 5
+    assert Job.objects.filter(status="done").count() == 5
+    assert Job.objects.get(status="queued").args == [99]  # отложенная задача ждёт своего времени
+
+
+@pytest.mark.django_db
+def test_claim_order_and_retries():
+    """Задачи забираются по приоритету; упавшая повторяется с задержкой, затем помечается ошибкой."""
+    low = enqueue('tests.record', [1], priority=5)
+    failing = enqueue('tests.explode')
+    now = timezone.now()
+
+    assert claim("w1", 1, now) == [failing.pk]
+    assert run_job(failing.pk, "w1") is False
+    failing.refresh_from_db()
+    assert failing.status == "queued" and failing.attempts == 1 and failing.run_at > now
+    assert "Бум" in failing.last_error
+
+    later = failing.run_at + datetime.timedelta(seconds=1)
+    assert claim("w1", 10, later) == [failing.pk, low.pk]
+    run_job(failing.pk, "w1")
+    failing.refresh_from_db()
+    assert failing.status == "failed" and failing.attempts == 2
+    # Забранные задачи больше не отдаются другим воркерам
+    assert claim("w2", 10, later) == []
+
+
+@pytest.mark.django_db
+def test_periodic_jobs_once_per_interval(settings):
+    """Периодическая задача ставится один раз на интервал при любом числе проходов и воркеров."""
+    settings.JOBS_PERIODIC = {"record": {"task": "tests.record", "interval": 60, "args": [7]}}
+    now = timezone.now()
+    assert enqueue_periodic(now) == 1
+    assert enqueue_periodic(now) == 0  # другой воркер в том же интервале
+    assert enqueue_periodic(now + datetime.timedelta(seconds=60)) == 1
+    assert Job.objects.filter(name="tests.record").count() == 2
+
+
+@pytest.mark.django_db
+def test_stale_jobs_requeued_and_stats(settings):
+    """Брошенные задачи возвращаются в очередь; метрики показывают глубину очереди и задержки."""
+    job = enqueue('tests.record', [1])
+    now = timezone.now()
+    claim("dead-worker", 1, now)
+    assert requeue_stale(now) == 0
+    later = now + datetime.timedelta(seconds=settings.JOBS_LEASE_SECONDS + 1)
+    assert requeue_stale(later) == 1
+    job.refresh_from_db()
+    assert job.status == "queued"
+
+    assert claim("w1", 1, later) == [job.pk]
+    run_job(job.pk, "w1")
+    enqueue('tests.record', [2], run_at=now - datetime.timedelta(seconds=30))
+    stats = queue_stats()
+    assert stats["queued"] == 1 and stats["due"] == 1 and stats["oldest_due_age"] >= 30
+    assert stats["finished_in_window"] == 1 and stats["latency"]["max"] is not None
+
+
+@pytest.mark.django_db
+def test_heartbeat_extends_lease(settings):
+    """Продлённая задача не считается брошенной; результат задачи, вернувшейся в очередь, не записывается."""
+    job = enqueue('tests.record', [1])
+    now = timezone.now()
+    claim("w1", 1, now)
+    lease = datetime.timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    assert heartbeat("w1", [job.pk], now + lease) == 1
+    assert heartbeat("w2", [job.pk], now + lease) == 0  # чужие задачи не продлеваются
+    assert requeue_stale(now + lease + datetime.timedelta(seconds=1)) == 0
+
+    assert requeue_stale(now + 2 * lease + datetime.timedelta(seconds=1)) == 1
+    assert run_job(job.pk, "w1") is True
+    job.refresh_from_db()
+    assert job.status == "queued" and calls == [1]
@@ -0,0 +1,213 @@
+"""Воркер очереди задач: забор строк, выполнение, повторы и периодические задачи.
+
+Задачи забираются пачкой в короткой транзакции через
+`SELECT ... FOR UPDATE SKIP LOCKED` (где база это поддерживает) и сразу
+помечаются `running`, поэтому сами задачи выполняются вне транзакции
+очереди. Упавшая задача возвращается в очередь с экспоненциальной
+задержкой, пока не исчерпает `max_attempts`. Воркер продлевает захват
+своих задач каждые `JOBS_HEARTBEAT_INTERVAL` секунд; задачи, чей воркер
+пропал и не продлевал захват дольше `JOBS_LEASE_SECONDS`, возвращаются в
+очередь. Результат записывается, только если задача всё ещё числится за
+этим воркером."""
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from jobs import process
+from jobs.metrics import queue_stats
+from jobs.models import Job, JobStatus
+from jobs.registry import enqueue, registry
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Задержка перед повтором: удвоение от `JOBS_RETRY_BASE_DELAY` до `JOBS_RETRY_MAX_DELAY`, разброс 50–100 %."""
+    delay = min(settings.JOBS_RETRY_MAX_DELAY, settings.JOBS_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0))
+    return delay * (0.5 + random.random() / 2)
+
+
+def claim(worker_id, limit, now=None):
+    """Забирает до `limit` готовых задач и возвращает их идентификаторы."""
+    if limit <= 0:
+        return []
+    now = now or timezone.now()
+    ready = (Job.objects.filter(status=JobStatus.QUEUED, run_at__lte=now)
+             .order_by('priority', 'run_at', 'id').values_list('id', flat=True))
+    mark = {'status': JobStatus.RUNNING, 'locked_by': worker_id, 'started': now, 'heartbeat': now,
+            'finished': None, 'attempts': F('attempts') + 1}
+    if not connection.features.has_select_for_update:
+        # SQLite: без блокировок строк; UPDATE с условием на статус работает как сравнение с обменом
+        ids = list(ready[:limit])
+        Job.objects.filter(id__in=ids, status=JobStatus.QUEUED).update(**mark)
+        return list(Job.objects.filter(id__in=ids, status=JobStatus.RUNNING, locked_by=worker_id, started=now)
+                    .order_by('priority', 'run_at', 'id').values_list('id', flat=True))
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        ids = list(ready.select_for_update(skip_locked=skip_locked)[:limit])
+        if ids:
+            Job.objects.filter(id__in=ids).update(**mark)
+    return ids
+
+
+def run_job(job_id, worker_id):
+    """Выполняет задачу, забранную воркером `worker_id`, и записывает результат.
+
+    Если задачу уже вернули в очередь как брошенную, результат не записывается."""
+    job = Job.objects.get(pk=job_id)
+    owned = Job.objects.filter(pk=job_id, status=JobStatus.RUNNING, locked_by=worker_id)
+    registered = registry.get(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f"Неизвестная фоновая задача: {job.name}")
+        registered.func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if registered is not None and job.attempts < job.max_attempts:
+            logger.warning("Задача %s упала, попытка %s из %s", job, job.attempts, job.max_attempts)
+            updated = owned.update(status=JobStatus.QUEUED, last_error=error, finished=now,
+                                   run_at=now + timedelta(seconds=retry_delay(job.attempts)))
+        else:
+            logger.error("Задача %s не выполнена: %s", job, error)
+            updated = owned.update(status=JobStatus.FAILED, last_error=error, finished=now)
+        if not updated:
+            logger.warning("Задача %s больше не числится за воркером %s, результат не записан", job, worker_id)
+        return False
+    if not owned.update(status=JobStatus.DONE, last_error='', finished=timezone.now()):
+        logger.warning("Задача %s больше не числится за воркером %s, результат не записан", job, worker_id)
+    return True
+
+
+def heartbeat(worker_id, job_ids, now=None):
+    """Продлевает захват выполняющихся задач воркера. Возвращает число продлённых задач."""
+    if not job_ids:
+        return 0
+    return Job.objects.filter(pk__in=job_ids, status=JobStatus.RUNNING, locked_by=worker_id).update(
+        heartbeat=now or timezone.now())
+
+
+def requeue_stale(now=None):
+    """Возвращает в очередь выполняющиеся задачи, чей воркер слишком долго не продлевал захват."""
+    now = now or timezone.now()
+    expired = now - timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    stale = Job.objects.filter(Q(heartbeat__lt=expired) | Q(heartbeat__isnull=True, started__lt=expired),
+                               status=JobStatus.RUNNING)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=JobStatus.FAILED, finished=now, last_error="Воркер не завершил задачу")
+    requeued = stale.update(status=JobStatus.QUEUED, run_at=now, last_error="Воркер не завершил задачу")
+    return requeued + failed
+
+
+def periodic_slot(interval, now):
+    """Номер интервала и момент его начала: периодическая задача ставится один раз на интервал."""
+    slot = int(now.timestamp() // interval)
+    return slot, datetime.fromtimestamp(slot * interval, tz=dt_timezone.utc)
+
+
+def enqueue_periodic(now=None, last_slots=None):
+    """Ставит периодические задачи из `JOBS_PERIODIC` за текущий интервал.
+
+    Уникальный ключ `periodic:<имя>:<интервал>` гарантирует одну задачу на
+    интервал при любом числе воркеров; `last_slots` — память воркера, чтобы не
+    пытаться вставить строку на каждом проходе."""
+    now = now or timezone.now()
+    last_slots = {} if last_slots is None else last_slots
+    created = 0
+    for name, spec in settings.JOBS_PERIODIC.items():
+        slot, slot_start = periodic_slot(spec['interval'], now)
+        if last_slots.get(name) == slot:
+            continue
+        if enqueue(spec['task'], spec.get('args', ()), spec.get('kwargs'), run_at=slot_start,
+                   dedupe_key=f'periodic:{name}:{slot}') is not None:
+            created += 1
+        last_slots[name] = slot
+    return created
+
+
+def _execute(job_id, worker_id):
+    # Соединения потоков пула живут как в цикле запроса: закрываются, если устарели
+    close_old_connections()
+    try:
+        return run_job(job_id, worker_id)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """Цикл воркера: периодические задачи, забор задач и выполнение в пуле потоков или процессов."""
+
+    def __init__(self, concurrency=None, pool='thread', poll_interval=None, worker_id=None):
+        self.concurrency = concurrency or settings.JOBS_WORKER_CONCURRENCY
+        self.pool = pool
+        self.poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self._last_slots = {}
+        self._last_heartbeat = None
+
+    def _executor(self):
+        if self.pool == 'process':
+            # spawn: дочерние процессы не наследуют открытые соединения с базой
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=process.setup,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='jobs')
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def _heartbeat(self, in_flight, now):
+        if (now - self._last_heartbeat).total_seconds() >= settings.JOBS_HEARTBEAT_INTERVAL:
+            heartbeat(self.worker_id, list(in_flight.values()), now)
+            self._last_heartbeat = now
+
+    def run(self, once=False, stats_interval=60):
+        """Работает до `stop()`; при `once=True` — пока есть готовые к запуску задачи."""
+        in_flight = {}  # future -> id задачи
+        last_stats = timezone.now()
+        self._last_heartbeat = last_stats
+        with self._executor() as executor:
+            while not self.stop_event.is_set():
+                now = timezone.now()
+                enqueue_periodic(now, self._last_slots)
+                self._heartbeat(in_flight, now)
+                requeue_stale(now)
+                ids = claim(self.worker_id, self.concurrency - len(in_flight), now)
+                target = process.execute if self.pool == 'process' else _execute
+                for job_id in ids:
+                    in_flight[executor.submit(target, job_id, self.worker_id)] = job_id
+
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=0 if ids else self.poll_interval,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del in_flight[future]
+                    self.processed += len(done)
+                elif once:
+                    break
+                else:
+                    self.stop_event.wait(self.poll_interval)
+
+                if stats_interval and (now - last_stats).total_seconds() >= stats_interval:
+                    logger.info("Очередь задач: %s", queue_stats(now))
+                    last_stats = now
+            # Остановка: дожидаемся уже забранных задач, продолжая продлевать их захват
+            while in_flight:
+                done, _ = wait(in_flight, timeout=settings.JOBS_HEARTBEAT_INTERVAL)
+                for future in done:
+                    del in_flight[future]
+                self.processed += len(done)
+                self._heartbeat(in_flight, timezone.now())
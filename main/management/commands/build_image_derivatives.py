@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.signals import IMAGE_FIELDS
+from utils.image_derivatives import derivative_name, derivative_ready, is_derivative, save_derivatives
+from utils.image_processing import render_derivatives
+
+
+class Command(BaseCommand):
+    help = "Строит уменьшенные копии (миниатюры и WebP) для уже загруженных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Перестроить и уже существующие копии")
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_DERIVATIVE_WORKERS,
+                            help="Количество процессов для обработки изображений")
+        parser.add_argument('--batch-size', type=int, default=64,
+                            help="Сколько файлов одновременно держать в памяти")
+
+    def handle(self, *args, **options):
+        first_variant = next(iter(settings.IMAGE_DERIVATIVE_SIZES))
+        built = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for model, field_name in IMAGE_FIELDS:
+                storage = model._meta.get_field(field_name).storage
+                names = (model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                         .values_list(field_name, flat=True).distinct())
+                # Файлы читаются пачками по `--batch-size`: в памяти не больше одной пачки исходников и результатов
+                pending = (name for name in names.iterator() if not is_derivative(name) and (
+                    options['force'] or not derivative_ready(storage, derivative_name(name, first_variant))))
+
+                while batch := list(islice(pending, options['batch_size'])):
+                    futures = {}
+                    for name in batch:
+                        try:
+                            with storage.open(name, 'rb') as source:
+                                data = source.read()
+                        except OSError as exc:
+                            failed += 1
+                            self.stderr.write(f"{name}: {exc}")
+                            continue
+                        future = executor.submit(render_derivatives, data, settings.IMAGE_DERIVATIVE_SIZES,
+                                                 settings.IMAGE_DERIVATIVE_QUALITY)
+                        futures[future] = name
+
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        try:
+                            save_derivatives(storage, name, future.result())
+                            built += 1
+                        except Exception as exc:
+                            failed += 1
+                            self.stderr.write(f"{name}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Построены копии для {built} изображений, ошибок: {failed}."))
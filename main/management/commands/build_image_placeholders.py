@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.signals import PLACEHOLDER_FIELDS
+from utils.image_derivatives import save_placeholder
+from utils.image_processing import compute_placeholder
+
+
+class Command(BaseCommand):
+    help = "Заполняет BlurHash и преобладающий цвет для уже загруженных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Пересчитать и уже заполненные заглушки")
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_DERIVATIVE_WORKERS,
+                            help="Количество процессов для обработки изображений")
+        parser.add_argument('--batch-size', type=int, default=64,
+                            help="Сколько файлов одновременно держать в памяти")
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for (model, field_name), (blurhash_field, color_field) in PLACEHOLDER_FIELDS.items():
+                storage = model._meta.get_field(field_name).storage
+                queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                if not options['force']:
+                    queryset = queryset.filter(**{f'{blurhash_field}__isnull': True})
+                # Одинаковые файлы считаются один раз, заглушка записывается во все их строки.
+                # Имена читаются заранее, потому что строки обновляются по ходу обхода
+                names = iter(list(queryset.values_list(field_name, flat=True).distinct()))
+                target = (model, None, field_name, (blurhash_field, color_field))
+
+                while batch := list(islice(names, options['batch_size'])):
+                    futures = {}
+                    for name in batch:
+                        try:
+                            with storage.open(name, 'rb') as source:
+                                data = source.read()
+                        except OSError as exc:
+                            failed += 1
+                            self.stderr.write(f"{name}: {exc}")
+                            continue
+                        future = executor.submit(compute_placeholder, data, settings.IMAGE_PLACEHOLDER_COMPONENTS)
+                        futures[future] = name
+
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        try:
+                            save_placeholder(target, name, future.result())
+                            built += 1
+                        except Exception as exc:
+                            failed += 1
+                            self.stderr.write(f"{name}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Заполнены заглушки для {built} изображений, ошибок: {failed}."))
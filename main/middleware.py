@@ -1,7 +1,10 @@
+import logging
+
 from django.conf import settings
-from rest_framework.response import Response
 from django.http import JsonResponse
 
+logger = logging.getLogger(__name__)
+
 HTTP_STATUS_DESCRIPTIONS = {
     # Информационные ответы
     100: {"status": "good", "description": "Продолжай"},
@@ -48,75 +51,91 @@ HTTP_STATUS_DESCRIPTIONS = {
 }
 
 
+# Пути, ответы которых отдаются без общей обёртки
+EXCLUDED_PATH_PREFIXES = ("/admin", "/swagger", "/api/v1/auth/")
+
+# Ключи конверта, который некоторые представления собирают сами
+VIEW_ENVELOPE_KEYS = {"status", "code", "message", "data"}
+
+
+def is_excluded_path(path):
+    return path.startswith(EXCLUDED_PATH_PREFIXES) or path.startswith(settings.MEDIA_URL)
+
+
+def _view_envelope(payload):
+    """Возвращает конверт, собранный представлением, или None."""
+    if isinstance(payload, dict) and "data" in payload and payload.keys() <= VIEW_ENVELOPE_KEYS:
+        return payload
+    return None
+
+
+def build_envelope(status_code, payload):
+    """Общий формат ответа API.
+
+    Для успешных ответов в `data` попадают данные представления; если
+    представление само завернуло их в `{"status", "code", "message", "data"}`,
+    берётся только внутренний `data`, чтобы конверт не вкладывался в конверт.
+    Для ошибок данные уходят в `errors`."""
+    status_info = HTTP_STATUS_DESCRIPTIONS.get(
+        status_code,
+        {"status": "bad", "description": "Неизвестный статус"}
+    )
+
+    data = None
+    errors = None
+    if isinstance(payload, dict):
+        inner = _view_envelope(payload)
+        if 200 <= status_code < 300:
+            if inner is not None:
+                data = inner["data"]
+            elif isinstance(payload.get("data"), dict):
+                data = payload["data"]
+            else:
+                data = payload
+        elif inner is not None:
+            errors = inner["data"] if inner["data"] is not None else {"detail": inner.get("message")}
+        else:
+            errors = payload
+
+    return {
+        "status": status_info["status"],
+        "code": status_code,
+        "message": status_info["description"],
+        "data": data,
+        "errors": errors,
+    }
+
+
 class ResponseMiddleware:
     """
-    Middleware для унификации всех ответов API.
+    Middleware для унификации ответов API, отрендеренных не DRF.
+
+    Ответы DRF оборачивает `main.renderers.EnvelopeJSONRenderer` прямо при
+    кодировании и помечает флагом `enveloped`; такие ответы пропускаются как есть.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # print(f"[Middleware] Обрабатываем запрос: {request.method} {request.path}")
-
-        if (
-                request.path.startswith("/admin")
-                or request.path.startswith("/swagger")
-                or request.path.startswith(settings.MEDIA_URL)
-                or request.path.startswith("/api/v1/auth/")
-        ):
+        if is_excluded_path(request.path):
             return self.get_response(request)
 
         response = self.get_response(request)
 
+        # Ответ уже закодирован в общем формате
+        if getattr(response, 'enveloped', False):
+            return response
+
         # Рендерим содержимое, если требуется
         if hasattr(response, 'render') and callable(response.render):
             try:
                 response = response.render()
-            except Exception as e:
-                print(f"[Middleware] Ошибка рендеринга: {e}")
-                return JsonResponse({
-                    "status": "bad",
-                    "code": 500,
-                    "message": "Ошибка рендеринга ответа",
-                    "data": None
-                }, status=500)
-
-        # Получаем информацию о статусе из словаря
-        status_info = HTTP_STATUS_DESCRIPTIONS.get(
-            response.status_code,
-            {"status": "bad", "description": "Неизвестный статус"}
-        )
-
-        # Проверка наличия данных
-        if hasattr(response, 'data') and isinstance(response.data, dict):
-            if 200 <= response.status_code < 300:
-                # Успешный ответ
-                # data = response.data
-                if "data" in response.data and isinstance(response.data["data"], dict):
-                    data = response.data["data"]
-                    print(data)
-                else:
-                    data = response.data
-                    print(data)
-                errors = None
-            else:
-                # Ошибочный ответ
-                data = None
-                errors = response.data
-        else:
-            # Если данных нет
-            data = None
-            errors = None
-
-        # Формируем единый формат ответа
-        response_data = {
-            "status": status_info["status"],
-            "code": response.status_code,
-            "message": status_info["description"],
-            "data": data,
-            "errors": errors,
-        }
-
-        # Всегда возвращаем JsonResponse
-        return JsonResponse(response_data, status=response.status_code)
+            except Exception:
+                logger.exception("Ошибка рендеринга ответа %s %s", request.method, request.path)
+                return JsonResponse(build_envelope(500, None) | {"message": "Ошибка рендеринга ответа"}, status=500)
+            if getattr(response, 'enveloped', False):
+                return response
+
+        payload = response.data if hasattr(response, 'data') else None
+        return JsonResponse(build_envelope(response.status_code, payload), status=response.status_code)
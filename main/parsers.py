@@ -0,0 +1,31 @@
+import codecs
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson указан в requirements.txt
+    orjson = None
+
+
+class ORJSONParser(JSONParser):
+    """Разбор JSON-тела запроса через orjson; ошибки — как у `JSONParser` DRF."""
+
+    def __init__(self):
+        if orjson is None:
+            raise ImproperlyConfigured("Для ORJSONParser нужен пакет orjson")
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            raw = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                raw = raw.decode(encoding).encode('utf-8')
+            return orjson.loads(raw)
+        except (ValueError, LookupError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
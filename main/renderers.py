@@ -0,0 +1,67 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from main.middleware import build_envelope, is_excluded_path
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson указан в requirements.txt
+    orjson = None
+
+
+class EnvelopeRendererMixin:
+    """Сразу оборачивает данные в общий формат ответа API.
+
+    Конверт строится и кодируется один раз; ответ помечается флагом
+    `enveloped`, и `ResponseMiddleware` больше его не трогает. Без контекста
+    ответа (или для путей, исключённых из обёртки) данные кодируются как есть."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        request = renderer_context.get('request')
+        if response is None or (request is not None and is_excluded_path(request.path)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        response.enveloped = True
+        return super().render(build_envelope(response.status_code, data), accepted_media_type, renderer_context)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же выводом, что и `JSONRenderer` DRF.
+
+    UUID, даты и время orjson кодирует сам; остальные типы (Decimal, ленивые
+    строки, QuerySet и т.п.) уходят в `default` кодировщика DRF. Отступы,
+    `ensure_ascii` и некомпактный вывод orjson не поддерживает — в этих
+    случаях используется стандартный рендерер."""
+
+    options = 0
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self):
+        if orjson is None:
+            raise ImproperlyConfigured("Для ORJSONRenderer нужен пакет orjson")
+        self._default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (self.encoder_class is not encoders.JSONEncoder or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._default, option=self.options)
+        # Как и JSONRenderer, экранируем разделители строк, недопустимые в JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class EnvelopeJSONRenderer(EnvelopeRendererMixin, JSONRenderer):
+    """Общий формат ответа API на стандартном json."""
+
+
+class EnvelopeORJSONRenderer(EnvelopeRendererMixin, ORJSONRenderer):
+    """Общий формат ответа API на orjson."""
@@ -0,0 +1,68 @@
+from django.db.models.signals import post_init, post_save
+
+from bowls.models import Bowls
+from manufacturers.models import Manufacturers
+from mixes.models import Mixes
+from tobaccos.models import Tobaccos
+from users.models import CustomUser
+from utils.image_derivatives import schedule_derivatives
+
+# Поля изображений, для которых строятся уменьшенные копии
+IMAGE_FIELDS = (
+    (Tobaccos, 'image'),
+    (Manufacturers, 'image'),
+    (Bowls, 'image'),
+    (Mixes, 'banner'),
+    (CustomUser, 'avatar'),
+)
+
+# Поля для BlurHash и преобладающего цвета изображений, которые показываются в списках
+PLACEHOLDER_FIELDS = {
+    (Tobaccos, 'image'): ('image_blurhash', 'image_color'),
+    (Mixes, 'banner'): ('banner_blurhash', 'banner_color'),
+}
+
+
+def _file_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+def _image_names(sender, instance):
+    # Только загруженные колонки: обращение к отложенному полю стоило бы запроса
+    return {field_name: _file_name(instance.__dict__[field_name])
+            for model, field_name in IMAGE_FIELDS if model is sender and field_name in instance.__dict__}
+
+
+def image_loaded(sender, instance, **kwargs):
+    """Запоминает имена файлов, с которыми строка загружена или создана."""
+    instance._saved_image_names = _image_names(sender, instance)
+
+
+def image_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Копии и заглушки строятся, только если файл изображения поменялся.
+
+    Сохранения, не трогающие изображение (например, `last_login` пользователя),
+    не обращаются к хранилищу."""
+    saved = getattr(instance, '_saved_image_names', {})
+    current = _image_names(sender, instance)
+    instance._saved_image_names = current
+    for model, field_name in IMAGE_FIELDS:
+        if model is not sender or field_name not in current:
+            continue
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        if not created and saved.get(field_name) == current[field_name]:
+            continue
+        field_file = getattr(instance, field_name)
+        placeholder_fields = PLACEHOLDER_FIELDS.get((model, field_name))
+        if placeholder_fields and not field_file and getattr(instance, placeholder_fields[0]):
+            # Изображение убрали — заглушка больше не нужна
+            sender._default_manager.filter(pk=instance.pk).update(**dict.fromkeys(placeholder_fields))
+            for placeholder_field in placeholder_fields:
+                setattr(instance, placeholder_field, None)
+        schedule_derivatives(field_file, placeholder_fields)
+
+
+for model, _ in IMAGE_FIELDS:
+    post_init.connect(image_loaded, sender=model, dispatch_uid=f'image_names_{model.__name__}')
+    post_save.connect(image_saved, sender=model, dispatch_uid=f'image_derivatives_{model.__name__}')
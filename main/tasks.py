@@ -0,0 +1,13 @@
+from django.apps import apps
+
+from jobs.registry import task
+from utils.image_derivatives import build_derivatives
+
+
+@task('main.build_image', max_attempts=2)
+def build_image(model_label, field_name, name, pk=None, placeholder_fields=None, with_derivatives=True):
+    """Копии изображения (и заглушка в строке `pk`, если заданы `placeholder_fields`) через очередь задач."""
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field_name).storage
+    target = (model, pk, field_name, tuple(placeholder_fields)) if placeholder_fields else None
+    build_derivatives(storage, name, target, with_derivatives)
@@ -0,0 +1,440 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+import zoneinfo
+from collections import OrderedDict
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from bowls.models import Bowls
+from main.parsers import ORJSONParser
+from main.renderers import ORJSONRenderer
+from mixes.models import Mixes
+from mixes.serializers import MixesSerializer
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_bowl(db):
+    return Bowls.objects.create(type="Phunnel", description="", howTo="")
+
+
+@pytest.mark.django_db
+def test_envelope_rendered_once(api_client, create_bowl, capsys):
+    """Ответ DRF оборачивается рендерером один раз и ничего не печатает."""
+    response = api_client.post(reverse("bowls-list"), format="json")
+    assert response.status_code == 200
+    assert response.enveloped is True
+    assert response["Content-Type"] == "application/json"
+    body = json.loads(response.content)
+    assert set(body) == {"status", "code", "message", "data", "errors"}
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.django_db
+def test_view_envelope_not_nested(api_client, create_bowl):
+    """Конверт, собранный представлением, не вкладывается в общий конверт."""
+    response = api_client.post(reverse("bowls-list"), format="json")
+    results = response.json()["data"]["results"]
+    assert [item["type"] for item in results] == ["Phunnel"]
+
+    response = api_client.post(reverse("bowls-detail", kwargs={"pk": create_bowl.pk}), format="json")
+    assert response.json()["data"]["type"] == "Phunnel"
+
+
+@pytest.mark.django_db
+def test_error_envelope(api_client):
+    """Ошибка DRF попадает в `errors` без вложенного конверта."""
+    response = api_client.post(reverse("bowls-create"), data={"type": "Killer"}, format="json")
+    assert response.status_code == 401
+    body = response.json()
+    assert body["status"] == "bad"
+    assert body["data"] is None
+    assert set(body["errors"]) == {"detail"}
+
+
+@pytest.mark.django_db
+def test_non_drf_response_wrapped(api_client):
+    """Ответы не из DRF по-прежнему оборачивает middleware."""
+    response = api_client.post("/api/v1/does-not-exist/")
+    assert response.status_code == 404
+    assert response.json()["code"] == 404
+
+
+GOLDEN_PAYLOADS = [
+    {"id": uuid.UUID("82b74c74-2399-405a-83af-26761b6fcd5b"), "name": "Микс «Тропики»"},
+    OrderedDict([("b", 1), ("a", [1.5, True, None, "x"])]),
+    {
+        "utc": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        "micro": datetime.datetime(2024, 5, 1, 12, 30, 0, 125, tzinfo=datetime.timezone.utc),
+        "moscow": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=zoneinfo.ZoneInfo("Europe/Moscow")),
+        "naive": datetime.datetime(2024, 5, 1, 12, 30, 15),
+        "date": datetime.date(2024, 5, 1),
+        "time": datetime.time(7, 5),
+    },
+    {"price": decimal.Decimal("12.50"), "lazy": gettext_lazy("Успех"), "tuple": (1, 2)},
+    {1: "int key", "line": "a\u2028b\u2029c", "quote": "\"\\/\n"},
+    [],
+]
+
+
+@pytest.mark.parametrize("payload", GOLDEN_PAYLOADS)
+def test_orjson_renderer_matches_drf(payload):
+    """orjson-рендерер выдаёт те же байты, что и JSONRenderer DRF."""
+    assert ORJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+
+@pytest.mark.django_db
+def test_orjson_renderer_matches_drf_on_mix_page(db):
+    """Совпадение байтов на реальной странице миксов."""
+    for index in range(3):
+        Mixes.objects.create(name=f"Микс {index}", description="Сладкий\nмикс")
+    data = {"count": 3, "next": None, "previous": None,
+            "results": MixesSerializer(Mixes.objects.for_list(), many=True).data}
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_orjson_renderer_indent_falls_back():
+    """Запрошенные отступы обрабатывает стандартный рендерер."""
+    payload = {"a": [1, 2]}
+    media_type = "application/json; indent=4"
+    assert ORJSONRenderer().render(payload, media_type) == JSONRenderer().render(payload, media_type)
+
+
+@pytest.mark.parametrize("body", [b'{"query": "\xd0\xbc\xd1\x8f", "limit": 5}', b'[1, 2.5, null]'])
+def test_orjson_parser_matches_drf(body):
+    """orjson-парсер возвращает те же данные, что и JSONParser DRF."""
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+def test_orjson_parser_errors():
+    """Некорректное тело даёт ParseError, как в DRF."""
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"query": '))
+
+
+@pytest.mark.parametrize("name", ["tobacco.jpg", "avatars/user 1.png", "banners/Микс №1.webp"])
+def test_media_resolver_matches_build_absolute_uri(name):
+    """Резолвер даёт те же ссылки, что и `build_absolute_uri(storage.url(name))`."""
+    from django.core.files.storage import default_storage
+    from rest_framework.test import APIRequestFactory
+    from utils.media import MediaURLResolver
+
+    request = APIRequestFactory().post("/api/v1/tobaccos/list/")
+    resolver = MediaURLResolver.for_request(request)
+    assert resolver is MediaURLResolver.for_request(request)
+    expected = request.build_absolute_uri(default_storage.url(name))
+    assert resolver.url(name) == resolver.absolute_url(name) == expected
+
+
+def test_media_resolver_without_request(settings):
+    """Без запроса ссылка относительная (или на CDN, если он настроен)."""
+    from utils.media import MediaURLResolver
+
+    assert MediaURLResolver().url("a.jpg") == "/media/a.jpg"
+    assert MediaURLResolver().absolute_url("a.jpg") is None
+    assert MediaURLResolver().url("") is None
+
+    settings.MEDIA_CDN_ORIGIN = "https://cdn.example.com/"
+    assert MediaURLResolver().absolute_url("a.jpg") == "https://cdn.example.com/media/a.jpg"
+
+
+@pytest.mark.django_db
+def test_media_urls_in_responses(api_client, settings):
+    """Ссылки на файлы в ответах не меняются без CDN и строятся от CDN, если он настроен."""
+    bowl = Bowls.objects.create(type="Phunnel", description="", howTo="", image="bowl.png")
+    url = reverse("bowls-detail", kwargs={"pk": bowl.pk})
+    # Детали чаши сериализуются без запроса в контексте, поэтому ссылка относительная
+    assert api_client.post(url).json()["data"]["image"] == "/media/bowl.png"
+
+    settings.MEDIA_CDN_ORIGIN = "https://cdn.example.com"
+    assert api_client.post(url).json()["data"]["image"] == "https://cdn.example.com/media/bowl.png"
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    from utils import image_derivatives
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVES_ASYNC = False
+    image_derivatives.clear_ready_cache()
+    yield tmp_path
+    image_derivatives.clear_ready_cache()
+
+
+def _png(size=(1600, 900)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_image_derivatives_built_after_commit(api_client, media_root, django_capture_on_commit_callbacks):
+    """После сохранения строятся миниатюры и WebP с детерминированными именами, ссылки переключаются на них."""
+    from django.core.files.base import ContentFile
+    from PIL import Image
+
+    bowl = Bowls(type="Phunnel", description="", howTo="")
+    bowl.image.save("bowl.png", ContentFile(_png()), save=False)
+    url = reverse("bowls-detail", kwargs={"pk": bowl.pk})
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        bowl.save()
+    # Пока копии не построены, миниатюра ведёт на оригинал
+    assert api_client.post(url).json()["data"]["thumbnail"] == "/media/bowl.png"
+
+    for callback in callbacks:
+        callback()
+    thumb = Image.open(media_root / "bowl__thumb.webp")
+    assert thumb.format == "WEBP" and max(thumb.size) == 320
+    assert (media_root / "bowl__large.webp").exists()
+    assert (media_root / "bowl__thumb.png").exists()  # прозрачность сохраняется в PNG
+    assert api_client.post(url).json()["data"]["thumbnail"] == "/media/bowl__thumb.webp"
+
+
+def test_missing_derivative_cached(media_root, settings, monkeypatch):
+    """Отсутствие копии запоминается на `IMAGE_DERIVATIVE_MISSING_TTL`: строки списка не проверяют хранилище каждый раз."""
+    from django.core.files.storage import default_storage
+    from utils import image_derivatives
+    from utils.media import MediaURLResolver
+
+    probes = []
+    exists = default_storage.exists
+    monkeypatch.setattr(default_storage, "exists", lambda name: probes.append(name) or exists(name))
+    clock = [100.0]
+    monkeypatch.setattr(image_derivatives.time, "monotonic", lambda: clock[0])
+
+    for _ in range(3):
+        assert MediaURLResolver().variant_url("new.png", "thumb") == "/media/new.png"
+    assert probes == ["new__thumb.webp"]
+
+    (media_root / "new__thumb.webp").write_bytes(b"")
+    clock[0] += settings.IMAGE_DERIVATIVE_MISSING_TTL + 1
+    assert MediaURLResolver().variant_url("new.png", "thumb") == "/media/new__thumb.webp"
+    assert MediaURLResolver().variant_url("new.png", "thumb") == "/media/new__thumb.webp"
+    assert len(probes) == 2
+
+
+@pytest.mark.django_db
+def test_image_derivatives_only_on_image_change(media_root, django_capture_on_commit_callbacks):
+    """Сохранение без смены изображения не обращается к хранилищу; неудачная сборка не повторяется."""
+    from utils.image_derivatives import schedule_derivatives
+
+    def builds(callbacks):
+        return [callback for callback in callbacks if callback.__qualname__.startswith("schedule_derivatives")]
+
+    (media_root / "broken.png").write_bytes(b"not an image")
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        bowl = Bowls.objects.create(type="Phunnel", description="", howTo="", image="broken.png")
+    assert len(builds(callbacks)) == 1
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        bowl.description = "Новое описание"
+        bowl.save()
+        Bowls.objects.get(pk=bowl.pk).save()
+        schedule_derivatives(bowl.image)
+    assert builds(callbacks) == []
+
+    (media_root / "bowl.png").write_bytes(_png((200, 100)))
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        bowl.image = "bowl.png"
+        bowl.save(update_fields=["image"])
+    assert len(builds(callbacks)) == 1 and (media_root / "bowl__thumb.webp").exists()
+
+
+@pytest.mark.django_db
+def test_build_image_derivatives_command(media_root):
+    """Команда дозаполняет копии для уже загруженных изображений и пропускает готовые."""
+    from django.core.management import call_command
+
+    (media_root / "old.png").write_bytes(_png((200, 100)))
+    (media_root / "other.png").write_bytes(_png((200, 100)))
+    Bowls.objects.bulk_create([Bowls(type="Killer", description="", howTo="", image="old.png"),
+                               Bowls(type="Phunnel", description="", howTo="", image="other.png")])
+
+    out = io.StringIO()
+    call_command("build_image_derivatives", workers=1, batch_size=1, stdout=out)
+    assert "2 изображений" in out.getvalue()
+    # Маленькие изображения не увеличиваются
+    from PIL import Image
+    assert Image.open(media_root / "old__large.webp").size == (200, 100)
+
+    out = io.StringIO()
+    call_command("build_image_derivatives", workers=1, stdout=out)
+    assert "0 изображений" in out.getvalue()
+
+
+def test_placeholder_of_solid_image():
+    """Заглушка однотонного изображения: BlurHash 4×3 и сам цвет как преобладающий."""
+    from PIL import Image
+    from utils.image_processing import compute_placeholder
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (120, 80), (200, 30, 30)).save(buffer, "PNG")
+    # Значение совпадает с эталонной реализацией BlurHash
+    assert compute_placeholder(buffer.getvalue()) == ("L3M^z|]TfQ]T|wjtfQjtfQfQfQfQ", "#c81e1e")
+
+
+@pytest.mark.django_db
+def test_placeholders_in_tobacco_list(api_client, media_root, django_capture_on_commit_callbacks):
+    """После загрузки изображения заглушка записывается в строку и попадает в список."""
+    from django.core.files.base import ContentFile
+    from manufacturers.models import Manufacturers
+    from tobaccos.models import Tobaccos
+
+    manufacturer = Manufacturers.objects.create(name="Darkside", description="")
+    tobacco = Tobaccos(manufacturer=manufacturer, taste="Вишня", description="")
+    tobacco.image.save("cherry.png", ContentFile(_png()), save=False)
+    with django_capture_on_commit_callbacks(execute=True):
+        tobacco.save()
+
+    tobacco.refresh_from_db()
+    assert len(tobacco.image_blurhash) == 28 and tobacco.image_color.startswith("#")
+    item = api_client.post(reverse("tobaccos-list")).json()["data"]["results"][0]
+    assert item["image_blurhash"] == tobacco.image_blurhash
+    assert item["image_color"] == tobacco.image_color
+
+    # Без изображения заглушка очищается
+    tobacco.image = None
+    tobacco.save()
+    tobacco.refresh_from_db()
+    assert tobacco.image_blurhash is None and tobacco.image_color is None
+
+
+@pytest.mark.django_db
+def test_build_image_placeholders_command(media_root):
+    """Команда заполняет заглушки для строк без них, один файл считается один раз."""
+    from django.core.management import call_command
+
+    (media_root / "old.png").write_bytes(_png((200, 100)))
+    Mixes.objects.bulk_create([Mixes(name="Первый", description="", banner="old.png"),
+                          Mixes(name="Второй", description="", banner="old.png")])
+
+    out = io.StringIO()
+    call_command("build_image_placeholders", workers=1, stdout=out)
+    assert "1 изображений" in out.getvalue()
+    assert set(Mixes.objects.values_list("banner_color", flat=True)) == {"#e38e8e"}
+
+    out = io.StringIO()
+    call_command("build_image_placeholders", workers=1, stdout=out)
+    assert "0 изображений" in out.getvalue()
+
+
+@pytest.fixture
+def fake_fusionbrain():
+    from utils.fusionbrain_fake import FakeFusionbrainServer
+
+    with FakeFusionbrainServer(polls_until_done=1) as fake:
+        yield fake
+
+
+def _fusionbrain_client(fake, **kwargs):
+    from utils.FusionbrainImgGen import Text2ImageAPI
+
+    kwargs.setdefault("backoff", 0.01)
+    return Text2ImageAPI(fake.url, "key", "secret", **kwargs)
+
+
+def test_fusionbrain_client_reuses_connection(fake_fusionbrain):
+    """Модель запрашивается один раз, все запросы идут через одно соединение."""
+    with _fusionbrain_client(fake_fusionbrain) as client:
+        request_ids = [client.generate(f"Запрос {i}") for i in range(3)]
+        for request_id in request_ids:
+            assert client.check_status(request_id)["status"] == "PROCESSING"
+        assert client.get_model() == fake_fusionbrain.model_id
+    assert fake_fusionbrain.connections == 1
+
+
+def test_fusionbrain_client_retries_and_breaker(fake_fusionbrain):
+    """Временные ошибки повторяются; серия неудач размыкает клиент до истечения таймаута."""
+    from utils.FusionbrainImgGen import CircuitBreaker, CircuitOpenError, Text2ImageError
+
+    clock = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: clock[0])
+    with _fusionbrain_client(fake_fusionbrain, retries=2, breaker=breaker) as client:
+        fake_fusionbrain.fail_next(503, times=2)
+        assert client.get_model() == fake_fusionbrain.model_id
+
+        # Неидемпотентный запуск генерации при 500 не повторяется
+        fake_fusionbrain.fail_next(500)
+        with pytest.raises(Text2ImageError):
+            client.generate("Закат")
+        assert fake_fusionbrain.prompts == []
+
+        fake_fusionbrain.fail_next(503, times=3)
+        with pytest.raises(Text2ImageError):
+            client.check_status("missing")
+        with pytest.raises(CircuitOpenError):
+            client.check_status("missing")
+
+        # После таймаута пробный запрос замыкает размыкатель
+        clock[0] = 11
+        request_id = client.generate("Закат")
+        assert client.breaker.remaining() == 0 and request_id
+
+        # Неожиданная ошибка пробного запроса снова размыкает клиент, а не оставляет его полуоткрытым
+        breaker.record_failure()
+        breaker.record_failure()
+        clock[0] = 22
+
+        def broken_request(*args, **kwargs):
+            raise ValueError("Некорректный URL")
+
+        client.session.request = broken_request
+        with pytest.raises(ValueError):
+            client.check_status("missing")
+        assert breaker.remaining() == 10
+
+
+def test_fusionbrain_client_generate_many(fake_fusionbrain):
+    """Асинхронный интерфейс ведёт несколько генераций одновременно и сохраняет порядок результатов."""
+    import asyncio
+    import base64
+    from utils.FusionbrainImgGen import Text2ImageError
+    from utils.fusionbrain_fake import fake_image
+
+    prompts = [f"Микс {i}" for i in range(5)]
+    fake_fusionbrain.fail_prompts.add(prompts[2])
+    with _fusionbrain_client(fake_fusionbrain) as client:
+        results = asyncio.run(client.generate_many(prompts, concurrency=3, initial_delay=0.01))
+    assert sorted(fake_fusionbrain.prompts) == sorted(prompts)
+    assert isinstance(results[2], Text2ImageError)
+    for prompt, result in zip(prompts, results):
+        if prompt != prompts[2]:
+            assert result == fake_image(prompt) and base64.b64decode(result)
+
+
+@pytest.mark.django_db
+def test_image_derivatives_via_job_queue(settings, media_root):
+    """С `IMAGE_DERIVATIVES_BACKEND = 'jobs'` копии строит задача очереди, а не пул процессов веб-процесса."""
+    from django.core.files.base import ContentFile
+    from jobs.models import Job
+    from jobs.worker import claim, run_job
+    from tobaccos.models import Tobaccos
+    from manufacturers.models import Manufacturers
+
+    settings.IMAGE_DERIVATIVES_ASYNC = True
+    settings.IMAGE_DERIVATIVES_BACKEND = "jobs"
+    tobacco = Tobaccos(manufacturer=Manufacturers.objects.create(name="Must Have", description=""),
+                       taste="Дыня", description="")
+    tobacco.image.save("melon.png", ContentFile(_png()), save=True)
+
+    job = Job.objects.get(name="main.build_image")
+    assert claim("w1", 1) == [job.pk] and run_job(job.pk, "w1")
+    assert (media_root / "melon__thumb.webp").exists()
+    tobacco.refresh_from_db()
+    assert tobacco.image_color and tobacco.image_blurhash
@@ -1,10 +1,13 @@
 from rest_framework import serializers
 
 from manufacturers.models import Manufacturers
+from utils.media import ImageVariantField, MediaURLSerializerMixin
 
 
 # Сериализатор для производителей
-class ManufacturersSerializer(serializers.ModelSerializer):
+class ManufacturersSerializer(MediaURLSerializerMixin, serializers.ModelSerializer):
+    thumbnail = ImageVariantField('thumb', source='image')  # Миниатюра WebP
+
     class Meta:
         model = Manufacturers
-        fields = ['id', 'name', 'description', 'image']  # Поля, которые будут включены в сериализатор
+        fields = ['id', 'name', 'description', 'image', 'thumbnail']  # Поля, которые будут включены в сериализатор
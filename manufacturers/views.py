@@ -88,12 +88,7 @@ class ManufacturersListAPIView(APIView):
         page = paginator.paginate_queryset(queryset, request)
         if page is not None:
             serializer = ManufacturersSerializer(page, many=True)
-            return paginator.get_paginated_response({
-                "status": "ok",
-                "code": status.HTTP_200_OK,
-                "message": "Список производителей успешно получен",
-                "data": serializer.data
-            })
+            return paginator.get_paginated_response(serializer.data)
         serializer = ManufacturersSerializer(queryset, many=True)
         return Response({
             "status": "ok",
@@ -47,7 +47,8 @@ class MixesAdminForm(forms.ModelForm):
 class MixesAdmin(admin.ModelAdmin):
     form = MixesAdminForm  # ПРИКРЕПИ новую форму
     change_form_template = 'admin/mixes/change_form.html'
-    list_display = ["name", "description", "created", "banner_preview"]
+    list_display = ["name", "description", "created", "likes_count", "favorites_count", "banner_preview"]
+    readonly_fields = ["likes_count", "favorites_count"]
     search_fields = ['name']
     inlines = [MixTobaccoInline, MixBowlInline]
 
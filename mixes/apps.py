@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MixesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mixes'
+
+    def ready(self):
+        # Подключаем постановку генерации баннера в очередь и обновление индексов миксов в памяти
+        from mixes import signals  # noqa: F401
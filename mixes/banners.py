@@ -0,0 +1,243 @@
+"""Фоновая генерация баннеров миксов через Fusionbrain.
+
+Создание микса только ставит запрос в очередь (`BannerGeneration`), сам
+запрос к Fusionbrain и опрос его статуса выполняет воркер — команда
+`generate_banners` или поток внутри процесса при `BANNER_WORKER_IN_PROCESS`.
+Один проход воркера (`process_banners`) не ждёт: он запускает генерации
+в пределах `BANNER_GENERATION_CONCURRENCY` и один раз опрашивает те, чей
+срок опроса подошёл; следующий опрос откладывается с экспоненциальной
+задержкой и разбросом."""
+import base64
+import hashlib
+import io
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from mixes.models import BannerGeneration, BannerGenerationStatus, Mixes
+from utils.FusionbrainImgGen import CircuitBreaker, CircuitOpenError, Text2ImageAPI
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def banner_prompt(mix):
+    """Текст запроса к генератору по названию, описанию и вкусам микса."""
+    parts = [f"Кальянный микс «{mix.name}»"]
+    tastes = sorted(mix.compares.values_list('tobacco__taste', flat=True))
+    if tastes:
+        parts.append("вкусы: " + ", ".join(tastes))
+    categories = sorted(mix.categories.values_list('name', flat=True))
+    if categories:
+        parts.append("категории: " + ", ".join(categories))
+    if mix.description:
+        parts.append(mix.description)
+    return ". ".join(parts)
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def get_client():
+    """Клиент Fusionbrain, общий для процесса: пул соединений, модель и размыкатель переживают проходы воркера."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Text2ImageAPI(
+                settings.FUSIONBRAIN_API_URL, settings.FUSIONBRAIN_API_KEY, settings.FUSIONBRAIN_SECRET_KEY,
+                timeout=settings.FUSIONBRAIN_TIMEOUT, retries=settings.FUSIONBRAIN_RETRIES,
+                breaker=CircuitBreaker(settings.FUSIONBRAIN_BREAKER_THRESHOLD, settings.FUSIONBRAIN_BREAKER_RESET),
+            )
+        return _client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def poll_delay(attempts):
+    """Задержка перед следующим опросом: удвоение от начальной до максимальной, разброс 50–100 %."""
+    delay = min(settings.BANNER_POLL_MAX_DELAY, settings.BANNER_POLL_INITIAL_DELAY * 2 ** attempts)
+    return delay * (0.5 + random.random() / 2)
+
+
+def apply_banner(generation):
+    """Ставит готовое изображение миксам, которые ждут эту генерацию и ещё без баннера.
+
+    Сохранение через `save()`, чтобы сработали сигналы (копии и заглушки изображения)."""
+    waiting = generation.mixes.filter(Q(banner='') | Q(banner__isnull=True))
+    for mix in waiting:
+        mix.banner = generation.image.name
+        mix.save(update_fields=['banner'])
+
+
+def request_banner(mix):
+    """Ставит генерацию баннера микса в очередь; готовое изображение с тем же запросом берётся сразу."""
+    prompt = banner_prompt(mix)
+    generation, _ = BannerGeneration.objects.get_or_create(prompt_hash=prompt_hash(prompt),
+                                                           defaults={'prompt': prompt})
+    if generation.status == BannerGenerationStatus.FAILED:
+        # Повторная просьба о том же запросе — ещё одна попытка
+        BannerGeneration.objects.filter(pk=generation.pk, status=BannerGenerationStatus.FAILED).update(
+            status=BannerGenerationStatus.QUEUED, attempts=0, upstream_id=None, next_poll_at=None, error='')
+        generation.refresh_from_db()
+    Mixes.objects.filter(pk=mix.pk).update(banner_generation=generation)
+    if generation.status == BannerGenerationStatus.DONE:
+        apply_banner(generation)
+    elif settings.BANNER_WORKER_IN_PROCESS:
+        transaction.on_commit(kick)
+    return generation
+
+
+def _fail(generation, error):
+    logger.warning("Генерация баннера %s не удалась: %s", generation.pk, error)
+    generation.status = BannerGenerationStatus.FAILED
+    generation.error = str(error)
+    generation.save(update_fields=['status', 'error', 'updated'])
+
+
+def _store_image(generation, image_base64):
+    data = base64.b64decode(image_base64)
+    with Image.open(io.BytesIO(data)) as image:
+        extension = (image.format or 'jpeg').lower().replace('jpeg', 'jpg')
+    generation.image.save(f'{generation.prompt_hash[:32]}.{extension}', ContentFile(data), save=False)
+    generation.status = BannerGenerationStatus.DONE
+    generation.save(update_fields=['image', 'status', 'updated'])
+    apply_banner(generation)
+
+
+def _start(generation, client, now):
+    try:
+        generation.upstream_id = client.generate(generation.prompt, width=settings.BANNER_WIDTH,
+                                                 height=settings.BANNER_HEIGHT)
+    except CircuitOpenError:
+        # Fusionbrain недоступен: генерация возвращается в очередь
+        BannerGeneration.objects.filter(pk=generation.pk, status=BannerGenerationStatus.STARTING).update(
+            status=BannerGenerationStatus.QUEUED, next_poll_at=None)
+        return
+    except Exception as exc:
+        _fail(generation, exc)
+        return
+    generation.status = BannerGenerationStatus.RUNNING
+    generation.attempts = 0
+    generation.next_poll_at = now + timedelta(seconds=poll_delay(0))
+    generation.save(update_fields=['upstream_id', 'status', 'attempts', 'next_poll_at', 'updated'])
+
+
+def _poll(generation, client, now):
+    try:
+        data = client.check_status(generation.upstream_id)
+    except CircuitOpenError:
+        # Опрос не состоялся и не считается попыткой
+        generation.next_poll_at = now + timedelta(seconds=max(client.breaker.remaining(), 1))
+        generation.save(update_fields=['next_poll_at', 'updated'])
+        return
+    except Exception as exc:
+        # Сетевые ошибки не роняют генерацию: просто следующий опрос позже
+        logger.warning("Не удалось опросить генерацию баннера %s: %s", generation.pk, exc)
+        data = {}
+    upstream_status = data.get('status')
+    if upstream_status == 'DONE' and data.get('images') and not data.get('censored'):
+        try:
+            _store_image(generation, data['images'][0])
+        except Exception as exc:
+            _fail(generation, exc)
+        return
+    if upstream_status in ('DONE', 'FAIL'):
+        _fail(generation, data.get('errorDescription') or "Fusionbrain не вернул изображение")
+        return
+    generation.attempts += 1
+    if generation.attempts >= settings.BANNER_POLL_MAX_ATTEMPTS:
+        _fail(generation, "Превышено количество опросов статуса")
+        return
+    generation.next_poll_at = now + timedelta(seconds=poll_delay(generation.attempts))
+    generation.save(update_fields=['attempts', 'next_poll_at', 'updated'])
+
+
+def process_banners(now=None, client=None):
+    """Один проход воркера. Возвращает время ближайшего опроса или None, если работы нет."""
+    now = now or timezone.now()
+    client = client or get_client()
+
+    due = BannerGeneration.objects.filter(status=BannerGenerationStatus.RUNNING, next_poll_at__lte=now)
+    for generation in due.order_by('next_poll_at'):
+        _poll(generation, client, now)
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    starting = BannerGenerationStatus.STARTING
+    # Запускаемая генерация занимает место в лимите, пока не истёк срок её захвата
+    busy = BannerGeneration.objects.filter(
+        Q(status=BannerGenerationStatus.RUNNING) | Q(status=starting, next_poll_at__gt=now))
+    claimed = []
+    with transaction.atomic():
+        free = settings.BANNER_GENERATION_CONCURRENCY - busy.count()
+        if free > 0:
+            # Строки только помечаются как запускаемые: блокировки снимаются до запроса к Fusionbrain.
+            # Генерацию, захваченную упавшим воркером, после истечения срока забирает следующий
+            claimable = Q(status=BannerGenerationStatus.QUEUED) | Q(status=starting, next_poll_at__lte=now)
+            claimed = list(BannerGeneration.objects.select_for_update(skip_locked=skip_locked)
+                           .filter(claimable).order_by('created')[:free])
+            BannerGeneration.objects.filter(pk__in=[generation.pk for generation in claimed]).update(
+                status=starting, next_poll_at=now + timedelta(seconds=settings.BANNER_START_LEASE))
+    for generation in claimed:
+        _start(generation, client, now)
+
+    # Для запускаемых другим воркером генераций — момент, когда их можно будет забрать
+    candidates = [BannerGeneration.objects.filter(status__in=[BannerGenerationStatus.RUNNING, starting])
+                  .order_by('next_poll_at').values_list('next_poll_at', flat=True).first()]
+    if BannerGeneration.objects.filter(status=BannerGenerationStatus.QUEUED).exists():
+        if busy.count() < settings.BANNER_GENERATION_CONCURRENCY:
+            # Есть место, но запустить не удалось (размыкатель или строки заняты другим воркером)
+            candidates.append(now + timedelta(seconds=max(client.breaker.remaining(), 1)))
+    candidates = [moment for moment in candidates if moment is not None]
+    return min(candidates) if candidates else None
+
+
+def run_until_idle(client=None, sleep=time.sleep, max_sleep=30):
+    """Крутит проходы воркера, пока в очереди есть генерации."""
+    while True:
+        next_at = process_banners(client=client)
+        if next_at is None:
+            return
+        wait = (next_at - timezone.now()).total_seconds()
+        if wait > 0:
+            sleep(min(wait, max_sleep))
+
+
+def _run_worker():
+    global _worker
+    try:
+        run_until_idle()
+    except Exception:
+        logger.exception("Воркер генерации баннеров остановился")
+    finally:
+        connection.close()
+        with _worker_lock:
+            _worker = None
+
+
+def kick():
+    """Запускает поток воркера в текущем процессе, если он ещё не работает."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name='banner-generation', daemon=True)
+            _worker.start()
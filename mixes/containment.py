@@ -0,0 +1,270 @@
+"""Поиск миксов по набору табаков через инвертированный индекс в памяти воркера.
+
+Для каждого табака индекс хранит отсортированный массив позиций миксов, в
+которых он есть. «Все табаки» — пересечение массивов начиная с самого
+короткого, «любой из табаков» — объединение с подсчётом совпадений. Выдача
+упорядочена по числу совпавших табаков, затем по лайкам и id микса; лайки
+тоже хранятся в индексе и обновляются сигналами `MixLikes`.
+
+Миксы «с полки» считаются тем же подсчётом: число совпавших с полкой
+табаков вычитается из размера состава микса, и одно векторное сравнение
+по всем миксам оставляет те, где не хватает не больше `N` табаков."""
+import uuid
+from bisect import bisect_left
+
+import numpy as np
+
+from mixes.models import Mixes, MixTobacco
+from utils.worker_index import WorkerIndex
+
+ALL = 'all'
+ANY = 'any'
+MODES = (ALL, ANY)
+
+# Порядок выдачи: больше совпадений, больше лайков, затем id для стабильной пагинации
+CONTAINMENT_ORDERING = ('-overlap', '-likes', 'id')
+# Миксы с полки: сначала те, где не хватает меньше табаков
+SHELF_ORDERING = ('missing', '-likes', 'id')
+
+# С какого размера выдача упорядочивается через заранее отсортированный по id массив, а не lexsort
+LARGE_RANKING = 4096
+
+
+def descending_order(values):
+    """Устойчивая сортировка индексов по убыванию неотрицательных целых.
+
+    Небольшие значения приводятся к uint8/uint16 — для них NumPy сортирует поразрядно за линейное время."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    top = int(values.max())
+    keys = top - values
+    for dtype in (np.uint8, np.uint16):
+        if top <= np.iinfo(dtype).max:
+            keys = keys.astype(dtype)
+            break
+    return np.argsort(keys, kind='stable')
+
+
+class Ranking:
+    """Упорядоченная выдача поиска: последовательность строк `{'id', <столбцы>}`.
+
+    Строки создаются только для запрошенных позиций, поэтому срез страницы
+    не зависит от размера выдачи."""
+
+    def __init__(self, ids, **columns):
+        self._ids = ids
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _row(self, index):
+        row = {'id': self._ids[index]}
+        for name, values in self._columns.items():
+            row[name] = int(values[index])
+        return row
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._row(index) for index in range(*item.indices(len(self)))]
+        return self._row(range(len(self))[item])
+
+
+class TobaccoMixes:
+    """Составы миксов и инвертированный индекс табак -> позиции миксов."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=object)  # позиция -> id микса (None — свободна)
+        self.size = 0  # занятая длина массивов
+        self.positions = {}  # id микса -> позиция
+        self.tobaccos = []  # позиция -> frozenset табаков микса
+        self.likes = np.zeros(0, dtype=np.int64)
+        self.sizes = np.zeros(0, dtype=np.int64)  # позиция -> число табаков в миксе
+        # Старшая и младшая половины UUID: их порядок совпадает с порядком строковых id
+        self.id_high = np.zeros(0, dtype=np.uint64)
+        self.id_low = np.zeros(0, dtype=np.uint64)
+        self.postings = {}  # табак -> множество позиций
+        self._arrays = {}  # табак -> отсортированный массив позиций
+        self._by_id = None  # занятые позиции в порядке id миксов (строится при первой большой выдаче)
+        self._free = []
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _grow(self, size):
+        capacity = len(self.likes)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        for name in ('ids', 'likes', 'sizes', 'id_high', 'id_low'):
+            array = getattr(self, name)
+            grown = np.empty(capacity, dtype=object) if array.dtype == object else np.zeros(capacity, array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def set(self, mix_id, tobaccos, likes):
+        """Добавляет микс или заменяет его состав и количество лайков."""
+        position = self.positions.get(mix_id)
+        if position is None:
+            position = self._free.pop() if self._free else self.size
+            if position == self.size:
+                self.size += 1
+                self.tobaccos.append(frozenset())
+                self._grow(self.size)
+            self.ids[position] = mix_id
+            self.positions[mix_id] = position
+            self.id_high[position], self.id_low[position] = divmod(uuid.UUID(str(mix_id)).int, 1 << 64)
+            if self._by_id is not None:
+                self._by_id = np.insert(self._by_id, self._id_rank(position), position)
+        self._unlink(position)
+        self.tobaccos[position] = frozenset(tobaccos)
+        self.sizes[position] = len(self.tobaccos[position])
+        self.likes[position] = likes
+        for tobacco_id in self.tobaccos[position]:
+            self.postings.setdefault(tobacco_id, set()).add(position)
+            self._arrays.pop(tobacco_id, None)
+
+    def remove(self, mix_id):
+        position = self.positions.pop(mix_id, None)
+        if position is None:
+            return
+        self._unlink(position)
+        if self._by_id is not None:
+            self._by_id = np.delete(self._by_id, self._id_rank(position))
+        self.tobaccos[position] = frozenset()
+        self.ids[position] = None
+        self.likes[position] = 0
+        self.sizes[position] = 0
+        self._free.append(position)
+
+    def add_likes(self, mix_id, delta):
+        position = self.positions.get(mix_id)
+        if position is not None:
+            self.likes[position] = max(0, self.likes[position] + delta)
+
+    def _unlink(self, position):
+        for tobacco_id in self.tobaccos[position]:
+            posting = self.postings.get(tobacco_id)
+            if posting is None:
+                continue
+            posting.discard(position)
+            self._arrays.pop(tobacco_id, None)
+            if not posting:
+                del self.postings[tobacco_id]
+
+    def _id_key(self, position):
+        return self.id_high[position], self.id_low[position]
+
+    def _id_rank(self, position):
+        return bisect_left(self._by_id, self._id_key(position), key=self._id_key)
+
+    def by_id(self):
+        if self._by_id is None:
+            occupied = np.fromiter(self.positions.values(), dtype=np.int64, count=len(self.positions))
+            self._by_id = occupied[np.lexsort((self.id_low[occupied], self.id_high[occupied]))]
+        return self._by_id
+
+    def mix_positions(self, tobacco_id):
+        """Отсортированный массив позиций миксов с табаком."""
+        array = self._arrays.get(tobacco_id)
+        if array is None:
+            posting = self.postings.get(tobacco_id, ())
+            array = np.sort(np.fromiter(posting, dtype=np.int64, count=len(posting)))
+            self._arrays[tobacco_id] = array
+        return array
+
+    def _matches(self, tobacco_ids):
+        """Число табаков из набора в каждом миксе, по позициям."""
+        arrays = [self.mix_positions(tobacco_id) for tobacco_id in set(tobacco_ids)]
+        if not arrays:
+            return np.zeros(self.size, dtype=np.int64)
+        return np.bincount(np.concatenate(arrays), minlength=self.size)
+
+    def _ranked(self, positions, primary):
+        """Позиции по убыванию `primary` (неотрицательные целые), затем лайков, затем по id."""
+        if len(positions) < LARGE_RANKING:
+            order = np.lexsort((self.id_low[positions], self.id_high[positions], -self.likes[positions], -primary))
+            return positions[order], primary[order]
+        # Кандидаты берутся в порядке id, затем два устойчивых прохода: по лайкам и по основному ключу
+        selected = np.zeros(self.size, dtype=bool)
+        selected[positions] = True
+        keys = np.zeros(self.size, dtype=np.int64)
+        keys[positions] = primary
+        by_id = self.by_id()
+        positions = by_id[selected[by_id]]
+        positions = positions[descending_order(self.likes[positions])]
+        primary = keys[positions]
+        order = descending_order(primary)
+        return positions[order], primary[order]
+
+    def search(self, tobacco_ids, mode=ALL):
+        """Миксы, содержащие все (`ALL`) или хотя бы один (`ANY`) из табаков, в порядке выдачи."""
+        arrays = [self.mix_positions(tobacco_id) for tobacco_id in set(tobacco_ids)]
+        if not arrays:
+            positions = overlap = np.zeros(0, dtype=np.int64)
+        elif mode == ALL:
+            arrays.sort(key=len)
+            positions = arrays[0]
+            for array in arrays[1:]:
+                if not len(positions):
+                    break
+                positions = np.intersect1d(positions, array, assume_unique=True)
+            overlap = np.full(len(positions), len(arrays), dtype=np.int64)
+        else:
+            counts = self._matches(tobacco_ids)
+            positions = np.flatnonzero(counts)
+            overlap = counts[positions]
+        positions, overlap = self._ranked(positions, overlap)
+        return Ranking(self.ids[positions], overlap=overlap, likes=self.likes[positions])
+
+    def makeable(self, shelf, max_missing=0):
+        """Миксы, которым для приготовления из табаков `shelf` не хватает не больше `max_missing` табаков.
+
+        Миксы без единого табака с полки (в том числе без состава) не попадают в выдачу."""
+        matches = self._matches(shelf)
+        missing = self.sizes[:self.size] - matches
+        positions = np.flatnonzero((matches > 0) & (missing <= max_missing))
+        positions, spare = self._ranked(positions, max_missing - missing[positions])
+        return Ranking(self.ids[positions], missing=max_missing - spare, likes=self.likes[positions])
+
+
+class TobaccoMixIndex(WorkerIndex):
+    rebuild_interval_setting = 'CONTAINMENT_REBUILD_INTERVAL'
+    warm_on_startup_setting = 'CONTAINMENT_WARM_ON_STARTUP'
+
+    def build(self):
+        index = TobaccoMixes()
+        likes = dict(Mixes.objects.with_likes_count().values_list('pk', 'annotated_likes_count').iterator())
+        tobaccos = {}
+        for mix_id, tobacco_id in MixTobacco.objects.values_list('mix_id', 'tobacco_id').iterator():
+            tobaccos.setdefault(mix_id, []).append(tobacco_id)
+        for mix_id, count in likes.items():
+            index.set(mix_id, tobaccos.get(mix_id, ()), count)
+        return index
+
+    def refresh_mix(self, mix_id):
+        """Перечитывает состав и лайки микса; удалённый микс убирается из индекса."""
+        if self._state is None:
+            return
+        likes = list(Mixes.objects.filter(pk=mix_id).with_likes_count()
+                     .values_list('annotated_likes_count', flat=True))
+        if not likes:
+            self.update(TobaccoMixes.remove, mix_id)
+            return
+        tobaccos = MixTobacco.objects.filter(mix_id=mix_id).values_list('tobacco_id', flat=True)
+        self.update(TobaccoMixes.set, mix_id, list(tobaccos), likes[0] or 0)
+
+    def remove_mix(self, mix_id):
+        self.update(TobaccoMixes.remove, mix_id)
+
+    def add_likes(self, mix_id, delta):
+        self.update(TobaccoMixes.add_likes, mix_id, delta)
+
+    def search(self, tobacco_ids, mode=ALL):
+        return self.query(TobaccoMixes.search, tobacco_ids, mode)
+
+    def makeable(self, shelf, max_missing=0):
+        return self.query(TobaccoMixes.makeable, shelf, max_missing)
+
+
+tobacco_mixes = TobaccoMixIndex()
@@ -0,0 +1,81 @@
+"""Сверка денормализованных счётчиков лайков и избранного миксов."""
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from mixes.models import Mixes, MixLikes, MixFavorites, MixCounterShard
+
+COUNTER_SOURCES = {
+    'likes_count': MixLikes,
+    'favorites_count': MixFavorites,
+}
+
+
+def _iter_batches(queryset, batch_size):
+    """Отдаёт списки первичных ключей пачками, продвигаясь по ключу, а не по OFFSET."""
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def reconcile_counters(batch_size=1000):
+    """Пересчитывает счётчики по таблицам `app_mixlikes`/`app_mixfavorites`.
+
+    Миксы обрабатываются пачками: в одной транзакции строки миксов и их шарды
+    блокируются до подсчёта, счётчики выставляются в точные значения, а
+    удаляются только прочитанные шарды. Дельта лайка, который ждал блокировку
+    шарда, после транзакции попадёт в новый шард и не потеряется.
+    Возвращает количество исправленных миксов."""
+    fixed = 0
+    for pks in _iter_batches(Mixes.objects.all(), batch_size):
+        with transaction.atomic():
+            mixes = list(Mixes.objects.select_for_update().filter(pk__in=pks).only(*COUNTER_SOURCES))
+            shard_ids = list(MixCounterShard.objects.select_for_update().filter(mix_id__in=pks)
+                             .values_list('pk', flat=True))
+            totals = {
+                field: dict(model.objects.filter(mix_id__in=pks).order_by().values('mix')
+                            .annotate(total=Count('pk')).values_list('mix', 'total'))
+                for field, model in COUNTER_SOURCES.items()
+            }
+            changed = []
+            for mix in mixes:
+                dirty = False
+                for field in COUNTER_SOURCES:
+                    actual = totals[field].get(mix.pk, 0)
+                    if getattr(mix, field) != actual:
+                        setattr(mix, field, actual)
+                        dirty = True
+                if dirty:
+                    changed.append(mix)
+            if changed:
+                Mixes.objects.bulk_update(changed, list(COUNTER_SOURCES))
+            MixCounterShard.objects.filter(pk__in=shard_ids).delete()
+        fixed += len(changed)
+    return fixed
+
+
+def fold_counter_shards(batch_size=1000):
+    """Переносит накопленные в шардах дельты в колонки `Mixes` и удаляет шарды.
+
+    Возвращает количество обработанных миксов."""
+    folded = 0
+    mixes_with_shards = Mixes.objects.filter(pk__in=MixCounterShard.objects.values('mix'))
+    for pks in _iter_batches(mixes_with_shards, batch_size):
+        with transaction.atomic():
+            shards = MixCounterShard.objects.select_for_update().filter(mix_id__in=pks)
+            shard_ids = list(shards.values_list('pk', flat=True))
+            sums = (MixCounterShard.objects.filter(pk__in=shard_ids).order_by().values('mix')
+                    .annotate(**{f'delta_{field}': Sum(field) for field in COUNTER_SOURCES}))
+            for row in sums:
+                Mixes.objects.filter(pk=row['mix']).update(**{
+                    field: F(field) + row[f'delta_{field}'] for field in COUNTER_SOURCES
+                })
+            MixCounterShard.objects.filter(pk__in=shard_ids).delete()
+        folded += len(pks)
+    return folded
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from mixes.banners import process_banners, request_banner, run_until_idle
+from mixes.models import BannerGenerationStatus, Mixes
+
+
+class Command(BaseCommand):
+    help = "Разбирает очередь генерации баннеров миксов (Fusionbrain) до её опустошения"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help="Сначала поставить в очередь все миксы без баннера")
+        parser.add_argument('--limit', type=int, default=None, help="Сколько миксов без баннера поставить в очередь")
+        parser.add_argument('--once', action='store_true', help="Один проход воркера без ожидания")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            mixes = (Mixes.objects.filter(Q(banner='') | Q(banner__isnull=True))
+                     .exclude(banner_generation__status__in=[BannerGenerationStatus.QUEUED,
+                                                             BannerGenerationStatus.STARTING,
+                                                             BannerGenerationStatus.RUNNING])
+                     .order_by('created'))
+            if options['limit'] is not None:
+                mixes = mixes[:options['limit']]
+            queued = 0
+            for mix in list(mixes):
+                request_banner(mix)
+                queued += 1
+            self.stdout.write(f"Поставлено в очередь миксов: {queued}.")
+
+        if options['once']:
+            process_banners()
+        else:
+            run_until_idle()
+        self.stdout.write(self.style.SUCCESS("Очередь генерации баннеров разобрана."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from mixes.counters import fold_counter_shards, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики лайков и избранного миксов по таблицам app_mixlikes/app_mixfavorites"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Количество миксов в одной транзакции")
+        parser.add_argument('--fold-shards', action='store_true',
+                            help="Только свернуть шарды счётчиков в колонки миксов, без пересчёта")
+
+    def handle(self, *args, **options):
+        if options['fold_shards']:
+            folded = fold_counter_shards(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Свёрнуты шарды счётчиков для {folded} миксов."))
+            return
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Исправлены счётчики у {fixed} миксов."))
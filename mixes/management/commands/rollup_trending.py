@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from mixes.trending import rollup
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает трендовые оценки миксов по лайкам и избранному и удаляет затухшие"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Количество строк в одной вставке")
+
+    def handle(self, *args, **options):
+        total = rollup(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"В ленте трендов {total} миксов."))
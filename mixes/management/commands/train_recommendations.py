@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from mixes.recommendations import train
+
+
+class Command(BaseCommand):
+    help = "Обучает рекомендации миксов по лайкам и избранному: соседи миксов и списки пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Количество строк в одной вставке")
+
+    def handle(self, *args, **options):
+        mixes, users = train(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Обучены рекомендации: {mixes} миксов, {users} пользователей."))
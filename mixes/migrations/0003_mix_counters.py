@@ -0,0 +1,60 @@
+# Generated by Django 5.0 on 2026-10-17 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики по уже существующим лайкам и избранному."""
+    Mixes = apps.get_model('mixes', 'Mixes')
+    MixLikes = apps.get_model('mixes', 'MixLikes')
+    MixFavorites = apps.get_model('mixes', 'MixFavorites')
+
+    def total(model):
+        rows = model.objects.filter(mix=OuterRef('pk')).order_by().values('mix').annotate(
+            total=Count('pk')).values('total')
+        return Coalesce(Subquery(rows), Value(0))
+
+    Mixes.objects.update(likes_count=total(MixLikes), favorites_count=total(MixFavorites))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mixes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mixes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='mixes',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество лайков'),
+        ),
+        migrations.CreateModel(
+            name='MixCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер шарда')),
+                ('likes_count', models.IntegerField(default=0, verbose_name='Дельта лайков')),
+                ('favorites_count', models.IntegerField(default=0, verbose_name='Дельта избранного')),
+                ('mix', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='mixes.mixes', verbose_name='Микс')),
+            ],
+            options={
+                'verbose_name': 'Шард счётчиков микса',
+                'verbose_name_plural': 'Шарды счётчиков миксов',
+                'db_table': 'app_mixcountershard',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mixcountershard',
+            constraint=models.UniqueConstraint(fields=('mix', 'shard'), name='unique_mix_counter_shard'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-18 00:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mixes', '0004_banner_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BannerGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt_hash', models.CharField(max_length=64, unique=True, verbose_name='Хэш запроса')),
+                ('prompt', models.TextField(verbose_name='Запрос')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('running', 'генерируется'), ('done', 'готово'), ('failed', 'ошибка')], db_index=True, default='queued', max_length=10, verbose_name='Статус')),
+                ('upstream_id', models.CharField(blank=True, max_length=64, null=True, verbose_name='Идентификатор генерации в Fusionbrain')),
+                ('image', models.ImageField(blank=True, default=None, upload_to='banners/')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Опросов статуса')),
+                ('next_poll_at', models.DateTimeField(blank=True, null=True, verbose_name='Следующий опрос')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Генерация баннера',
+                'verbose_name_plural': 'Генерации баннеров',
+                'db_table': 'app_bannergeneration',
+            },
+        ),
+        migrations.AddField(
+            model_name='mixes',
+            name='banner_generation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mixes', to='mixes.bannergeneration', verbose_name='Генерация баннера'),
+        ),
+    ]
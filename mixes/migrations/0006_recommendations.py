@@ -0,0 +1,47 @@
+# Generated by Django 5.0 on 2026-10-18 00:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mixes', '0005_banner_generation'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendations',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendations', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('mixes', models.JSONField(default=list, verbose_name='Рекомендованные миксы')),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Рекомендации пользователя',
+                'verbose_name_plural': 'Рекомендации пользователей',
+                'db_table': 'app_userrecommendations',
+            },
+        ),
+        migrations.CreateModel(
+            name='MixNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Косинусное сходство')),
+                ('mix', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='mixes.mixes', verbose_name='Микс')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mixes.mixes', verbose_name='Соседний микс')),
+            ],
+            options={
+                'verbose_name': 'Соседний микс',
+                'verbose_name_plural': 'Соседние миксы',
+                'db_table': 'app_mixneighbor',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mixneighbor',
+            constraint=models.UniqueConstraint(fields=('mix', 'neighbor'), name='unique_mix_neighbor'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-18 00:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mixes', '0006_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MixTrending',
+            fields=[
+                ('mix', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='mixes.mixes', verbose_name='Микс')),
+                ('score', models.FloatField(verbose_name='Логарифм трендовой оценки')),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Трендовая оценка микса',
+                'verbose_name_plural': 'Трендовые оценки миксов',
+                'db_table': 'app_mixtrending',
+                'indexes': [models.Index(fields=['-score', '-mix'], name='mix_trending_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mixes', '0008_timeline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bannergeneration',
+            name='status',
+            field=models.CharField(choices=[('queued', 'в очереди'), ('starting', 'запускается'), ('running', 'генерируется'), ('done', 'готово'), ('failed', 'ошибка')], db_index=True, default='queued', max_length=10, verbose_name='Статус'),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import random
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 import uuid
 from bowls.models import Bowls
 from tastecategories.models import TasteCategories
@@ -18,11 +23,94 @@ class MixTasteType(models.TextChoices):
     FRESH = 'fresh', 'свежий'
 
 
+# Стабильный порядок списков миксов: по нему работает и курсорная пагинация
+MIX_LIST_ORDERING = ('-created', '-id')
+
+
+class MixesQuerySet(models.QuerySet):
+    """QuerySet миксов с заранее спланированными запросами для списков."""
+
+    def with_list_relations(self, with_bowl=False):
+        """Подгружает связи, которые отдают сериализаторы списков миксов.
+
+        Автор (и чаша) подтягиваются JOIN-ом, категории и табаки — двумя
+        prefetch-запросами на всю страницу, а не по запросу на каждый микс."""
+        related = ['author', 'bowl__bowl'] if with_bowl else ['author']
+        return self.select_related(*related).prefetch_related(
+            'categories',
+            Prefetch('compares', queryset=MixTobacco.objects.select_related('tobacco__manufacturer')),
+        )
+
+    def with_likes_count(self):
+        """Аннотирует `annotated_likes_count` из денормализованного счётчика.
+
+        В шардированном режиме к колонке прибавляется ещё не свёрнутая сумма шардов."""
+        if not settings.MIX_COUNTER_SHARDS:
+            return self.annotate(annotated_likes_count=F('likes_count'))
+        shards = MixCounterShard.objects.filter(mix=OuterRef('pk')).order_by().values('mix').annotate(
+            total=Sum('likes_count')).values('total')
+        return self.annotate(annotated_likes_count=F('likes_count') + Coalesce(Subquery(shards), Value(0)))
+
+    def with_viewer_flags(self, user):
+        """Аннотирует `annotated_is_liked` и `annotated_is_favorited` для текущего пользователя."""
+        if user is None or not user.is_authenticated:
+            return self.annotate(annotated_is_liked=Value(False), annotated_is_favorited=Value(False))
+        return self.annotate(
+            annotated_is_liked=Exists(MixLikes.objects.filter(mix=OuterRef('pk'), user=user)),
+            annotated_is_favorited=Exists(MixFavorites.objects.filter(mix=OuterRef('pk'), user=user)),
+        )
+
+    def for_list(self, user=None, with_bowl=False):
+        """Единый конвейер для списков миксов: связи, счётчики, флаги и стабильный порядок.
+
+        Страница любого размера обходится фиксированным числом запросов."""
+        return (self.with_list_relations(with_bowl=with_bowl)
+                .with_likes_count()
+                .with_viewer_flags(user)
+                .order_by(*MIX_LIST_ORDERING))
+
+    def liked_by(self, user):
+        """Миксы, лайкнутые пользователем, с временем лайка в `liked_at`."""
+        return self.filter(likes__user=user).annotate(liked_at=F('likes__created'))
+
+    def favorited_by(self, user):
+        """Миксы в избранном пользователя со временем добавления в `favorited_at`."""
+        return self.filter(favorites__user=user).annotate(favorited_at=F('favorites__created'))
+
+    def change_counter(self, mix_id, field, delta):
+        """Атомарно меняет счётчик `likes_count`/`favorites_count` микса на `delta`.
+
+        Изменение выполняется одним UPDATE с F-выражением, без чтения значения.
+        Если включён `MIX_COUNTER_SHARDS`, дельта пишется в случайный шард, чтобы
+        лайки популярного микса не упирались в блокировку одной строки."""
+        shards = settings.MIX_COUNTER_SHARDS
+        if shards:
+            shard = random.randrange(shards)
+            rows = MixCounterShard.objects.filter(mix_id=mix_id, shard=shard)
+            if rows.update(**{field: F(field) + delta}):
+                return
+            try:
+                with transaction.atomic():
+                    MixCounterShard.objects.create(mix_id=mix_id, shard=shard, **{field: delta})
+            except IntegrityError:
+                # Шард успел создать параллельный запрос
+                rows.update(**{field: F(field) + delta})
+            return
+        rows = self.filter(pk=mix_id)
+        if delta < 0:
+            # Счётчик беззнаковый: не уходим ниже нуля даже при рассинхроне
+            rows = rows.filter(**{f'{field}__gte': -delta})
+        rows.update(**{field: F(field) + delta})
+
+
 class Mixes(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField("Название", max_length=200, null=False)
     description = models.TextField("Описание", default=None, blank=True)
     banner = models.ImageField(default=None, blank=True)
+    # Заглушка баннера, пока клиент загружает изображение (заполняется после загрузки)
+    banner_blurhash = models.CharField("BlurHash баннера", max_length=64, null=True, blank=True, default=None)
+    banner_color = models.CharField("Преобладающий цвет баннера", max_length=7, null=True, blank=True, default=None)
     created = models.DateTimeField(auto_now_add=True)
 
     categories = models.ManyToManyField(TasteCategories, related_name='mixes')
@@ -34,40 +122,59 @@ class Mixes(models.Model):
         default=MixTasteType.EMPTY
     )
     author = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='mixes')
+    # Генерация баннера, которую микс ждёт (см. mixes/banners.py)
+    banner_generation = models.ForeignKey('BannerGeneration', on_delete=models.SET_NULL, null=True, blank=True,
+                                          related_name='mixes', verbose_name="Генерация баннера")
+
+    # Денормализованные счётчики, сверяются командой reconcile_mix_counters
+    likes_count = models.PositiveIntegerField("Количество лайков", default=0)
+    favorites_count = models.PositiveIntegerField("Количество добавлений в избранное", default=0)
+
+    objects = MixesQuerySet.as_manager()
 
     def total_likes(self):
         """Метод, который вернёт общее количество лайков для микса"""
-        return self.likes.count()
+        if not settings.MIX_COUNTER_SHARDS:
+            return self.likes_count
+        pending = self.counter_shards.aggregate(total=Sum('likes_count'))['total'] or 0
+        return self.likes_count + pending
 
     def add_like(self, user):
         """Метод `add_like` добавляет лайк к миксу от указанного пользователя.
         Если лайк уже существует, метод вернет существующий объект `Like`"""
-        like, created = MixLikes.objects.get_or_create(user=user, mix=self)
+        with transaction.atomic():
+            like, created = MixLikes.objects.get_or_create(user=user, mix=self)
+            if created:
+                Mixes.objects.change_counter(self.pk, 'likes_count', 1)
         return like
 
     def remove_like(self, user):
-        """Метод `remove_like` удаляет лайк от пользователя к миксу"""
-        try:
-            like = MixLikes.objects.get(user=user, mix=self)
-            like.delete()
-        except MixLikes.DoesNotExist:
-            pass
+        """Метод `remove_like` удаляет лайк от пользователя к миксу.
+        Возвращает True, если лайк был удалён"""
+        with transaction.atomic():
+            deleted, _ = MixLikes.objects.filter(user=user, mix=self).delete()
+            if deleted:
+                Mixes.objects.change_counter(self.pk, 'likes_count', -deleted)
+        return bool(deleted)
 
     def add_to_favorites(self, user):
         """Метод `add_to_favorites` принимает пользователя (`user`), который добавляет микс в избранное.
         Метод создает запись в модели `Favorite`, связывая пользователя и микс.
         Если запись уже существует, метод возвращает существующий объект `Favorite`."""
-        favorite, created = MixFavorites.objects.get_or_create(user=user, mix=self)
+        with transaction.atomic():
+            favorite, created = MixFavorites.objects.get_or_create(user=user, mix=self)
+            if created:
+                Mixes.objects.change_counter(self.pk, 'favorites_count', 1)
         return favorite
 
     def remove_from_favorites(self, user):
         """Метод `remove_from_favorites` удаляет запись из модели `Favorite`,
-        связанную с указанным пользователем и миксом"""
-        try:
-            favorite = MixFavorites.objects.get(user=user, mix=self)
-            favorite.delete()
-        except MixFavorites.DoesNotExist:
-            pass
+        связанную с указанным пользователем и миксом. Возвращает True, если запись была удалена"""
+        with transaction.atomic():
+            deleted, _ = MixFavorites.objects.filter(user=user, mix=self).delete()
+            if deleted:
+                Mixes.objects.change_counter(self.pk, 'favorites_count', -deleted)
+        return bool(deleted)
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -76,6 +183,10 @@ class Mixes(models.Model):
         verbose_name = "Микс"
         verbose_name_plural = "Миксы"
         db_table = "app_mixes"
+        indexes = [
+            # Последние миксы авторов для ленты подписок (слияние при чтении)
+            models.Index(fields=['author', '-created', '-id'], name='mix_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -180,3 +291,180 @@ class MixFavorites(models.Model):
         verbose_name = "Избранный микс"
         verbose_name_plural = "Избранные миксы"
         db_table = "app_mixfavorites"
+
+
+class MixCounterShard(models.Model):
+    """Шард счётчиков микса: накапливает дельты лайков и избранного.
+
+    Используется только при `MIX_COUNTER_SHARDS > 0`; команда
+    `reconcile_mix_counters --fold-shards` переносит суммы в колонки `Mixes`."""
+    mix = models.ForeignKey(
+        Mixes,
+        on_delete=models.CASCADE,
+        verbose_name="Микс",
+        related_name="counter_shards")
+
+    shard = models.PositiveSmallIntegerField(verbose_name="Номер шарда")
+    likes_count = models.IntegerField(verbose_name="Дельта лайков", default=0)
+    favorites_count = models.IntegerField(verbose_name="Дельта избранного", default=0)
+
+    class Meta:
+        verbose_name = "Шард счётчиков микса"
+        verbose_name_plural = "Шарды счётчиков миксов"
+        db_table = "app_mixcountershard"
+        constraints = [
+            models.UniqueConstraint(fields=['mix', 'shard'], name='unique_mix_counter_shard'),
+        ]
+
+
+class BannerGenerationStatus(models.TextChoices):
+    """Состояния генерации баннера."""
+    QUEUED = 'queued', 'в очереди'
+    STARTING = 'starting', 'запускается'
+    RUNNING = 'running', 'генерируется'
+    DONE = 'done', 'готово'
+    FAILED = 'failed', 'ошибка'
+
+
+class BannerGeneration(models.Model):
+    """Генерация баннера в Fusionbrain для одного текста запроса.
+
+    Одинаковые запросы дают одну запись (`prompt_hash`), поэтому готовое
+    изображение переиспользуется всеми миксами с тем же запросом."""
+    prompt_hash = models.CharField("Хэш запроса", max_length=64, unique=True)
+    prompt = models.TextField("Запрос")
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=10,
+        choices=BannerGenerationStatus.choices,
+        default=BannerGenerationStatus.QUEUED,
+        db_index=True
+    )
+    upstream_id = models.CharField("Идентификатор генерации в Fusionbrain", max_length=64, null=True, blank=True)
+    image = models.ImageField(upload_to='banners/', default=None, blank=True)
+    attempts = models.PositiveIntegerField("Опросов статуса", default=0)
+    # Для запускаемой генерации — срок, после которого её может забрать другой воркер
+    next_poll_at = models.DateTimeField("Следующий опрос", null=True, blank=True)
+    error = models.TextField("Ошибка", default='', blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Генерация баннера"
+        verbose_name_plural = "Генерации баннеров"
+        db_table = "app_bannergeneration"
+
+    def __str__(self):
+        return self.prompt
+
+
+class MixNeighbor(models.Model):
+    """Похожий по лайкам микс: строка модели item-item рекомендаций.
+
+    Пересобирается целиком пакетным обучением (`mixes/recommendations.py`),
+    для каждого микса хранится не больше `RECOMMENDATIONS_NEIGHBORS` соседей."""
+    mix = models.ForeignKey(
+        Mixes,
+        on_delete=models.CASCADE,
+        verbose_name="Микс",
+        related_name="neighbors")
+    neighbor = models.ForeignKey(
+        Mixes,
+        on_delete=models.CASCADE,
+        verbose_name="Соседний микс",
+        related_name="+")
+    score = models.FloatField("Косинусное сходство")
+
+    class Meta:
+        verbose_name = "Соседний микс"
+        verbose_name_plural = "Соседние миксы"
+        db_table = "app_mixneighbor"
+        constraints = [
+            models.UniqueConstraint(fields=['mix', 'neighbor'], name='unique_mix_neighbor'),
+        ]
+
+
+class UserRecommendations(models.Model):
+    """Готовый список рекомендованных миксов пользователя: читается одной строкой по ключу."""
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Пользователь",
+        related_name="recommendations")
+    # Пары [id микса, оценка] по убыванию оценки
+    mixes = models.JSONField("Рекомендованные миксы", default=list)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Рекомендации пользователя"
+        verbose_name_plural = "Рекомендации пользователей"
+        db_table = "app_userrecommendations"
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class MixTrending(models.Model):
+    """Трендовая оценка микса: затухающая со временем сумма лайков и добавлений в избранное.
+
+    В `score` хранится логарифм суммы `вес · 2^((t - TRENDING_EPOCH) / TRENDING_HALF_LIFE)`:
+    затухание у всех миксов одинаковое, поэтому порядок по `score` не меняется
+    со временем и индекс по нему сразу отдаёт ленту трендов (`mixes/trending.py`)."""
+    mix = models.OneToOneField(
+        Mixes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Микс",
+        related_name="trending")
+    score = models.FloatField("Логарифм трендовой оценки")
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Трендовая оценка микса"
+        verbose_name_plural = "Трендовые оценки миксов"
+        db_table = "app_mixtrending"
+        indexes = [
+            models.Index(fields=['-score', '-mix'], name='mix_trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.mix_id)
+
+
+class TimelineEntry(models.Model):
+    """Строка домашней ленты: микс автора, на которого подписан пользователь.
+
+    Заполняется фоновыми задачами рассылки при записи (`mixes/timeline.py`),
+    `created` повторяет дату создания микса."""
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="timeline")
+    mix = models.ForeignKey(
+        Mixes,
+        on_delete=models.CASCADE,
+        verbose_name="Микс",
+        related_name="+")
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+        related_name="+")
+    created = models.DateTimeField("Дата создания микса")
+
+    class Meta:
+        verbose_name = "Строка ленты подписок"
+        verbose_name_plural = "Лента подписок"
+        db_table = "app_timelineentry"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'mix'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created', '-mix'], name='timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.mix_id}'
@@ -0,0 +1,239 @@
+"""Табаки, которые часто сочетают с выбранными: совместная встречаемость в составах миксов.
+
+Разреженная матрица табак × табак хранит, в скольких миксах встречается
+каждая пара табаков, а вектор частот — в скольких миксах есть каждый
+табак. Сила пары — PMI: log(N·C[a, b] / (F[a]·F[b])), где N — число миксов
+с составом; lift пары — это exp(PMI), порядок у них одинаковый. Правка
+состава микса вычитает пары старого состава и прибавляет пары нового,
+поэтому матрица не пересобирается на каждое изменение.
+
+Подбор к нескольким табакам складывает строки выбранных табаков: строки
+склеиваются в один массив и суммируются `bincount` по столбцам, в сумму
+входят только положительные PMI. Пары, встреченные реже
+`PAIRING_MIN_SUPPORT` раз, не учитываются — у редких пар PMI завышен.
+
+Матрица сохраняется на диск (`PAIRING_SNAPSHOT_PATH`): новый воркер
+загружает свежий снимок вместо чтения всей таблицы `app_mixtobacco`."""
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+from mixes.models import Mixes, MixTobacco
+from utils.worker_index import WorkerIndex
+
+logger = logging.getLogger(__name__)
+
+# Версия формата снимка на диске: снимок другой версии игнорируется
+SNAPSHOT_FORMAT = 1
+
+
+class TobaccoPairs:
+    """Частоты табаков, матрица совместной встречаемости и составы миксов.
+
+    Табакам выдаются плотные коды: строка матрицы — словарь `код -> число миксов`."""
+
+    def __init__(self):
+        self.codes = {}  # id табака -> код
+        self.ids = []  # код -> id табака
+        self.freq = np.zeros(0, dtype=np.int64)  # код -> число миксов с табаком
+        self.total = 0  # число миксов с непустым составом
+        self.rows = []  # код -> {код: число миксов с парой}
+        self.mixes = {}  # id микса -> коды его табаков
+        self._arrays = {}  # код -> (столбцы, значения) строки в NumPy
+        self._keys = None  # код -> строковый id табака, для стабильного порядка выдачи
+
+    def __len__(self):
+        return len(self.mixes)
+
+    def _code(self, tobacco_id):
+        code = self.codes.get(tobacco_id)
+        if code is None:
+            code = self.codes[tobacco_id] = len(self.ids)
+            self.ids.append(tobacco_id)
+            self.rows.append({})
+            if code >= len(self.freq):
+                grown = np.zeros(max(code + 1, len(self.freq) * 2, 256), dtype=np.int64)
+                grown[:len(self.freq)] = self.freq
+                self.freq = grown
+            self._keys = None
+        return code
+
+    def _apply(self, codes, sign):
+        if not codes:
+            return
+        self.total += sign
+        for code in codes:
+            self.freq[code] += sign
+            row = self.rows[code]
+            for other in codes:
+                if other == code:
+                    continue
+                count = row.get(other, 0) + sign
+                if count:
+                    row[other] = count
+                else:
+                    row.pop(other, None)
+            self._arrays.pop(code, None)
+
+    def set(self, mix_id, tobacco_ids):
+        """Добавляет микс или заменяет его состав."""
+        codes = tuple(sorted({self._code(tobacco_id) for tobacco_id in tobacco_ids}))
+        old = self.mixes.get(mix_id, ())
+        if codes == old:
+            return
+        self._apply(old, -1)
+        self._apply(codes, 1)
+        if codes:
+            self.mixes[mix_id] = codes
+        else:
+            self.mixes.pop(mix_id, None)
+
+    def remove(self, mix_id):
+        self._apply(self.mixes.pop(mix_id, ()), -1)
+
+    def _row_arrays(self, code):
+        arrays = self._arrays.get(code)
+        if arrays is None:
+            row = self.rows[code]
+            arrays = (np.fromiter(row.keys(), dtype=np.int64, count=len(row)),
+                      np.fromiter(row.values(), dtype=np.int64, count=len(row)))
+            self._arrays[code] = arrays
+        return arrays
+
+    def keys(self):
+        if self._keys is None:
+            self._keys = np.array([str(tobacco_id) for tobacco_id in self.ids], dtype='<U36')
+        return self._keys
+
+    def pairs(self, tobacco_ids, limit, min_support=1):
+        """Лучшие `limit` табаков к набору: список `(id табака, сумма PMI, число миксов с парами)`."""
+        picks = sorted({self.codes[tobacco_id] for tobacco_id in tobacco_ids if tobacco_id in self.codes})
+        if not picks or limit <= 0:
+            return []
+        arrays = [self._row_arrays(code) for code in picks]
+        columns = np.concatenate([row_columns for row_columns, _ in arrays])
+        counts = np.concatenate([row_counts for _, row_counts in arrays])
+        pick_freq = np.repeat(self.freq[picks], [len(row_columns) for row_columns, _ in arrays])
+        supported = counts >= min_support
+        columns, counts, pick_freq = columns[supported], counts[supported], pick_freq[supported]
+
+        pmi = np.log(self.total * counts / (pick_freq * self.freq[columns]).astype(np.float64))
+        size = len(self.ids)
+        scores = np.bincount(columns, weights=np.maximum(pmi, 0), minlength=size)
+        together = np.bincount(columns, weights=counts, minlength=size).astype(np.int64)
+        scores[picks] = 0
+        candidates = np.flatnonzero(scores > 0)
+        order = np.lexsort((self.keys()[candidates], -together[candidates], -scores[candidates]))[:limit]
+        return [(self.ids[code], float(scores[code]), int(together[code])) for code in candidates[order]]
+
+    def save(self, path):
+        """Атомарно записывает снимок в `path` (`.npz`)."""
+        rows = [np.full(len(row), code, dtype=np.int64) for code, row in enumerate(self.rows)]
+        mix_codes = list(self.mixes.values())
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(
+                    file,
+                    format=np.array(SNAPSHOT_FORMAT),
+                    total=np.array(self.total),
+                    tobaccos=np.array([str(tobacco_id) for tobacco_id in self.ids], dtype='<U36'),
+                    freq=self.freq[:len(self.ids)],
+                    pair_rows=np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+                    pair_columns=np.fromiter((code for row in self.rows for code in row), dtype=np.int64),
+                    pair_counts=np.fromiter((count for row in self.rows for count in row.values()), dtype=np.int64),
+                    mixes=np.array([str(mix_id) for mix_id in self.mixes], dtype='<U36'),
+                    mix_sizes=np.array([len(codes) for codes in mix_codes], dtype=np.int64),
+                    mix_codes=np.fromiter((code for codes in mix_codes for code in codes), dtype=np.int64),
+                )
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Снимок из файла или None, если файла нет или он другого формата."""
+        try:
+            data = np.load(path)
+        except (OSError, ValueError):
+            return None
+        with data:
+            if 'format' not in data or int(data['format']) != SNAPSHOT_FORMAT:
+                return None
+            state = cls()
+            for tobacco_id in data['tobaccos'].tolist():
+                state._code(uuid.UUID(tobacco_id))
+            state.total = int(data['total'])
+            state.freq[:len(state.ids)] = data['freq']
+            pair_rows, pair_columns, pair_counts = data['pair_rows'], data['pair_columns'], data['pair_counts']
+            bounds = np.searchsorted(pair_rows, np.arange(len(state.ids) + 1))
+            for code in range(len(state.ids)):
+                part = slice(bounds[code], bounds[code + 1])
+                state.rows[code] = dict(zip(pair_columns[part].tolist(), pair_counts[part].tolist()))
+            mix_bounds = np.concatenate(([0], np.cumsum(data['mix_sizes']))).tolist()
+            mix_codes = data['mix_codes'].tolist()
+            for index, mix_id in enumerate(data['mixes'].tolist()):
+                state.mixes[uuid.UUID(mix_id)] = tuple(mix_codes[mix_bounds[index]:mix_bounds[index + 1]])
+        return state
+
+
+class TobaccoPairsIndex(WorkerIndex):
+    rebuild_interval_setting = 'PAIRING_REBUILD_INTERVAL'
+    warm_on_startup_setting = 'PAIRING_WARM_ON_STARTUP'
+
+    def build(self):
+        path = settings.PAIRING_SNAPSHOT_PATH
+        if self._state is None and path:
+            # Первая сборка в воркере: свежий снимок с диска вместо чтения всей таблицы составов
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except OSError:
+                age = None
+            if age is not None and age < (self.rebuild_interval or float('inf')):
+                state = TobaccoPairs.load(path)
+                if state is not None:
+                    return state
+        return self.save_snapshot()
+
+    def save_snapshot(self):
+        """Собирает матрицу по базе и сохраняет её на диск; возвращает собранное состояние."""
+        state = TobaccoPairs()
+        compositions = {}
+        for mix_id, tobacco_id in MixTobacco.objects.values_list('mix_id', 'tobacco_id').iterator():
+            compositions.setdefault(mix_id, []).append(tobacco_id)
+        for mix_id, tobacco_ids in compositions.items():
+            state.set(mix_id, tobacco_ids)
+        path = settings.PAIRING_SNAPSHOT_PATH
+        if path:
+            try:
+                state.save(path)
+            except OSError:
+                logger.exception("Не удалось сохранить снимок пар табаков в %s", path)
+        return state
+
+    def refresh_mix(self, mix_id):
+        """Перечитывает состав микса; удалённый микс убирается из матрицы."""
+        if self._state is None:
+            return
+        if not Mixes.objects.filter(pk=mix_id).exists():
+            self.update(TobaccoPairs.remove, mix_id)
+            return
+        tobacco_ids = MixTobacco.objects.filter(mix_id=mix_id).values_list('tobacco_id', flat=True)
+        self.update(TobaccoPairs.set, mix_id, list(tobacco_ids))
+
+    def remove_mix(self, mix_id):
+        self.update(TobaccoPairs.remove, mix_id)
+
+    def pairs(self, tobacco_ids, limit=10):
+        return self.query(TobaccoPairs.pairs, tobacco_ids, limit, settings.PAIRING_MIN_SUPPORT)
+
+
+tobacco_pairs = TobaccoPairsIndex()
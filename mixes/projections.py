@@ -0,0 +1,102 @@
+"""Проекции списков миксов из `values()` без сериализаторов.
+
+`project_mixes` собирает тот же ответ, что `MixesListSerializer` (или
+`MixesSerializer` при `with_bowl=True`) для выборки `Mixes.objects.for_list()`:
+колонки микса, автора и чаши приходят одной строкой JOIN-а, категории и
+табаки страницы — двумя запросами, как при prefetch."""
+from bowls.models import Bowls
+from mixes.models import Mixes, MixTobacco
+from tastecategories.models import TasteCategories
+from tobaccos.projections import project_tobacco, tobacco_list_fields
+from users.projections import project_user, user_fields
+from utils.projections import datetime_repr, file_url, ordering_fields, storage_of, uuid_repr, variant_url
+
+MIX_FIELDS = (
+    'id', 'name', 'description', 'banner', 'banner_blurhash', 'banner_color', 'created',
+    'annotated_likes_count', 'annotated_is_liked', 'annotated_is_favorited',
+)
+AUTHOR_PREFIX = 'author__'
+BOWL_PREFIX = 'bowl__bowl__'
+BOWL_FIELDS = ('id', 'type', 'description', 'howTo', 'image')
+GOODS_PREFIX = 'tobacco__'
+
+
+def mix_list_fields(with_bowl=False):
+    fields = MIX_FIELDS + user_fields(AUTHOR_PREFIX)
+    if with_bowl:
+        fields += tuple(BOWL_PREFIX + field for field in BOWL_FIELDS)
+    return fields
+
+
+def mix_list_values(queryset, ordering=(), with_bowl=False):
+    """Строки миксов для `project_mixes` из выборки `for_list()`; поля порядка — для курсора."""
+    fields = mix_list_fields(with_bowl)
+    return queryset.prefetch_related(None).values(*fields, *ordering_fields(ordering, fields))
+
+
+def _categories_by_mix(mix_ids):
+    categories = {mix_id: [] for mix_id in mix_ids}
+    rows = TasteCategories.objects.filter(mixes__in=mix_ids).values_list('mixes__id', 'id', 'name')
+    for mix_id, category_id, name in rows:
+        categories[mix_id].append({'id': uuid_repr(category_id), 'name': name})
+    return categories
+
+
+def _goods_by_mix(mix_ids, request):
+    goods = {mix_id: [] for mix_id in mix_ids}
+    rows = MixTobacco.objects.filter(mix__in=mix_ids).values('mix_id', 'weight', *tobacco_list_fields(GOODS_PREFIX))
+    for row in rows:
+        goods[row['mix_id']].append({
+            'tobacco': project_tobacco(row, request, prefix=GOODS_PREFIX),
+            'weight': row['weight'],
+        })
+    return goods
+
+
+def _project_bowl(row, request):
+    if row[BOWL_PREFIX + 'id'] is None:
+        return None
+    storage = storage_of(Bowls, 'image')
+    image = row[BOWL_PREFIX + 'image']
+    return {
+        'id': uuid_repr(row[BOWL_PREFIX + 'id']),
+        'type': row[BOWL_PREFIX + 'type'],
+        'description': row[BOWL_PREFIX + 'description'],
+        'howTo': row[BOWL_PREFIX + 'howTo'],
+        'image': file_url(storage, image, request),
+        'thumbnail': variant_url(storage, image, 'thumb', request),
+    }
+
+
+def project_mixes(rows, request=None, with_bowl=False):
+    """Представления миксов страницы как у `MixesListSerializer` / `MixesSerializer`."""
+    rows = list(rows)
+    if not rows:
+        return []
+    mix_ids = [row['id'] for row in rows]
+    categories = _categories_by_mix(mix_ids)
+    goods = _goods_by_mix(mix_ids, request)
+    banner_storage = storage_of(Mixes, 'banner')
+
+    result = []
+    for row in rows:
+        item = {
+            'id': uuid_repr(row['id']),
+            'name': row['name'],
+            'description': row['description'],
+            'banner': file_url(banner_storage, row['banner'], request),
+            'bannerThumbnail': variant_url(banner_storage, row['banner'], 'thumb', request),
+            'bannerBlurhash': row['banner_blurhash'],
+            'bannerColor': row['banner_color'],
+            'created': datetime_repr(row['created']),
+            'likesCount': row['annotated_likes_count'],
+            'isLiked': row['annotated_is_liked'],
+            'isFavorited': row['annotated_is_favorited'],
+            'categories': categories[row['id']],
+            'goods': goods[row['id']],
+        }
+        if with_bowl:
+            item['bowl'] = _project_bowl(row, request)
+        item['author'] = None if row[AUTHOR_PREFIX + 'id'] is None else project_user(row, request, AUTHOR_PREFIX)
+        result.append(item)
+    return result
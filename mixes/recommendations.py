@@ -0,0 +1,219 @@
+"""Рекомендации «для вас»: item-item коллаборативная фильтрация по лайкам и избранному.
+
+Пакетное обучение (`train`) делает снимок таблиц `app_mixlikes` и
+`app_mixfavorites` в плотные массивы NumPy: пары (пользователь, микс) с
+весом (лайк и избранное складываются). По ним для каждого микса считаются
+`RECOMMENDATIONS_NEIGHBORS` соседей по косинусному сходству столбцов матрицы
+пользователь × микс, соседи сохраняются в `MixNeighbor`, а готовые списки
+пользователей — в `UserRecommendations`, одной строкой на пользователя.
+
+Оценка микса для пользователя — сумма сходств с его миксами, взвешенная
+весами взаимодействий. Когда пользователь ставит или снимает лайк, его
+список пересчитывается отдельной задачей (`refresh_user`) по уже
+сохранённым соседям, без повторного обучения."""
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.registry import enqueue
+from mixes.models import MixFavorites, MixLikes, MixNeighbor, UserRecommendations
+
+logger = logging.getLogger(__name__)
+
+
+class Interactions:
+    """Снимок взаимодействий: пары (пользователь, микс) с весами, упорядоченные по пользователю.
+
+    Пользователи и миксы пронумерованы плотно: `users[код]` и `items[код]` — исходные id."""
+
+    def __init__(self, users, items, user_codes, item_codes, weights):
+        self.users = users
+        self.items = items
+        self.user_codes = user_codes
+        self.item_codes = item_codes
+        self.weights = weights
+        # Границы пар каждого пользователя, как indptr у CSR-матрицы
+        self.user_indptr = np.searchsorted(user_codes, np.arange(len(users) + 1))
+
+    def user_slice(self, user_code):
+        return slice(self.user_indptr[user_code], self.user_indptr[user_code + 1])
+
+
+def _interaction_rows(user_id=None):
+    sources = ((MixLikes, settings.RECOMMENDATIONS_LIKE_WEIGHT),
+               (MixFavorites, settings.RECOMMENDATIONS_FAVORITE_WEIGHT))
+    for model, weight in sources:
+        queryset = model.objects.all() if user_id is None else model.objects.filter(user_id=user_id)
+        for user, mix, created in queryset.values_list('user_id', 'mix_id', 'created').iterator():
+            yield user, mix, weight, created.timestamp()
+
+
+def snapshot(user_id=None, max_user_items=None):
+    """Читает лайки и избранное (всех или одного пользователя) в `Interactions`.
+
+    У каждого пользователя остаются `max_user_items` самых свежих миксов: активные
+    пользователи не раздувают квадратичный подсчёт совпадений."""
+    max_user_items = max_user_items or settings.RECOMMENDATIONS_MAX_USER_ITEMS
+    user_index, item_index = {}, {}
+    user_codes, item_codes, weights, times = [], [], [], []
+    for user, mix, weight, created in _interaction_rows(user_id):
+        user_codes.append(user_index.setdefault(user, len(user_index)))
+        item_codes.append(item_index.setdefault(mix, len(item_index)))
+        weights.append(weight)
+        times.append(created)
+
+    # Лайк и избранное одного микса — одна пара с суммарным весом и временем последнего действия
+    pairs = np.array(user_codes, dtype=np.int64) * max(len(item_index), 1) + np.array(item_codes, dtype=np.int64)
+    pairs, inverse = np.unique(pairs, return_inverse=True)
+    pair_weights = np.bincount(inverse, weights=np.array(weights, dtype=np.float64), minlength=len(pairs))
+    pair_times = np.full(len(pairs), -np.inf)
+    np.maximum.at(pair_times, inverse, np.array(times, dtype=np.float64))
+    pair_users, pair_items = np.divmod(pairs, max(len(item_index), 1))
+
+    order = np.lexsort((-pair_times, pair_users))
+    pair_users, pair_items, pair_weights = pair_users[order], pair_items[order], pair_weights[order]
+    starts = np.searchsorted(pair_users, pair_users)
+    keep = np.arange(len(pair_users)) - starts < max_user_items
+    return Interactions(list(user_index), list(item_index), pair_users[keep], pair_items[keep],
+                        pair_weights[keep].astype(np.float32))
+
+
+def _ragged_arange(starts, lengths):
+    """Склеенные `arange(start, start + length)` для всех отрезков, без цикла Python."""
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(total) + offsets
+
+
+def item_neighbors(interactions, neighbors=None, max_item_users=None):
+    """Ближайшие по косинусному сходству миксы: матрицы кодов (-1 — пусто) и сходств `n_items × neighbors`.
+
+    Для микса `i` складываются совпадения по всем его пользователям:
+    C[i, j] = Σ w[u, i]·w[u, j], сходство — C[i, j] / √(‖i‖²·‖j‖²). У очень
+    популярных миксов берётся `max_item_users` пользователей."""
+    neighbors = neighbors or settings.RECOMMENDATIONS_NEIGHBORS
+    max_item_users = max_item_users or settings.RECOMMENDATIONS_MAX_ITEM_USERS
+    items, users, weights = interactions.item_codes, interactions.user_codes, interactions.weights
+    n_items = len(interactions.items)
+    norms = np.bincount(items, weights=weights.astype(np.float64) ** 2, minlength=n_items)
+    by_item = np.argsort(items, kind='stable')
+    item_indptr = np.searchsorted(items[by_item], np.arange(n_items + 1))
+    user_indptr = interactions.user_indptr
+
+    codes = np.full((n_items, neighbors), -1, dtype=np.int64)
+    scores = np.zeros((n_items, neighbors), dtype=np.float32)
+    for item in range(n_items):
+        rows = by_item[item_indptr[item]:item_indptr[item + 1]][:max_item_users]
+        starts = user_indptr[users[rows]]
+        lengths = user_indptr[users[rows] + 1] - starts
+        co_rows = _ragged_arange(starts, lengths)
+        co_items, inverse = np.unique(items[co_rows], return_inverse=True)
+        co_values = np.bincount(inverse, weights=weights[co_rows] * np.repeat(weights[rows], lengths))
+        own = co_items != item
+        co_items, co_values = co_items[own], co_values[own]
+        similarity = co_values / np.sqrt(norms[item] * norms[co_items])
+        if len(co_items) > neighbors:
+            top = np.argpartition(-similarity, neighbors - 1)[:neighbors]
+            co_items, similarity = co_items[top], similarity[top]
+        order = np.argsort(-similarity, kind='stable')
+        codes[item, :len(order)] = co_items[order]
+        scores[item, :len(order)] = similarity[order]
+    return codes, scores
+
+
+def top_recommendations(weights, neighbor_codes, neighbor_scores, exclude, limit):
+    """Лучшие `limit` кодов по сумме взвешенных сходств соседей; `exclude` — уже знакомые миксы."""
+    candidates = neighbor_codes.ravel()
+    values = (neighbor_scores * weights[:, None]).ravel()
+    present = candidates >= 0
+    candidates, inverse = np.unique(candidates[present], return_inverse=True)
+    totals = np.bincount(inverse, weights=values[present], minlength=len(candidates))
+    fresh = ~np.isin(candidates, exclude)
+    candidates, totals = candidates[fresh], totals[fresh]
+    if len(candidates) > limit:
+        top = np.argpartition(-totals, limit - 1)[:limit]
+        candidates, totals = candidates[top], totals[top]
+    order = np.lexsort((candidates, -totals))
+    return candidates[order], totals[order]
+
+
+def _packed(mix_ids, totals):
+    return [[str(mix_id), round(float(total), 4)] for mix_id, total in zip(mix_ids, totals)]
+
+
+def train(batch_size=1000):
+    """Полное обучение: соседи миксов и списки всех пользователей. Возвращает (миксов, пользователей)."""
+    started = timezone.now()
+    interactions = snapshot()
+    codes, scores = item_neighbors(interactions)
+    items = np.array(interactions.items, dtype=object)
+    limit = settings.RECOMMENDATIONS_PER_USER
+
+    neighbor_rows = [
+        MixNeighbor(mix_id=interactions.items[item], neighbor_id=items[code], score=float(score))
+        for item in range(len(items))
+        for code, score in zip(codes[item], scores[item]) if code >= 0
+    ]
+    user_rows = []
+    for user in range(len(interactions.users)):
+        own = interactions.item_codes[interactions.user_slice(user)]
+        weights = interactions.weights[interactions.user_slice(user)]
+        recommended, totals = top_recommendations(weights, codes[own], scores[own], own, limit)
+        if len(recommended):
+            user_rows.append(UserRecommendations(user_id=interactions.users[user],
+                                                 mixes=_packed(items[recommended], totals)))
+
+    # Замена целиком в одной транзакции: читатели видят либо старую модель, либо новую
+    with transaction.atomic():
+        MixNeighbor.objects.all().delete()
+        MixNeighbor.objects.bulk_create(neighbor_rows, batch_size=batch_size)
+        # Пользователи, чьи лайки изменились во время обучения, пересчитываются своими задачами
+        UserRecommendations.objects.filter(updated__lt=started).delete()
+        fresh = set(UserRecommendations.objects.values_list('user_id', flat=True))
+        UserRecommendations.objects.bulk_create([row for row in user_rows if row.user_id not in fresh],
+                                                batch_size=batch_size)
+    logger.info("Рекомендации обучены: %s миксов, %s пользователей за %.1f с", len(items), len(user_rows),
+                (timezone.now() - started).total_seconds())
+    return len(items), len(user_rows)
+
+
+def refresh_user(user_id):
+    """Пересчитывает список пользователя по сохранённым соседям миксов."""
+    interactions = snapshot(user_id=user_id)
+    if not interactions.users:
+        UserRecommendations.objects.filter(user_id=user_id).delete()
+        return []
+    own_ids = interactions.items
+    rows = MixNeighbor.objects.filter(mix_id__in=own_ids).values_list('mix_id', 'neighbor_id', 'score')
+    vocabulary = {mix_id: code for code, mix_id in enumerate(own_ids)}
+    neighbors = {}
+    for mix_id, neighbor_id, score in rows:
+        neighbors.setdefault(mix_id, []).append((vocabulary.setdefault(neighbor_id, len(vocabulary)), score))
+
+    width = max((len(value) for value in neighbors.values()), default=0)
+    codes = np.full((len(own_ids), width), -1, dtype=np.int64)
+    scores = np.zeros((len(own_ids), width), dtype=np.float32)
+    for row, mix_id in enumerate(own_ids):
+        for column, (code, score) in enumerate(neighbors.get(mix_id, ())):
+            codes[row, column], scores[row, column] = code, score
+    own = interactions.item_codes
+    recommended, totals = top_recommendations(interactions.weights, codes[own], scores[own],
+                                              np.arange(len(own_ids)), settings.RECOMMENDATIONS_PER_USER)
+    by_code = list(vocabulary)
+    packed = _packed([by_code[code] for code in recommended], totals)
+    UserRecommendations.objects.update_or_create(user_id=user_id, defaults={'mixes': packed})
+    return packed
+
+
+def schedule_refresh(user_id, now=None):
+    """Ставит пересчёт списка пользователя; действия в пределах `RECOMMENDATIONS_REFRESH_DELAY` схлопываются."""
+    now = now or timezone.now()
+    delay = settings.RECOMMENDATIONS_REFRESH_DELAY
+    slot = int(now.timestamp() // delay)
+    return enqueue('mixes.refresh_recommendations', [str(user_id)],
+                   run_at=now + timedelta(seconds=delay - now.timestamp() % delay),
+                   dedupe_key=f'recommendations:{user_id}:{slot}')
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from utils.to_camel_case import to_camel_case
+from utils.media import ImageVariantField, MediaURLSerializerMixin
+from utils.to_camel_case import CamelCaseSerializerMixin
 from .models import Mixes, MixTobacco, MixBowl
 from tobaccos.serializers import TobaccosSerializer, TobaccosListSerializer, TobaccosDetailSerializer
 from bowls.serializers import BowlsSerializer
@@ -48,13 +49,42 @@ class MixBowlSerializer(serializers.ModelSerializer):
         return bowl_data
 
 
-class MixesListSerializer(serializers.ModelSerializer):
-    categories = TasteCategoriesSerializer(many=True, read_only=True)
+class MixInteractionsMixin(serializers.Serializer):
+    """Лайки и избранное микса: значения из аннотаций `Mixes.objects.for_list()`, без них — запросом."""
     likes_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
+
+    def get_likes_count(self, obj):
+        # Аннотация из Mixes.objects.for_list() избавляет от COUNT на каждый микс
+        annotated = getattr(obj, 'annotated_likes_count', None)
+        return annotated if annotated is not None else obj.total_likes()
+
+    def get_is_liked(self, obj):
+        annotated = getattr(obj, 'annotated_is_liked', None)
+        if annotated is not None:
+            return annotated
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return obj.likes.filter(user=request.user).exists()
+        return False
+
+    def get_is_favorited(self, obj):
+        annotated = getattr(obj, 'annotated_is_favorited', None)
+        if annotated is not None:
+            return annotated
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return obj.favorites.filter(user=request.user).exists()
+        return False
+
+
+class MixesListSerializer(CamelCaseSerializerMixin, MediaURLSerializerMixin, MixInteractionsMixin,
+                          serializers.ModelSerializer):
+    categories = TasteCategoriesSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     goods = MixTobaccoListSerializer(source='compares', many=True, read_only=True)
+    banner_thumbnail = ImageVariantField('thumb', source='banner')  # Миниатюра WebP для списков
 
     class Meta:
         model = Mixes
@@ -63,6 +93,9 @@ class MixesListSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'banner',
+            'banner_thumbnail',
+            'banner_blurhash',
+            'banner_color',
             'created',
             'likes_count',
             'is_liked',
@@ -72,111 +105,40 @@ class MixesListSerializer(serializers.ModelSerializer):
             'author'
         ]
 
-    def get_likes_count(self, obj):
-        return obj.total_likes()
-
-    def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(user=request.user).exists()
-        return False
-
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorites.filter(user=request.user).exists()
-        return False
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        camel_case_representation = {}
-        for key, value in representation.items():
-            camel_case_key = to_camel_case(key)
-            camel_case_representation[camel_case_key] = value
-        return camel_case_representation
-
-
-class MixesDetailSerializer(serializers.ModelSerializer):
+class MixesDetailSerializer(CamelCaseSerializerMixin, MediaURLSerializerMixin, MixInteractionsMixin,
+                            serializers.ModelSerializer):
     categories = TasteCategoriesSerializer(many=True, read_only=True)
     goods = MixTobaccoDetailSerializer(source='compares', many=True, read_only=True)  # Табаки
     bowl = MixBowlSerializer(read_only=True)  # Чаша через MixBowl
     author = CustomUserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    is_liked = serializers.SerializerMethodField()
-    is_favorited = serializers.SerializerMethodField()
+    banner_preview = ImageVariantField('large', source='banner')  # Крупная копия WebP для деталей
 
     class Meta:
         model = Mixes
         fields = [
-            'id', 'name', 'description', 'banner', 'created',
+            'id', 'name', 'description', 'banner', 'banner_preview', 'created',
             'likes_count', 'is_liked', 'is_favorited',
             'categories', 'goods', 'bowl', 'author'
         ]
 
-    def get_likes_count(self, obj):
-        return obj.total_likes()
-
-    def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(user=request.user).exists()
-        return False
-
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorites.filter(user=request.user).exists()
-        return False
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        camel_case_representation = {}
-        for key, value in representation.items():
-            camel_case_key = to_camel_case(key)
-            camel_case_representation[camel_case_key] = value
-        return camel_case_representation
-
-
-class MixesSerializer(serializers.ModelSerializer):
+class MixesSerializer(CamelCaseSerializerMixin, MediaURLSerializerMixin, MixInteractionsMixin,
+                      serializers.ModelSerializer):
     categories = TasteCategoriesSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    is_liked = serializers.SerializerMethodField()
-    is_favorited = serializers.SerializerMethodField()
     author = CustomUserSerializer(read_only=True)
     goods = MixTobaccoSerializer(source='compares', many=True, read_only=True)
     bowl = BowlsSerializer(source='bowl.bowl', read_only=True)
+    banner_thumbnail = ImageVariantField('thumb', source='banner')  # Миниатюра WebP для списков
 
     class Meta:
         model = Mixes
         fields = [
-            'id', 'name', 'description', 'banner', 'created',
+            'id', 'name', 'description', 'banner', 'banner_thumbnail', 'banner_blurhash', 'banner_color', 'created',
             'likes_count', 'is_liked', 'is_favorited',
             'categories', 'goods', 'bowl', 'author'
         ]
 
-    def get_likes_count(self, obj):
-        return obj.total_likes()
-
-    def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(user=request.user).exists()
-        return False
-
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorites.filter(user=request.user).exists()
-        return False
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        camel_case_representation = {}
-        for key, value in representation.items():
-            camel_case_key = to_camel_case(key)
-            camel_case_representation[camel_case_key] = value
-        return camel_case_representation
-
     def validate(self, data):
         # categories через initial_data, потому что это ManyToMany
         categories = self.initial_data.get('categories')
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from mixes.banners import request_banner
+from mixes.containment import tobacco_mixes
+from mixes.models import Mixes, MixFavorites, MixLikes, MixTobacco
+from mixes.pairing import tobacco_pairs
+from mixes.recommendations import schedule_refresh
+from mixes.similarity import similar_mixes
+from mixes.timeline import schedule_fan_out, schedule_follow_change
+from mixes.trending import add_interaction, interaction_weights, remove_interaction
+from users.models import Follow
+
+
+def mix_created(sender, instance, created, **kwargs):
+    """Новому миксу без баннера баннер генерируется в фоне."""
+    if not created or instance.banner or not settings.BANNER_GENERATION_ENABLED:
+        return
+    # После коммита: к этому моменту у микса уже есть вкусы и категории
+    transaction.on_commit(lambda: request_banner(instance))
+
+
+post_save.connect(mix_created, sender=Mixes, dispatch_uid='mixes_banner_generation')
+
+
+def mix_published(sender, instance, created, **kwargs):
+    """Новый микс расходится по лентам подписчиков автора в фоне."""
+    if created:
+        schedule_fan_out(instance)
+
+
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        schedule_follow_change(instance, followed=True)
+
+
+def follow_deleted(sender, instance, origin=None, **kwargs):
+    # При удалении пользователя его лента и подписки удаляются каскадом
+    if isinstance(origin, sender) or getattr(origin, 'model', None) is sender:
+        schedule_follow_change(instance, followed=False)
+
+
+post_save.connect(mix_published, sender=Mixes, dispatch_uid='mixes_timeline_fan_out')
+post_save.connect(follow_saved, sender=Follow, dispatch_uid='mixes_timeline_follow_saved')
+post_delete.connect(follow_deleted, sender=Follow, dispatch_uid='mixes_timeline_follow_deleted')
+
+
+def mix_vector_changed(sender, instance, **kwargs):
+    """Микс или его состав изменился: пересчитываем вектор в индексе похожих миксов."""
+    similar_mixes.refresh_mix(instance.mix_id if sender is MixTobacco else instance.pk)
+
+
+def mix_tobaccos_changed(sender, instance, **kwargs):
+    """Состав микса изменился: обновляем инвертированный индекс табак -> миксы и матрицу пар табаков."""
+    tobacco_mixes.refresh_mix(instance.mix_id)
+    tobacco_pairs.refresh_mix(instance.mix_id)
+
+
+def mix_removed(sender, instance, **kwargs):
+    similar_mixes.remove_mix(instance.pk)
+    tobacco_mixes.remove_mix(instance.pk)
+    tobacco_pairs.remove_mix(instance.pk)
+
+
+def mix_like_saved(sender, instance, created, **kwargs):
+    if created:
+        tobacco_mixes.add_likes(instance.mix_id, 1)
+
+
+def mix_like_deleted(sender, instance, **kwargs):
+    tobacco_mixes.add_likes(instance.mix_id, -1)
+
+
+def interaction_saved(sender, instance, created, **kwargs):
+    if created:
+        schedule_refresh(instance.user_id)
+
+
+def interaction_deleted(sender, instance, origin=None, **kwargs):
+    """Снятый лайк или избранное пересчитывает рекомендации; каскад от микса или пользователя — нет."""
+    if isinstance(origin, sender) or getattr(origin, 'model', None) is sender:
+        schedule_refresh(instance.user_id)
+
+
+def trending_interaction_saved(sender, instance, created, **kwargs):
+    if created:
+        add_interaction(instance.mix_id, interaction_weights()[sender], instance.created)
+
+
+def trending_interaction_deleted(sender, instance, origin=None, **kwargs):
+    # При удалении микса (или набора миксов) его трендовая оценка удаляется каскадом
+    if not (isinstance(origin, Mixes) or getattr(origin, 'model', None) is Mixes):
+        remove_interaction(instance.mix_id, interaction_weights()[sender], instance.created)
+
+
+def mix_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        similar_mixes.refresh_mix(instance.pk)
+    elif pk_set is None:
+        # Категорию отвязали от всех миксов сразу: какие это были миксы, уже не узнать
+        similar_mixes.reset()
+    else:
+        for mix_id in pk_set:
+            similar_mixes.refresh_mix(mix_id)
+
+
+post_save.connect(mix_vector_changed, sender=Mixes, dispatch_uid='mixes_similarity_mix')
+post_save.connect(mix_vector_changed, sender=MixTobacco, dispatch_uid='mixes_similarity_tobacco_saved')
+post_delete.connect(mix_vector_changed, sender=MixTobacco, dispatch_uid='mixes_similarity_tobacco_deleted')
+post_delete.connect(mix_removed, sender=Mixes, dispatch_uid='mixes_similarity_mix_deleted')
+post_save.connect(mix_tobaccos_changed, sender=MixTobacco, dispatch_uid='mixes_containment_tobacco_saved')
+post_delete.connect(mix_tobaccos_changed, sender=MixTobacco, dispatch_uid='mixes_containment_tobacco_deleted')
+post_save.connect(mix_like_saved, sender=MixLikes, dispatch_uid='mixes_containment_like_saved')
+post_delete.connect(mix_like_deleted, sender=MixLikes, dispatch_uid='mixes_containment_like_deleted')
+for model in (MixLikes, MixFavorites):
+    post_save.connect(interaction_saved, sender=model, dispatch_uid=f'mixes_recommendations_saved_{model.__name__}')
+    post_delete.connect(interaction_deleted, sender=model,
+                        dispatch_uid=f'mixes_recommendations_deleted_{model.__name__}')
+    post_save.connect(trending_interaction_saved, sender=model, dispatch_uid=f'mixes_trending_saved_{model.__name__}')
+    post_delete.connect(trending_interaction_deleted, sender=model,
+                        dispatch_uid=f'mixes_trending_deleted_{model.__name__}')
+m2m_changed.connect(mix_categories_changed, sender=Mixes.categories.through, dispatch_uid='mixes_similarity_categories')
@@ -0,0 +1,177 @@
+"""Похожие миксы по составу: разреженные векторы и косинусное сходство в памяти воркера.
+
+Вектор микса складывается из трёх блоков признаков: табаки с долями из
+`MixTobacco.weight`, категории вкусов и тип вкуса `tasteType`. Каждый блок
+нормируется отдельно и умножается на свой вес из `SIMILAR_MIXES_WEIGHTS`,
+затем весь вектор нормируется, поэтому скалярное произведение векторов —
+косинусное сходство миксов.
+
+Индекс хранит для каждого признака список миксов, у которых он есть
+(инвертированный индекс), и держит его копию в массивах NumPy. Запрос
+проходит только по признакам самого микса: для каждого признака к массиву
+оценок прибавляется `вес × значения` по его миксам, затем лучшие `limit`
+выбираются `argpartition`. Изменение микса обновляет только его признаки."""
+import math
+
+import numpy as np
+from django.conf import settings
+
+from mixes.models import Mixes, MixTasteType, MixTobacco
+from utils.worker_index import WorkerIndex
+
+TOBACCO = 't'
+CATEGORY = 'c'
+TASTE_TYPE = 'tt'
+
+
+def mix_vector(tobaccos, categories, taste_type, weights=None):
+    """Нормированный вектор микса: словарь `(тип признака, id) -> значение`.
+
+    `tobaccos` — пары `(tobacco_id, weight)`, `categories` — id категорий."""
+    weights = weights or settings.SIMILAR_MIXES_WEIGHTS
+    shares = {}
+    for tobacco_id, weight in tobaccos:
+        shares[tobacco_id] = shares.get(tobacco_id, 0) + (weight or 0)
+    blocks = [
+        (TOBACCO, shares, weights['tobacco']),
+        (CATEGORY, dict.fromkeys(categories, 1.0), weights['category']),
+        (TASTE_TYPE, {taste_type: 1.0} if taste_type and taste_type != MixTasteType.EMPTY else {},
+         weights['taste_type']),
+    ]
+    vector = {}
+    for kind, values, block_weight in blocks:
+        norm = math.sqrt(sum(value * value for value in values.values()))
+        if not norm or not block_weight:
+            continue
+        for key, value in values.items():
+            if value:
+                vector[(kind, key)] = block_weight * value / norm
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {feature: value / norm for feature, value in vector.items()} if norm else {}
+
+
+class MixVectors:
+    """Векторы миксов и инвертированный индекс признаков.
+
+    Миксу выдаётся постоянная позиция в массивах; позиции удалённых миксов
+    освобождаются и переиспользуются."""
+
+    def __init__(self):
+        self.ids = []  # позиция -> id микса (None — свободна)
+        self.positions = {}  # id микса -> позиция
+        self.vectors = []  # позиция -> вектор микса
+        self.postings = {}  # признак -> {позиция: значение}
+        self._arrays = {}  # признак -> (позиции, значения) в NumPy
+        self._free = []
+
+    def __len__(self):
+        return len(self.positions)
+
+    def set(self, mix_id, vector):
+        """Добавляет или заменяет вектор микса."""
+        position = self.positions.get(mix_id)
+        if position is None:
+            position = self._free.pop() if self._free else len(self.ids)
+            if position == len(self.ids):
+                self.ids.append(None)
+                self.vectors.append({})
+            self.ids[position] = mix_id
+            self.positions[mix_id] = position
+        self._unlink(position)
+        self.vectors[position] = vector
+        for feature, value in vector.items():
+            self.postings.setdefault(feature, {})[position] = value
+            self._arrays.pop(feature, None)
+
+    def remove(self, mix_id):
+        position = self.positions.pop(mix_id, None)
+        if position is None:
+            return
+        self._unlink(position)
+        self.vectors[position] = {}
+        self.ids[position] = None
+        self._free.append(position)
+
+    def _unlink(self, position):
+        for feature in self.vectors[position]:
+            posting = self.postings.get(feature)
+            if posting is None:
+                continue
+            posting.pop(position, None)
+            self._arrays.pop(feature, None)
+            if not posting:
+                del self.postings[feature]
+
+    def _posting_arrays(self, feature):
+        arrays = self._arrays.get(feature)
+        if arrays is None:
+            posting = self.postings[feature]
+            arrays = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                      np.fromiter(posting.values(), dtype=np.float32, count=len(posting)))
+            self._arrays[feature] = arrays
+        return arrays
+
+    def similar(self, mix_id, limit):
+        """Лучшие `limit` миксов по сходству с `mix_id`: список `(id, сходство)` по убыванию."""
+        position = self.positions.get(mix_id)
+        if position is None or limit <= 0:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for feature, value in self.vectors[position].items():
+            positions, values = self._posting_arrays(feature)
+            # Позиции в списке признака уникальны, поэтому сложение по индексам корректно
+            scores[positions] += value * values
+        scores[position] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # Равные оценки упорядочиваются по позиции, чтобы выдача была стабильной
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.ids[candidate], min(float(scores[candidate]), 1.0)) for candidate in candidates]
+
+
+def _load_vectors(mixes):
+    """Векторы миксов из выборки `mixes` тремя запросами."""
+    taste_types = dict(mixes.values_list('pk', 'tasteType'))
+    tobaccos = {mix_id: [] for mix_id in taste_types}
+    categories = {mix_id: [] for mix_id in taste_types}
+    compares = MixTobacco.objects.filter(mix__in=mixes).values_list('mix_id', 'tobacco_id', 'weight')
+    for mix_id, tobacco_id, weight in compares.iterator():
+        tobaccos[mix_id].append((tobacco_id, weight))
+    through = Mixes.categories.through.objects.filter(mixes__in=mixes).values_list('mixes_id', 'tastecategories_id')
+    for mix_id, category_id in through.iterator():
+        categories[mix_id].append(category_id)
+    weights = settings.SIMILAR_MIXES_WEIGHTS
+    return {mix_id: mix_vector(tobaccos[mix_id], categories[mix_id], taste_type, weights)
+            for mix_id, taste_type in taste_types.items()}
+
+
+class SimilarMixesIndex(WorkerIndex):
+    rebuild_interval_setting = 'SIMILAR_MIXES_REBUILD_INTERVAL'
+    warm_on_startup_setting = 'SIMILAR_MIXES_WARM_ON_STARTUP'
+
+    def build(self):
+        vectors = MixVectors()
+        for mix_id, vector in _load_vectors(Mixes.objects.all()).items():
+            vectors.set(mix_id, vector)
+        return vectors
+
+    def refresh_mix(self, mix_id):
+        """Пересчитывает вектор микса после изменения; удалённый микс убирается из индекса."""
+        if self._state is None:
+            # Индекс ещё не строился: он прочитает актуальные данные при первом запросе
+            return
+        vector = _load_vectors(Mixes.objects.filter(pk=mix_id)).get(mix_id)
+        if vector is None:
+            self.update(MixVectors.remove, mix_id)
+        else:
+            self.update(MixVectors.set, mix_id, vector)
+
+    def remove_mix(self, mix_id):
+        self.update(MixVectors.remove, mix_id)
+
+    def similar(self, mix_id, limit=10):
+        return self.query(MixVectors.similar, mix_id, limit)
+
+
+similar_mixes = SimilarMixesIndex()
@@ -0,0 +1,77 @@
+from django.conf import settings
+
+from jobs.registry import task
+from mixes.banners import process_banners
+from mixes.counters import fold_counter_shards, reconcile_counters
+from mixes.pairing import tobacco_pairs
+from mixes.recommendations import refresh_user, train
+from mixes.timeline import backfill, fan_out, purge, trim_timelines
+from mixes.trending import rollup
+
+
+@task('mixes.reconcile_counters')
+def reconcile_mix_counters():
+    """Сверяет денормализованные счётчики лайков и избранного."""
+    reconcile_counters()
+
+
+@task('mixes.fold_counter_shards')
+def fold_mix_counter_shards():
+    """Переносит накопленные шарды счётчиков в колонки миксов."""
+    if settings.MIX_COUNTER_SHARDS:
+        fold_counter_shards()
+
+
+@task('mixes.process_banners', max_attempts=1)
+def process_banner_queue():
+    """Один проход очереди генерации баннеров: запуск новых генераций и опрос идущих."""
+    if settings.BANNER_GENERATION_ENABLED:
+        process_banners()
+
+
+@task('mixes.train_recommendations', max_attempts=1)
+def train_recommendations():
+    """Пакетное обучение рекомендаций: соседи миксов и списки всех пользователей."""
+    train()
+
+
+@task('mixes.refresh_recommendations')
+def refresh_recommendations(user_id):
+    """Пересчёт списка рекомендаций пользователя после его лайков и добавлений в избранное."""
+    refresh_user(user_id)
+
+
+@task('mixes.save_tobacco_pairs', max_attempts=1)
+def save_tobacco_pairs():
+    """Свежий снимок матрицы пар табаков на диске: с него стартуют новые воркеры."""
+    tobacco_pairs.save_snapshot()
+
+
+@task('mixes.rollup_trending', max_attempts=1)
+def rollup_trending():
+    """Пересчёт трендовых оценок миксов и удаление затухших."""
+    rollup()
+
+
+@task('mixes.fan_out_mix')
+def fan_out_mix(mix_id):
+    """Рассылка нового микса по лентам подписчиков автора."""
+    fan_out(mix_id)
+
+
+@task('mixes.backfill_timeline')
+def backfill_timeline(user_id, author_id):
+    """Последние миксы автора в ленту нового подписчика."""
+    backfill(user_id, author_id)
+
+
+@task('mixes.purge_timeline')
+def purge_timeline(user_id, author_id):
+    """Удаление миксов автора из ленты после отписки."""
+    purge(user_id, author_id)
+
+
+@task('mixes.trim_timelines', max_attempts=1)
+def trim_timeline_tables():
+    """Обрезка лент подписок до `TIMELINE_MAX_ENTRIES` строк."""
+    trim_timelines()
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -229,3 +231,669 @@ def test_favorited_disfavorite_mix(api_client, get_token, create_mix, create_use
     assert response.status_code == 200
     json_data = response.json()
     assert json_data["data"]["action"] == expected_action
+
+
+@pytest.fixture
+def create_mixes_page(create_user):
+    """Фикстура для создания страницы миксов со всеми связями, которые отдаёт список."""
+    from manufacturers.models import Manufacturers
+    from tastecategories.models import TasteCategories
+    from tobaccos.models import Tobaccos
+    from mixes.models import MixTobacco
+
+    manufacturer = Manufacturers.objects.create(name="Test Manufacturer", description="")
+    tobaccos = [
+        Tobaccos.objects.create(taste=f"Taste {i}", manufacturer=manufacturer, description="")
+        for i in range(2)
+    ]
+    categories = [TasteCategories.objects.create(name=f"Category {i}") for i in range(2)]
+    mixes = []
+    for i in range(5):
+        mix = Mixes.objects.create(name=f"Mix {i}", description="", author=create_user)
+        mix.categories.set(categories)
+        for tobacco in tobaccos:
+            MixTobacco.objects.create(mix=mix, tobacco=tobacco, weight=50)
+        mix.add_like(create_user)
+        mix.add_to_favorites(create_user)
+        mixes.append(mix)
+    return mixes
+
+
+@pytest.mark.django_db
+def test_list_mixes_query_count(api_client, create_mixes_page, django_assert_num_queries):
+    """Список миксов укладывается в фиксированное число запросов независимо от размера страницы."""
+    url = reverse("mixes-list")
+    # сами миксы, prefetch категорий, prefetch табаков; COUNT не нужен на последней странице
+    with django_assert_num_queries(3):
+        response = api_client.post(url, data={"limit": 100}, format="json")
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert len(results) == 5
+    assert all(mix["likesCount"] == 1 for mix in results)
+    assert all(len(mix["goods"]) == 2 and len(mix["categories"]) == 2 for mix in results)
+
+
+@pytest.mark.django_db
+def test_liked_mixes_query_count(api_client, get_token, create_mixes_page, django_assert_num_queries):
+    """Список лайкнутых миксов аннотирует флаги пользователя вместо запросов на каждый микс."""
+    url = reverse("user-liked-mixes")
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    # пользователь из JWT, миксы, prefetch категорий, prefetch табаков
+    with django_assert_num_queries(4):
+        response = api_client.post(url, data={"limit": 100}, format="json")
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert len(results) == 5
+    assert all(mix["isLiked"] and mix["isFavorited"] for mix in results)
+
+
+@pytest.mark.django_db
+def test_like_toggle_updates_counter(api_client, get_token, create_mix):
+    """Переключение лайка и избранного меняет денормализованные счётчики микса."""
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    payload = {"mix_id": str(create_mix.id)}
+
+    api_client.post(reverse("mix-like"), data=payload, format="json")
+    api_client.post(reverse("mix-favorite"), data=payload, format="json")
+    create_mix.refresh_from_db()
+    assert (create_mix.likes_count, create_mix.favorites_count) == (1, 1)
+
+    api_client.post(reverse("mix-like"), data=payload, format="json")
+    api_client.post(reverse("mix-favorite"), data=payload, format="json")
+    create_mix.refresh_from_db()
+    assert (create_mix.likes_count, create_mix.favorites_count) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_sharded_counters(settings, create_mix, create_user):
+    """В шардированном режиме лайки копятся в шардах и сворачиваются в колонку."""
+    from mixes.counters import fold_counter_shards
+
+    settings.MIX_COUNTER_SHARDS = 4
+    create_mix.add_like(create_user)
+    create_mix.refresh_from_db()
+    assert create_mix.likes_count == 0
+    assert create_mix.total_likes() == 1
+    assert Mixes.objects.with_likes_count().get(pk=create_mix.pk).annotated_likes_count == 1
+
+    fold_counter_shards()
+    create_mix.refresh_from_db()
+    assert create_mix.likes_count == 1
+    assert not create_mix.counter_shards.exists()
+
+
+@pytest.mark.django_db
+def test_reconcile_mix_counters_command(create_mix, create_user):
+    """Команда reconcile_mix_counters исправляет рассинхронизацию счётчиков."""
+    from django.core.management import call_command
+
+    MixLikes.objects.create(mix=create_mix, user=create_user)  # мимо счётчика
+    Mixes.objects.filter(pk=create_mix.pk).update(favorites_count=7)
+
+    call_command("reconcile_mix_counters", batch_size=1)
+    create_mix.refresh_from_db()
+    assert (create_mix.likes_count, create_mix.favorites_count) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_list_mixes_cursor_pagination(api_client, create_mixes_page):
+    """Курсорная пагинация проходит список вперёд и назад без пропусков и повторов."""
+    url = reverse("mixes-list")
+    expected = [mix.name for mix in reversed(create_mixes_page)]
+
+    seen, cursor, pages = [], "", []
+    while True:
+        data = api_client.post(url, data={"limit": 2, "cursor": cursor}, format="json").json()["data"]
+        pages.append(data)
+        seen += [mix["name"] for mix in data["results"]]
+        if not data["next"]:
+            break
+        cursor = data["next"]
+    assert seen == expected
+    assert pages[0]["previous"] is None
+
+    data = api_client.post(url, data={"limit": 2, "cursor": pages[-1]["previous"]}, format="json").json()["data"]
+    assert [mix["name"] for mix in data["results"]] == expected[2:4]
+    assert data["previous"] and data["next"]
+
+
+@pytest.mark.django_db
+def test_list_mixes_invalid_cursor(api_client, create_mix):
+    """Некорректный курсор отклоняется."""
+    response = api_client.post(reverse("mixes-list"), data={"cursor": "not-a-cursor"}, format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_liked_mixes_ordered_by_like_time(api_client, get_token, create_user):
+    """Лайкнутые миксы идут в порядке времени лайка, а не создания микса."""
+    first = Mixes.objects.create(name="First", description="", author=create_user)
+    second = Mixes.objects.create(name="Second", description="", author=create_user)
+    second.add_like(create_user)
+    first.add_like(create_user)
+
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    data = api_client.post(reverse("user-liked-mixes"), data={"cursor": ""}, format="json").json()["data"]
+    assert [mix["name"] for mix in data["results"]] == ["First", "Second"]
+
+
+@pytest.mark.django_db
+def test_list_mixes_without_count(api_client, create_mixes_page, django_assert_num_queries):
+    """С `with_count: false` пагинатор не считает итог, а `next` определяет по лишней строке."""
+    url = reverse("mixes-list")
+    with django_assert_num_queries(3):
+        response = api_client.post(url, data={"limit": 2, "with_count": False}, format="json")
+    data = response.json()["data"]
+    assert data["count"] is None
+    assert data["next"] == 2
+    assert len(data["results"]) == 2
+
+
+@pytest.mark.django_db
+def test_list_mixes_count_is_cached(settings, api_client, create_mixes_page, django_assert_num_queries):
+    """COUNT неотфильтрованного списка кэшируется на PAGINATION_COUNT_CACHE_TTL секунд."""
+    from django.core.cache import cache
+
+    settings.PAGINATION_COUNT_CACHE_TTL = 60
+    cache.clear()
+    url = reverse("mixes-list")
+    api_client.post(url, data={"limit": 2}, format="json")
+    Mixes.objects.create(name="Fresh Mix", description="")
+    with django_assert_num_queries(3):
+        response = api_client.post(url, data={"limit": 2}, format="json")
+    assert response.json()["data"]["count"] == 5
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("serializer_name", ["MixesSerializer", "MixesListSerializer", "MixesDetailSerializer"])
+def test_camel_case_mixin_matches_legacy_output(create_mixes_page, serializer_name):
+    """Предвычисленная карта ключей даёт то же, что и прежняя поштучная конвертация в camelCase."""
+    from rest_framework import serializers
+    from mixes import serializers as mix_serializers
+    from utils.to_camel_case import to_camel_case
+
+    serializer_class = getattr(mix_serializers, serializer_name)
+
+    def legacy(mix):
+        # Прежняя реализация: обычное представление DRF и переименование каждого ключа
+        representation = serializers.ModelSerializer.to_representation(serializer_class(), mix)
+        return {to_camel_case(key): value for key, value in representation.items()}
+
+    mixes = Mixes.objects.for_list(with_bowl=True)
+    assert serializer_class(mixes, many=True).data == [legacy(mix) for mix in mixes]
+    tobacco = serializer_class(mixes[0]).data["goods"][0]["tobacco"]
+    assert list(tobacco)[-1] == "params"
+    assert set(tobacco["params"]) == {"strength", "resistance", "smokiness"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("with_bowl", [False, True])
+def test_mix_projection_matches_serializers(create_mixes_page, create_user, with_bowl):
+    """Проекция списков миксов совпадает с ответом сериализаторов байт в байт."""
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+    from bowls.models import Bowls
+    from mixes.models import MixBowl
+    from mixes.projections import mix_list_values, project_mixes
+    from mixes.serializers import MixesListSerializer, MixesSerializer
+
+    create_user.avatar = "avatars/user.png"
+    create_user.save()
+    first = create_mixes_page[0]
+    first.banner = "banner.jpg"
+    first.save()
+    MixBowl.objects.create(mix=first, bowl=Bowls.objects.create(type="Phunnel", description="", howTo="",
+                                                                image="bowl.png"))
+    Mixes.objects.create(name="Без автора", description="")
+
+    request = APIRequestFactory().post("/api/v1/mixes/list/")
+    # Анонимный список проверяет флаги Value(False), список с чашей — флаги Exists
+    queryset = Mixes.objects.for_list(create_user if with_bowl else None, with_bowl=with_bowl)
+    serializer_class = MixesSerializer if with_bowl else MixesListSerializer
+    expected = serializer_class(queryset, many=True, context={"request": request}).data
+    projected = project_mixes(mix_list_values(queryset, with_bowl=with_bowl), request, with_bowl=with_bowl)
+    assert JSONRenderer().render(projected) == JSONRenderer().render(expected)
+
+
+@pytest.fixture
+def fusionbrain(settings, tmp_path):
+    """Поддельный Fusionbrain и медиа во временном каталоге."""
+    from mixes import banners
+    from utils import image_derivatives
+    from utils.fusionbrain_fake import FakeFusionbrainServer
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVES_ASYNC = False
+    settings.BANNER_GENERATION_ENABLED = True
+    settings.FUSIONBRAIN_API_KEY = "key"
+    settings.FUSIONBRAIN_SECRET_KEY = "secret"
+    image_derivatives.clear_ready_cache()
+    banners.reset_client()
+    with FakeFusionbrainServer(polls_until_done=1) as fake:
+        settings.FUSIONBRAIN_API_URL = fake.url
+        yield fake
+    banners.reset_client()
+    image_derivatives.clear_ready_cache()
+
+
+@pytest.mark.django_db
+def test_banner_generated_in_background(api_client, get_token, fusionbrain, django_capture_on_commit_callbacks):
+    """Создание микса только ставит генерацию в очередь; воркер запускает её и опрашивает с задержкой."""
+    import datetime
+    from django.utils import timezone
+    from mixes.banners import process_banners
+    from mixes.models import BannerGeneration
+
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(reverse("mix-create"), data={"name": "Закат", "description": "Манго и маракуйя",
+                                                                "tasteType": "fruit"}, format="json")
+    assert response.status_code == 201
+    mix = Mixes.objects.get(name="Закат")
+    generation = BannerGeneration.objects.get()
+    assert mix.banner_generation == generation and generation.status == "queued"
+    assert fusionbrain.prompts == []  # запрос к Fusionbrain не делался в потоке запроса
+
+    now = timezone.now()
+    process_banners(now=now)
+    generation.refresh_from_db()
+    assert generation.status == "running" and fusionbrain.prompts == [generation.prompt]
+
+    # Первый опрос: генерация ещё идёт, следующий опрос отложен
+    process_banners(now=now + datetime.timedelta(hours=1))
+    generation.refresh_from_db()
+    assert generation.attempts == 1 and generation.next_poll_at > now + datetime.timedelta(hours=1)
+
+    process_banners(now=now + datetime.timedelta(hours=2))
+    generation.refresh_from_db()
+    mix.refresh_from_db()
+    assert generation.status == "done"
+    assert mix.banner.name == generation.image.name and mix.banner.name.startswith("banners/")
+
+
+@pytest.mark.django_db
+def test_banner_cache_and_concurrency(settings, fusionbrain, create_user):
+    """Одинаковые запросы генерируются один раз, одновременно идёт не больше разрешённого числа генераций."""
+    import datetime
+    from django.utils import timezone
+    from mixes.banners import process_banners, request_banner
+    from mixes.models import BannerGeneration
+
+    settings.BANNER_GENERATION_CONCURRENCY = 1
+    mixes = [Mixes.objects.create(name=name, description="", author=create_user) for name in ("A", "A", "B")]
+    for mix in mixes:
+        request_banner(mix)
+    assert BannerGeneration.objects.count() == 2
+
+    now = timezone.now()
+    process_banners(now=now)
+    assert BannerGeneration.objects.filter(status="running").count() == 1
+    for hour in range(1, 10):
+        process_banners(now=now + datetime.timedelta(hours=hour))
+        assert BannerGeneration.objects.filter(status="running").count() <= 1
+
+    assert len(fusionbrain.prompts) == 2
+    first, second, third = (Mixes.objects.get(pk=mix.pk).banner.name for mix in mixes)
+    assert first == second and first != third and third
+
+    # Готовый баннер с тем же запросом новый микс получает сразу
+    fourth = Mixes.objects.create(name="B", description="", author=create_user)
+    request_banner(fourth)
+    fourth.refresh_from_db()
+    assert fourth.banner.name == third and len(fusionbrain.prompts) == 2
+
+
+@pytest.mark.django_db
+def test_banner_start_lease(settings, fusionbrain, create_user):
+    """Генерация, захваченная воркером, занимает место в лимите, пока не истёк срок захвата; потом её забирают."""
+    import datetime
+    from django.utils import timezone
+    from mixes.banners import process_banners, request_banner
+
+    settings.BANNER_GENERATION_CONCURRENCY = 1
+    now = timezone.now()
+    generation = request_banner(Mixes.objects.create(name="A", description="", author=create_user))
+    generation.status = "starting"
+    generation.next_poll_at = now + datetime.timedelta(seconds=settings.BANNER_START_LEASE)
+    generation.save()
+    queued = request_banner(Mixes.objects.create(name="B", description="", author=create_user))
+
+    assert process_banners(now=now) == generation.next_poll_at
+    assert fusionbrain.prompts == []
+
+    # Воркер, захвативший генерацию, упал: после срока захвата её запускает следующий
+    process_banners(now=generation.next_poll_at)
+    generation.refresh_from_db()
+    queued.refresh_from_db()
+    assert generation.status == "running" and queued.status == "queued"
+    assert fusionbrain.prompts == [generation.prompt]
+
+
+@pytest.mark.django_db
+def test_generate_banners_backfill(settings, fusionbrain, create_mix):
+    """Команда ставит в очередь миксы без баннера и разбирает очередь; неудачная генерация помечается ошибкой."""
+    from django.core.management import call_command
+    from mixes.banners import banner_prompt
+    from mixes.models import BannerGeneration
+
+    settings.BANNER_POLL_INITIAL_DELAY = 0
+    failing = Mixes.objects.create(name="Провал", description="", author=create_mix.author)
+    fusionbrain.fail_prompts.add(banner_prompt(failing))
+
+    call_command("generate_banners", "--backfill", stdout=io.StringIO())
+    create_mix.refresh_from_db()
+    assert create_mix.banner
+    assert BannerGeneration.objects.get(mixes=failing).status == "failed"
+
+
+@pytest.fixture
+def similar_index():
+    from mixes.similarity import similar_mixes
+
+    similar_mixes.reset()
+    yield similar_mixes
+    similar_mixes.reset()
+
+
+@pytest.fixture
+def similar_catalog(create_user):
+    """Табаки и категории для миксов разной степени похожести."""
+    from manufacturers.models import Manufacturers
+    from tastecategories.models import TasteCategories
+    from tobaccos.models import Tobaccos
+
+    manufacturer = Manufacturers.objects.create(name="Similar Manufacturer", description="")
+    tobaccos = [Tobaccos.objects.create(taste=f"Taste {i}", manufacturer=manufacturer, description="")
+                for i in range(4)]
+    categories = [TasteCategories.objects.create(name=f"Category {i}") for i in range(2)]
+
+    def make(name, goods, category_indexes=(), taste_type="-"):
+        from mixes.models import MixTobacco
+
+        mix = Mixes.objects.create(name=name, description="", tasteType=taste_type, author=create_user)
+        mix.categories.set([categories[i] for i in category_indexes])
+        for index, weight in goods:
+            MixTobacco.objects.create(mix=mix, tobacco=tobaccos[index], weight=weight)
+        return mix
+
+    return make
+
+
+@pytest.mark.django_db
+def test_similar_mixes_endpoint(api_client, similar_index, similar_catalog):
+    """Выдача упорядочена по сходству состава; микс без общих признаков не попадает в неё."""
+    base = similar_catalog("Base", [(0, 70), (1, 30)], [0], "fruit")
+    twin = similar_catalog("Twin", [(0, 70), (1, 30)], [0], "fruit")
+    close = similar_catalog("Close", [(0, 50), (2, 50)], [0])
+    far = similar_catalog("Far", [(1, 10), (3, 90)])
+    similar_catalog("Other", [(3, 100)], [1], "fresh")
+
+    response = api_client.post(reverse("mixes-similar"), {"id": str(base.pk)}, format="json")
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(twin.pk), str(close.pk), str(far.pk)]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert results[0]["similarity"] > results[1]["similarity"] > results[2]["similarity"] > 0
+
+    response = api_client.post(reverse("mixes-similar"), {"id": str(base.pk), "limit": 1}, format="json")
+    assert [item["id"] for item in response.json()["data"]["results"]] == [str(twin.pk)]
+
+    response = api_client.post(reverse("mixes-similar"), {"id": "not-a-uuid"}, format="json")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_similar_mixes_incremental_updates(similar_index, similar_catalog):
+    """Правки состава, категорий и удаление миксов доходят до построенного индекса так же, как полная сборка."""
+    from mixes.models import MixTobacco
+    from mixes.similarity import SimilarMixesIndex
+
+    base = similar_catalog("Base", [(0, 50), (1, 50)], [0])
+    other = similar_catalog("Other", [(2, 100)])
+    gone = similar_catalog("Gone", [(0, 100)])
+    assert [pk for pk, _ in similar_index.similar(base.pk)] == [gone.pk]
+
+    MixTobacco.objects.create(mix=other, tobacco=MixTobacco.objects.filter(mix=base).first().tobacco, weight=50)
+    other.categories.set(base.categories.all())
+    gone.delete()
+
+    fresh = SimilarMixesIndex()
+    assert similar_index.similar(base.pk) == pytest.approx(fresh.similar(base.pk))
+    assert [pk for pk, _ in similar_index.similar(base.pk)] == [other.pk]
+    assert similar_index.similar(gone.pk) == []
+
+
+@pytest.fixture
+def containment_index():
+    from mixes.containment import tobacco_mixes
+
+    tobacco_mixes.reset()
+    yield tobacco_mixes
+    tobacco_mixes.reset()
+
+
+@pytest.mark.django_db
+def test_contained_all_and_any(api_client, containment_index, similar_catalog, create_user):
+    """«Все табаки» — без дублей при повторе табака в миксе, «любой» — по числу совпадений, затем по лайкам."""
+    from mixes.models import MixTobacco
+
+    both = similar_catalog("Both", [(0, 50), (1, 50)])
+    MixTobacco.objects.create(mix=both, tobacco=MixTobacco.objects.filter(mix=both).first().tobacco, weight=10)
+    first = similar_catalog("First", [(0, 100)])
+    second = similar_catalog("Second", [(1, 100)])
+    similar_catalog("None", [(2, 100)])
+    tobacco_ids = [str(pk) for pk in MixTobacco.objects.filter(mix=both).values_list('tobacco_id', flat=True)]
+
+    url = reverse("mixes-contained")
+    response = api_client.post(url, {"ids": tobacco_ids}, format="json")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [item["id"] for item in data["results"]] == [str(both.pk)]
+    assert data["results"][0]["overlap"] == 2 and data["count"] == 1
+
+    second.add_like(create_user)
+    response = api_client.post(url, {"ids": tobacco_ids, "mode": "any"}, format="json")
+    assert [item["id"] for item in response.json()["data"]["results"]] == [str(both.pk), str(second.pk),
+                                                                          str(first.pk)]
+
+    # Курсорные страницы проходят ту же выдачу без пропусков и повторов
+    seen, cursor = [], ""
+    while cursor is not None:
+        data = api_client.post(url, {"ids": tobacco_ids, "mode": "any", "limit": 1, "cursor": cursor},
+                               format="json").json()["data"]
+        seen += [item["id"] for item in data["results"]]
+        cursor = data["next"]
+    assert seen == [str(both.pk), str(second.pk), str(first.pk)]
+    previous = api_client.post(url, {"ids": tobacco_ids, "mode": "any", "limit": 1, "cursor": data["previous"]},
+                               format="json").json()["data"]
+    assert [item["id"] for item in previous["results"]] == [str(second.pk)]
+
+    response = api_client.post(url, {"id": tobacco_ids[0]}, format="json")
+    assert {item["id"] for item in response.json()["data"]["results"]} == {str(both.pk), str(first.pk)}
+
+    assert api_client.post(url, {"ids": [tobacco_ids[0], str(both.pk)]}, format="json").status_code == 404
+    assert api_client.post(url, {"ids": tobacco_ids, "mode": "most"}, format="json").status_code == 400
+
+
+@pytest.mark.django_db
+def test_contained_index_follows_changes(containment_index, similar_catalog, create_user):
+    """Правки состава, лайки и удаления доходят до построенного индекса так же, как полная сборка."""
+    from mixes.containment import ANY, TobaccoMixIndex
+    from mixes.models import MixTobacco
+
+    base = similar_catalog("Base", [(0, 50), (1, 50)])
+    other = similar_catalog("Other", [(2, 100)])
+    tobacco_ids = list(MixTobacco.objects.filter(mix=base).values_list('tobacco_id', flat=True))
+    assert len(containment_index.search(tobacco_ids, ANY)) == 1
+
+    MixTobacco.objects.create(mix=other, tobacco_id=tobacco_ids[0], weight=50)
+    other.add_like(create_user)
+    MixTobacco.objects.filter(mix=base, tobacco_id=tobacco_ids[1]).delete()
+    gone = similar_catalog("Gone", [(0, 100)])
+    gone.delete()
+
+    fresh = TobaccoMixIndex()
+    expected = fresh.search(tobacco_ids, ANY)[:]
+    assert containment_index.search(tobacco_ids, ANY)[:] == expected
+    assert [row["id"] for row in expected] == [other.pk, base.pk]
+
+
+@pytest.fixture
+def recommendation_users(create_user):
+    users = [CustomUser.objects.create_user(email=f"fan{i}@example.com", username=f"fan{i}", password="password123")
+             for i in range(3)]
+    return [create_user, *users]
+
+
+@pytest.mark.django_db
+def test_recommendations_train_and_refresh(api_client, get_token, recommendation_users):
+    """Рекомендации по соседям лайкнутых миксов; новый лайк пересчитывает список без повторного обучения."""
+    from jobs.models import Job
+    from mixes.recommendations import refresh_user, train
+
+    target, first, second, third = recommendation_users
+    a, b, c, d = [Mixes.objects.create(name=name, description="", tasteType="-") for name in "ABCD"]
+    for user, mixes in ((first, (a, b, c)), (second, (a, b)), (third, (b, d)), (target, (a,))):
+        for mix in mixes:
+            mix.add_like(user)
+    # Каждый лайк ставит пересчёт, но задачи одного пользователя в пределах окна схлопываются
+    assert Job.objects.filter(name="mixes.refresh_recommendations").count() == 4
+
+    assert train() == (4, 4)
+    url = reverse("user-recommended-mixes")
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    results = api_client.post(url, {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(b.pk), str(c.pk)]
+    assert results[0]["score"] == pytest.approx(2 / 3, abs=1e-3)
+
+    b.add_like(target)
+    assert [mix_id for mix_id, _ in refresh_user(target.pk)] == [str(c.pk), str(d.pk)]
+    data = api_client.post(url, {"limit": 1, "cursor": ""}, format="json").json()["data"]
+    assert [item["id"] for item in data["results"]] == [str(c.pk)]
+    data = api_client.post(url, {"limit": 1, "cursor": data["next"]}, format="json").json()["data"]
+    assert [item["id"] for item in data["results"]] == [str(d.pk)]
+
+    # Каскадное удаление лайков вместе с миксом не ставит пересчёты
+    jobs = Job.objects.count()
+    a.delete()
+    assert Job.objects.count() == jobs
+
+
+@pytest.mark.django_db
+def test_recommendations_fallback_to_popular(api_client, get_token, recommendation_users):
+    """Без лайков пользователь получает популярные миксы."""
+    target, first, second, _ = recommendation_users
+    quiet, loved, liked = [Mixes.objects.create(name=name, description="", tasteType="-")
+                           for name in ("Quiet", "Loved", "Liked")]
+    loved.add_like(first)
+    loved.add_like(second)
+    liked.add_like(first)
+
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    results = api_client.post(reverse("user-recommended-mixes"), {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(loved.pk), str(liked.pk), str(quiet.pk)]
+
+
+@pytest.mark.django_db
+def test_trending_feed(api_client, recommendation_users):
+    """Лайки и избранное поднимают микс сразу, старые действия затухают, снятые — вычитаются."""
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from mixes.models import MixTrending
+    from mixes.trending import current_score, rollup
+
+    hot, warm, cold = [Mixes.objects.create(name=name, description="", tasteType="-")
+                       for name in ("Hot", "Warm", "Cold")]
+    first, second, third, _ = recommendation_users
+    hot.add_like(first)
+    hot.add_like(second)
+    MixFavorites.objects.create(mix=hot, user=third)
+    warm.add_like(first)
+    cold.add_like(first)
+    cold.add_like(second)
+    assert current_score(MixTrending.objects.get(mix=hot).score) == pytest.approx(4, rel=1e-3)
+
+    MixLikes.objects.filter(mix=cold).update(created=timezone.now() - timedelta(days=3))
+    rollup()
+    url = reverse("mixes-trending")
+    results = api_client.post(url, {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(hot.pk), str(warm.pk), str(cold.pk)]
+    assert [item["trendingScore"] for item in results] == pytest.approx([4, 1, 0.25], rel=1e-3)
+
+    # Курсорные страницы проходят ту же ленту
+    data = api_client.post(url, {"limit": 2, "cursor": ""}, format="json").json()["data"]
+    data = api_client.post(url, {"limit": 2, "cursor": data["next"]}, format="json").json()["data"]
+    assert [item["id"] for item in data["results"]] == [str(cold.pk)]
+
+    MixLikes.objects.filter(mix=warm).delete()
+    assert current_score(MixTrending.objects.get(mix=warm).score) < 1e-6
+    MixLikes.objects.filter(mix=cold, user=second).update(created=timezone.now() - timedelta(days=30))
+    assert rollup() == 2
+    hot.delete()
+    results = api_client.post(url, {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(cold.pk)]
+    assert results[0]["trendingScore"] == pytest.approx(0.125, rel=1e-3)
+
+
+@pytest.mark.django_db
+def test_home_timeline(api_client, get_token, recommendation_users, settings):
+    """Миксы обычных авторов рассылаются по лентам задачами, миксы крупных авторов подмешиваются при чтении."""
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from jobs.worker import claim, run_job
+    from mixes.models import TimelineEntry
+    from mixes.timeline import trim_timelines
+
+    def run_jobs():
+        for job_id in claim("test", 100):
+            assert run_job(job_id, "test")
+
+    settings.TIMELINE_FANOUT_MAX_FOLLOWERS = 2
+    target, author, celebrity, fan = recommendation_users
+    now = timezone.now()
+
+    def publish(name, by, minutes_ago):
+        mix = Mixes.objects.create(name=name, description="", tasteType="-", author=by)
+        Mixes.objects.filter(pk=mix.pk).update(created=now - timedelta(minutes=minutes_ago))
+        return mix
+
+    old = publish("Old", author, 30)
+    fan.follow(celebrity)
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_token['access']}")
+    follow_url = reverse("user-follow")
+    for user in (author, celebrity):
+        response = api_client.post(follow_url, {"author_id": str(user.pk)}, format="json")
+        assert response.json()["data"]["action"] == "followed"
+    assert response.json()["data"]["followers_count"] == 2
+    run_jobs()
+
+    fresh = publish("Fresh", author, 10)
+    famous = publish("Famous", celebrity, 20)
+    run_jobs()
+    # Крупному автору рассылка не делается
+    assert set(TimelineEntry.objects.filter(user=target).values_list("mix_id", flat=True)) == {old.pk, fresh.pk}
+
+    url = reverse("user-timeline")
+    results = api_client.post(url, {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(fresh.pk), str(famous.pk), str(old.pk)]
+    data = api_client.post(url, {"limit": 2, "cursor": ""}, format="json").json()["data"]
+    data = api_client.post(url, {"limit": 2, "cursor": data["next"]}, format="json").json()["data"]
+    assert [item["id"] for item in data["results"]] == [str(old.pk)]
+
+    settings.TIMELINE_MAX_ENTRIES = 1
+    assert trim_timelines() == 1
+    settings.TIMELINE_MAX_ENTRIES = 500
+
+    response = api_client.post(follow_url, {"author_id": str(author.pk)}, format="json")
+    assert response.json()["data"]["action"] == "unfollowed"
+    run_jobs()
+    results = api_client.post(url, {}, format="json").json()["data"]["results"]
+    assert [item["id"] for item in results] == [str(famous.pk)]
+
+    assert api_client.post(follow_url, {"author_id": str(target.pk)}, format="json").status_code == 400
+    assert api_client.post(follow_url, {"author_id": "nobody"}, format="json").status_code == 404
@@ -0,0 +1,127 @@
+"""Домашняя лента: новые миксы авторов, на которых подписан пользователь.
+
+У обычных авторов новый микс рассылается при записи: фоновая задача
+`mixes.fan_out_mix` добавляет строку `TimelineEntry` каждому подписчику,
+поэтому создание микса ждёт только постановку задачи. Рассылка миксов
+автора с `TIMELINE_FANOUT_MAX_FOLLOWERS` подписчиками и больше обошлась бы
+в миллионы строк на микс, поэтому их миксы подмешиваются при чтении: к
+строкам ленты пользователя добавляются последние миксы таких авторов по
+индексу `(author, -created, -id)`, и оба упорядоченных потока сливаются.
+
+Лента ограничена `TIMELINE_MAX_ENTRIES` последними миксами: чтение
+никогда не выбирает больше, а периодическая задача `mixes.trim_timelines`
+удаляет строки сверх лимита. Подписка дозаполняет ленту последними
+миксами автора, отписка убирает их — тоже фоновыми задачами."""
+import heapq
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from jobs.registry import enqueue
+from mixes.models import Mixes, TimelineEntry
+from users.models import CustomUser, Follow
+
+# Порядок ленты: новые миксы первыми; `key` — id микса числом, чтобы курсор по последовательности был стабильным
+TIMELINE_ORDERING = ('-created', '-key')
+
+
+def is_fanned_out(followers_count):
+    """Рассылаются ли миксы автора при записи (иначе — подмешиваются при чтении)."""
+    return followers_count < settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def schedule_fan_out(mix):
+    if mix.author_id is not None:
+        enqueue('mixes.fan_out_mix', [str(mix.pk)])
+
+
+def schedule_follow_change(follow, followed):
+    """Подписка дозаполняет ленту миксами автора, отписка — убирает их."""
+    name = 'mixes.backfill_timeline' if followed else 'mixes.purge_timeline'
+    enqueue(name, [str(follow.follower_id), str(follow.author_id)])
+
+
+def fan_out(mix_id, batch_size=1000):
+    """Добавляет микс в ленты подписчиков автора. Возвращает число подписчиков, которым он разослан."""
+    mix = Mixes.objects.filter(pk=mix_id, author__isnull=False).values(
+        'author_id', 'author__followers_count', 'created').first()
+    if mix is None or not is_fanned_out(mix['author__followers_count']):
+        return 0
+    followers = Follow.objects.filter(author_id=mix['author_id']).values_list('follower_id', flat=True)
+    sent, batch = 0, []
+    for follower_id in followers.iterator(chunk_size=batch_size):
+        batch.append(TimelineEntry(user_id=follower_id, mix_id=mix_id, author_id=mix['author_id'],
+                                   created=mix['created']))
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            sent, batch = sent + len(batch), []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return sent + len(batch)
+
+
+def backfill(user_id, author_id):
+    """После подписки добавляет в ленту последние миксы автора."""
+    follows = Follow.objects.filter(follower_id=user_id, author_id=author_id)
+    if not follows.exists():
+        # Пользователь успел отписаться, пока задача ждала очереди
+        return 0
+    followers_count = CustomUser.objects.filter(pk=author_id).values_list('followers_count', flat=True).first()
+    if not is_fanned_out(followers_count or 0):
+        return 0
+    recent = (Mixes.objects.filter(author_id=author_id).order_by('-created', '-id')
+              .values_list('pk', 'created')[:settings.TIMELINE_MAX_ENTRIES])
+    entries = [TimelineEntry(user_id=user_id, mix_id=mix_id, author_id=author_id, created=created)
+               for mix_id, created in recent]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def purge(user_id, author_id):
+    """После отписки убирает из ленты миксы автора."""
+    if Follow.objects.filter(follower_id=user_id, author_id=author_id).exists():
+        # Пользователь подписался снова, пока задача ждала очереди
+        return 0
+    deleted, _ = TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    return deleted
+
+
+def trim_timelines():
+    """Удаляет строки сверх `TIMELINE_MAX_ENTRIES` в каждой ленте. Возвращает число удалённых строк."""
+    limit = settings.TIMELINE_MAX_ENTRIES
+    overflowing = (TimelineEntry.objects.values('user').annotate(total=Count('pk'))
+                   .filter(total__gt=limit).values_list('user', flat=True))
+    trimmed = 0
+    for user_id in overflowing:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        created, mix_id = entries.order_by('-created', '-mix').values_list('created', 'mix')[limit]
+        deleted, _ = entries.filter(Q(created__lt=created) | Q(created=created, mix__lte=mix_id)).delete()
+        trimmed += deleted
+    return trimmed
+
+
+def home_timeline(user):
+    """Лента пользователя: строки `{'id', 'created', 'key'}` по убыванию даты создания микса.
+
+    `created` — метка времени в секундах, `key` — id микса числом: обратный
+    порядок у последовательности в памяти возможен только по числовым полям."""
+    limit = settings.TIMELINE_MAX_ENTRIES
+    streams = [TimelineEntry.objects.filter(user=user).order_by('-created', '-mix')
+               .values_list('mix_id', 'created')[:limit]]
+    celebrities = list(Follow.objects.filter(follower=user,
+                                             author__followers_count__gte=settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+                       .values_list('author_id', flat=True))
+    if celebrities:
+        streams.append(Mixes.objects.filter(author_id__in=celebrities).order_by('-created', '-id')
+                       .values_list('pk', 'created')[:limit])
+
+    rows, seen = [], set()
+    # Оба потока уже упорядочены базой, слияние не пересортировывает их
+    for mix_id, created in heapq.merge(*streams, key=lambda row: (row[1], row[0]), reverse=True):
+        if mix_id in seen:
+            # Микс мог попасть в ленту до того, как у автора стало много подписчиков
+            continue
+        seen.add(mix_id)
+        rows.append({'id': mix_id, 'created': created.timestamp(), 'key': mix_id.int})
+        if len(rows) >= limit:
+            break
+    return rows
@@ -0,0 +1,106 @@
+"""Лента трендов: затухающая со временем сумма лайков и добавлений в избранное.
+
+Вклад действия с весом `w` в момент `t` сейчас равен `w · 2^(-(now - t) / H)`,
+где `H` — `TRENDING_HALF_LIFE`. Множитель `2^(-now / H)` у всех миксов общий,
+поэтому в `MixTrending.score` хранится логарифм суммы
+`w · 2^((t - TRENDING_EPOCH) / H)` — «ленивое» затухание: строки не нужно
+переписывать со временем, а порядок по `score` всегда совпадает с порядком
+по текущей оценке. Логарифм не переполняется и растёт на ln 2 за период
+полураспада.
+
+Каждый лайк прибавляет свой вклад одним атомарным UPDATE через
+log-sum-exp, снятый лайк вычитает его. Периодическая задача
+`mixes.rollup_trending` пересчитывает оценки по таблицам лайков и
+избранного и удаляет миксы, чья текущая оценка опустилась ниже
+`TRENDING_MIN_SCORE`: таблица остаётся небольшой, а первая страница ленты —
+один проход по индексу `(-score, -mix)`."""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from mixes.models import MixFavorites, MixLikes, MixTrending
+
+# Порядок ленты: по убыванию оценки, затем по id микса для стабильной пагинации
+TRENDING_ORDERING = ('-score', '-mix')
+
+
+def interaction_weights():
+    return {MixLikes: settings.TRENDING_LIKE_WEIGHT, MixFavorites: settings.TRENDING_FAVORITE_WEIGHT}
+
+
+def log_contribution(weight, when):
+    """Вклад действия в `MixTrending.score`: ln(w) + (t - эпоха) · ln 2 / H."""
+    elapsed = (when - settings.TRENDING_EPOCH).total_seconds()
+    return math.log(weight) + elapsed * math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def current_score(score, now=None):
+    """Текущая оценка (в лайках с учётом затухания) по сохранённому `score`."""
+    return math.exp(score - log_contribution(1.0, now or timezone.now()))
+
+
+def add_interaction(mix_id, weight, when):
+    """Прибавляет вклад действия к оценке микса: score = ln(e^score + e^x)."""
+    value = Value(log_contribution(weight, when))
+    updated = MixTrending.objects.filter(mix_id=mix_id).update(
+        score=Greatest(F('score'), value) + Ln(1 + Exp(-Abs(F('score') - value))),
+        updated=timezone.now(),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            MixTrending.objects.create(mix_id=mix_id, score=value.value)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос — прибавляем к ней
+        add_interaction(mix_id, weight, when)
+
+
+def remove_interaction(mix_id, weight, when):
+    """Вычитает вклад снятого действия: score = score + ln(1 - e^(x - score)).
+
+    Из-за округления разность может оказаться неположительной — тогда оценка
+    становится пренебрежимо малой, и строку удалит ближайший пересчёт."""
+    value = Value(log_contribution(weight, when))
+    MixTrending.objects.filter(mix_id=mix_id).update(
+        score=F('score') + Ln(Greatest(1 - Exp(Least(value - F('score'), 0)), 1e-12)),
+        updated=timezone.now(),
+    )
+
+
+def rollup(now=None, batch_size=1000):
+    """Пересчитывает оценки по лайкам и избранному и удаляет затухшие. Возвращает число миксов в ленте."""
+    started = now or timezone.now()
+    weights = interaction_weights()
+    floor = log_contribution(settings.TRENDING_MIN_SCORE, started)
+    # Действия старше окна уже не поднимут микс выше `TRENDING_MIN_SCORE`
+    window = settings.TRENDING_HALF_LIFE * max(math.log2(max(weights.values()) / settings.TRENDING_MIN_SCORE), 0)
+    since = started - timedelta(seconds=window)
+
+    mix_index, codes, values = {}, [], []
+    for model, weight in weights.items():
+        for mix_id, created in model.objects.filter(created__gte=since).values_list('mix_id', 'created').iterator():
+            codes.append(mix_index.setdefault(mix_id, len(mix_index)))
+            values.append(log_contribution(weight, created))
+    codes = np.array(codes, dtype=np.int64)
+    values = np.array(values, dtype=np.float64)
+    # log-sum-exp по миксам: вычитаем максимум микса, чтобы экспоненты не переполнялись
+    peaks = np.full(len(mix_index), -np.inf)
+    np.maximum.at(peaks, codes, values)
+    scores = peaks + np.log(np.bincount(codes, weights=np.exp(values - peaks[codes]), minlength=len(mix_index)))
+    rows = [MixTrending(mix_id=mix_id, score=float(score))
+            for mix_id, score in zip(mix_index, scores) if score >= floor]
+
+    with transaction.atomic():
+        # Строки, изменённые лайками во время пересчёта, уже содержат свежие вклады
+        MixTrending.objects.filter(updated__lt=started).delete()
+        MixTrending.objects.filter(score__lt=floor).delete()
+        fresh = set(MixTrending.objects.values_list('mix_id', flat=True))
+        MixTrending.objects.bulk_create([row for row in rows if row.mix_id not in fresh], batch_size=batch_size)
+    return MixTrending.objects.count()
@@ -13,6 +13,10 @@ urlpatterns = [
     path('api/v1/mixes/favorites/', MixFavoriteAPIView.as_view(), name='mix-favorite'),
     path('api/v1/user/liked-mixes/', UserLikedMixesView.as_view(), name='user-liked-mixes'),
     path('api/v1/user/favorited-mixes/', UserFavoritedMixesView.as_view(), name='user-favorite-mixes'),
+    path('api/v1/user/recommended-mixes/', UserRecommendedMixesView.as_view(), name='user-recommended-mixes'),
+    path('api/v1/user/timeline/', UserTimelineView.as_view(), name='user-timeline'),
     path('api/v1/mixes/contained/', MixesContainedAPIView.as_view(), name='mixes-contained'),
+    path('api/v1/mixes/trending/', MixesTrendingAPIView.as_view(), name='mixes-trending'),
+    path('api/v1/mixes/similar/', MixesSimilarAPIView.as_view(), name='mixes-similar'),
     path('api/v1/mixes/by_author/', MixesByAuthorAPIView.as_view(), name='mixes-by-author'),
 ]
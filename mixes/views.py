@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -8,9 +11,16 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from tobaccos.models import Tobaccos
-from .models import Mixes, MixLikes, MixFavorites
-from utils.CustomLimitOffsetPagination import CustomLimitOffsetPagination
-from .serializers import MixesListSerializer, MixesDetailSerializer, MixesSerializer
+from .models import Mixes, MixLikes, MixFavorites, MixTrending, UserRecommendations, MIX_LIST_ORDERING
+from .containment import (ALL as CONTAINMENT_ALL, CONTAINMENT_ORDERING, MODES as CONTAINMENT_MODES, Ranking,
+                          tobacco_mixes)
+from .projections import mix_list_values, project_mixes
+from .similarity import similar_mixes
+from .timeline import TIMELINE_ORDERING, home_timeline
+from .trending import TRENDING_ORDERING, current_score
+from search.indexing import SEARCH_ORDERING, rank_queryset, search_mixes
+from utils.KeysetPagination import get_pagination
+from .serializers import MixesDetailSerializer, MixesSerializer
 
 
 class MixesListAPIView(APIView):
@@ -22,8 +32,9 @@ class MixesListAPIView(APIView):
         operation_summary="Получение списка миксов",
         operation_description=(
                 "Возвращает список всех доступных миксов.\n\n"
-                "- Поддерживает поиск по полю `search` (имя или описание).\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`.\n"
+                "- Поддерживает полнотекстовый поиск по полю `search` (имя, описание, вкусы и производители табаков),"
+                " результаты упорядочены по релевантности.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
                 "- Доступно всем пользователям без аутентификации."
         ),
         request_body=openapi.Schema(
@@ -34,6 +45,11 @@ class MixesListAPIView(APIView):
                 'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
                                         example=10),
                 'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -93,15 +109,17 @@ class MixesListAPIView(APIView):
         }
     )
     def post(self, request, *args, **kwargs):
-        queryset = Mixes.objects.all()
+        queryset = Mixes.objects.for_list(request.user)
+        ordering = MIX_LIST_ORDERING
         search_query = request.data.get('search', None)
         if search_query:
-            queryset = queryset.filter(name__icontains=search_query) | queryset.filter(
-                description__icontains=search_query)
-        paginator = CustomLimitOffsetPagination()
+            # Полнотекстовый поиск по названию, описанию и табакам микса, выдача по релевантности
+            queryset = rank_queryset(queryset, search_mixes(search_query))
+            ordering = SEARCH_ORDERING
+        queryset = mix_list_values(queryset.order_by(*ordering), ordering)
+        paginator = get_pagination(request, ordering=ordering)
         page = paginator.paginate_queryset(queryset, request)
-        serializer = MixesListSerializer(page, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(project_mixes(page, request))
 
 
 class MixDetailView(APIView):
@@ -184,7 +202,8 @@ class MixDetailView(APIView):
         if not mix_id:
             return Response({"status": "bad", "code": 400, "message": "Поле 'id' обязательно", "data": None},
                             status=400)
-        instance = get_object_or_404(Mixes, pk=mix_id)
+        queryset = Mixes.objects.with_likes_count().with_viewer_flags(request.user)
+        instance = get_object_or_404(queryset, pk=mix_id)
         serializer = MixesDetailSerializer(instance, context={'request': request})
         return Response({
             "status": "ok",
@@ -685,10 +704,9 @@ class MixLikeAPIView(APIView):
             )
 
         mix = get_object_or_404(Mixes, pk=mix_id)
-        like = MixLikes.objects.filter(mix=mix, user=request.user).first()
 
-        if like:
-            like.delete()
+        # Методы модели меняют строку лайка и счётчик в одной транзакции
+        if mix.remove_like(request.user):
             return Response(
                 {
                     "status": "ok",
@@ -699,7 +717,7 @@ class MixLikeAPIView(APIView):
                 status=200
             )
         else:
-            MixLikes.objects.create(mix=mix, user=request.user)
+            mix.add_like(request.user)
             return Response(
                 {
                     "status": "ok",
@@ -822,10 +840,8 @@ class MixFavoriteAPIView(APIView):
             )
 
         mix = get_object_or_404(Mixes, pk=mix_id)
-        favorite = MixFavorites.objects.filter(mix=mix, user=request.user).first()
 
-        if favorite:
-            favorite.delete()
+        if mix.remove_from_favorites(request.user):
             return Response(
                 {
                     "status": "ok",
@@ -836,7 +852,7 @@ class MixFavoriteAPIView(APIView):
                 status=200
             )
         else:
-            MixFavorites.objects.create(mix=mix, user=request.user)
+            mix.add_to_favorites(request.user)
             return Response(
                 {
                     "status": "ok",
@@ -856,7 +872,7 @@ class UserLikedMixesView(APIView):
         operation_summary="Получение списка лайкнутых миксов пользователя",
         operation_description=(
                 "Возвращает список миксов, которые текущий пользователь лайкнул.\n\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
                 "- Требуется аутентификация через JWT."
         ),
         request_body=openapi.Schema(
@@ -865,6 +881,11 @@ class UserLikedMixesView(APIView):
                 'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
                                         example=10),
                 'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -937,11 +958,11 @@ class UserLikedMixesView(APIView):
         }
     )
     def post(self, request, *args, **kwargs):
-        liked_mixes = Mixes.objects.filter(likes__user=request.user)
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(liked_mixes, request)
-        serializer = MixesSerializer(page, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
+        ordering = ('-liked_at', '-id')
+        liked_mixes = Mixes.objects.liked_by(request.user).for_list(request.user, with_bowl=True).order_by(*ordering)
+        paginator = get_pagination(request, ordering=ordering)
+        page = paginator.paginate_queryset(mix_list_values(liked_mixes, ordering, with_bowl=True), request)
+        return paginator.get_paginated_response(project_mixes(page, request, with_bowl=True))
 
 
 class UserFavoritedMixesView(APIView):
@@ -953,7 +974,7 @@ class UserFavoritedMixesView(APIView):
         operation_summary="Получение списка избранных миксов пользователя",
         operation_description=(
                 "Возвращает список миксов, добавленных текущим пользователем в избранное.\n\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
                 "- Требуется аутентификация через JWT."
         ),
         request_body=openapi.Schema(
@@ -962,6 +983,11 @@ class UserFavoritedMixesView(APIView):
                 'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
                                         example=10),
                 'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -1034,11 +1060,12 @@ class UserFavoritedMixesView(APIView):
         }
     )
     def post(self, request, *args, **kwargs):
-        favorited_mixes = Mixes.objects.filter(favorites__user=request.user)
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(favorited_mixes, request)
-        serializer = MixesSerializer(page, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
+        ordering = ('-favorited_at', '-id')
+        favorited_mixes = (Mixes.objects.favorited_by(request.user)
+                           .for_list(request.user, with_bowl=True).order_by(*ordering))
+        paginator = get_pagination(request, ordering=ordering)
+        page = paginator.paginate_queryset(mix_list_values(favorited_mixes, ordering, with_bowl=True), request)
+        return paginator.get_paginated_response(project_mixes(page, request, with_bowl=True))
 
 
 class MixesContainedAPIView(APIView):
@@ -1047,22 +1074,31 @@ class MixesContainedAPIView(APIView):
 
     @swagger_auto_schema(
         tags=['Миксы'],
-        operation_summary="Получение списка миксов, содержащих указанный табак",
+        operation_summary="Получение списка миксов, содержащих указанные табаки",
         operation_description=(
-                "Возвращает пагинированный список миксов, которые содержат табак с указанным ID.\n\n"
-                "- Требуется передать `id` табака в теле запроса.\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`."
+                "Возвращает пагинированный список миксов, которые содержат указанные табаки.\n\n"
+                "- Табаки передаются списком `ids` или одним `id`.\n"
+                "- `mode`: `all` (по умолчанию) — миксы со всеми табаками, `any` — хотя бы с одним.\n"
+                "- Выдача упорядочена по числу совпавших табаков (`overlap`), затем по лайкам.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`."
         ),
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
-            required=['id'],
             properties={
+                'ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                    description="ID табаков",
+                    example=["123e4567-e89b-12d3-a456-426614174000"]
+                ),
                 'id': openapi.Schema(
                     type=openapi.TYPE_STRING,
                     format=openapi.FORMAT_UUID,
-                    description="ID табака",
+                    description="ID одного табака (если `ids` не передан)",
                     example="123e4567-e89b-12d3-a456-426614174000"
                 ),
+                'mode': openapi.Schema(type=openapi.TYPE_STRING, enum=list(CONTAINMENT_MODES),
+                                       description="Все табаки или любой из них", example="all"),
                 'limit': openapi.Schema(
                     type=openapi.TYPE_INTEGER,
                     description="Максимальное количество записей",
@@ -1073,6 +1109,11 @@ class MixesContainedAPIView(APIView):
                     description="Смещение для пагинации",
                     example=0
                 ),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -1096,6 +1137,7 @@ class MixesContainedAPIView(APIView):
                                             "id": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID,
                                                                  example="550e8400-e29b-41d4-a716-446655440000"),
                                             "name": openapi.Schema(type=openapi.TYPE_STRING, example="Fruit Mix"),
+                                            "overlap": openapi.Schema(type=openapi.TYPE_INTEGER, example=2),
                                             "description": openapi.Schema(type=openapi.TYPE_STRING,
                                                                           example="Сочный фруктовый микс"),
                                             "banner": openapi.Schema(type=openapi.TYPE_STRING,
@@ -1182,7 +1224,7 @@ class MixesContainedAPIView(APIView):
                     properties={
                         "status": openapi.Schema(type=openapi.TYPE_STRING, example="bad"),
                         "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=400),
-                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Tobacco ID is required"),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Tobacco IDs are required"),
                         "data": openapi.Schema(type=openapi.TYPE_STRING, example="null"),
                     }
                 )
@@ -1202,23 +1244,238 @@ class MixesContainedAPIView(APIView):
         }
     )
     def post(self, request):
-        tobacco_id = request.data.get('id')
-        if not tobacco_id:
-            return Response({"status": "bad", "code": 400, "message": "Tobacco ID is required", "data": None},
+        tobacco_ids = request.data.get('ids')
+        if tobacco_ids is None and request.data.get('id'):
+            tobacco_ids = [request.data.get('id')]
+        if not tobacco_ids or not isinstance(tobacco_ids, list):
+            return Response({"status": "bad", "code": 400, "message": "Tobacco IDs are required", "data": None},
+                            status=400)
+        mode = request.data.get('mode', CONTAINMENT_ALL)
+        if mode not in CONTAINMENT_MODES:
+            return Response({"status": "bad", "code": 400, "message": "Mode must be 'all' or 'any'", "data": None},
                             status=400)
 
         try:
-            tobacco = Tobaccos.objects.get(id=tobacco_id)
-        except (ValueError, Tobaccos.DoesNotExist):
+            tobacco_ids = {uuid.UUID(str(tobacco_id)) for tobacco_id in tobacco_ids}
+        except ValueError:
+            tobacco_ids = None
+        if not tobacco_ids or Tobaccos.objects.filter(id__in=tobacco_ids).count() != len(tobacco_ids):
             return Response({"status": "bad", "code": 404, "message": "Tobacco not found", "data": None}, status=404)
 
-        mixes = Mixes.objects.filter(compares__tobacco=tobacco)
+        # Выдача и её порядок — из индекса в памяти; из базы читается только страница
+        ranking = tobacco_mixes.search(tobacco_ids, mode)
+        paginator = get_pagination(request, ordering=CONTAINMENT_ORDERING)
+        page = paginator.paginate_queryset(ranking, request)
+        overlap = {row['id']: row['overlap'] for row in page}
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=overlap).for_list(request.user)))
+        order = {mix_id: position for position, mix_id in enumerate(overlap)}
+        rows.sort(key=lambda row: order[row['id']])
+        results = project_mixes(rows, request)
+        for item, row in zip(results, rows):
+            item['overlap'] = overlap[row['id']]
+        return paginator.get_paginated_response(results)
 
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(mixes, request)
-        context = {'request': request}
-        serializer = MixesListSerializer(page, many=True, context=context)
-        return paginator.get_paginated_response(serializer.data)
+
+class MixesSimilarAPIView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=['Миксы'],
+        operation_summary="Похожие миксы",
+        operation_description=(
+                "Возвращает миксы, похожие на указанный, по убыванию сходства.\n\n"
+                "- Сходство — косинусное по составу: табаки с их долями, категории вкусов и тип вкуса.\n"
+                "- `limit` — количество миксов (по умолчанию 10, не больше 50).\n"
+                "- Каждый микс дополнен полем `similarity` от 0 до 1.\n"
+                "- Доступно всем пользователям без аутентификации."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['id'],
+            properties={
+                'id': openapi.Schema(type=openapi.TYPE_STRING, description="ID микса",
+                                     example="550e8400-e29b-41d4-a716-446655440000"),
+                'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество похожих миксов",
+                                        example=10),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Похожие миксы успешно получены",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=200),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING,
+                                                  example="Похожие миксы успешно получены"),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "results": openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            "id": openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 example="550e8400-e29b-41d4-a716-446655440001"),
+                                            "name": openapi.Schema(type=openapi.TYPE_STRING, example="Berry Mix"),
+                                            "similarity": openapi.Schema(type=openapi.TYPE_NUMBER, example=0.87),
+                                            "likes_count": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                                            "categories": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                                                type=openapi.TYPE_OBJECT)),
+                                            "goods": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                                    items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                            "author": openapi.Schema(type=openapi.TYPE_OBJECT),
+                                        }
+                                    )
+                                ),
+                            }
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Некорректные данные",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="bad"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=400),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Поле 'id' обязательно"),
+                        "data": openapi.Schema(type=openapi.TYPE_STRING, example="null"),
+                    }
+                )
+            ),
+            404: openapi.Response(
+                description="Микс не найден",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="bad"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=404),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Микс с указанным ID не найден"),
+                        "data": openapi.Schema(type=openapi.TYPE_STRING, example="null"),
+                    }
+                )
+            )
+        }
+    )
+    def post(self, request):
+        mix_id = request.data.get('id')
+        if not mix_id:
+            return Response({"status": "bad", "code": 400, "message": "Поле 'id' обязательно", "data": None},
+                            status=400)
+        try:
+            mix_id = uuid.UUID(str(mix_id))
+        except ValueError:
+            mix_id = None
+        if mix_id is None or not Mixes.objects.filter(pk=mix_id).exists():
+            return Response({"status": "bad", "code": 404, "message": "Микс с указанным ID не найден", "data": None},
+                            status=404)
+        try:
+            limit = int(request.data.get('limit', settings.SIMILAR_MIXES_DEFAULT_LIMIT))
+        except (ValueError, TypeError):
+            limit = settings.SIMILAR_MIXES_DEFAULT_LIMIT
+        limit = max(0, min(limit, settings.SIMILAR_MIXES_MAX_LIMIT))
+
+        ranked = similar_mixes.similar(mix_id, limit)
+        positions = {pk: position for position, (pk, _) in enumerate(ranked)}
+        # Миксы, удалённые после построения индекса, просто выпадают из выдачи
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=positions).for_list(request.user)))
+        rows.sort(key=lambda row: positions[row['id']])
+        results = project_mixes(rows, request)
+        for item, row in zip(results, rows):
+            item['similarity'] = round(ranked[positions[row['id']]][1], 4)
+        return Response({
+            "status": "ok",
+            "code": status.HTTP_200_OK,
+            "message": "Похожие миксы успешно получены",
+            "data": {"results": results}
+        }, status=status.HTTP_200_OK)
+
+
+class MixesTrendingAPIView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=['Миксы'],
+        operation_summary="Лента трендовых миксов",
+        operation_description=(
+                "Возвращает миксы по убыванию трендовой оценки.\n\n"
+                "- Оценка — сумма лайков и добавлений в избранное, вклад которых убывает вдвое за период "
+                "полураспада (по умолчанию сутки); каждый микс дополнен полем `trendingScore`.\n"
+                "- Миксы без недавних лайков в ленту не попадают.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
+                "- Доступно всем пользователям без аутентификации."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
+                                        example=10),
+                'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Лента трендов успешно получена",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=200),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Список миксов успешно получен"),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "results": openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            "id": openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 example="550e8400-e29b-41d4-a716-446655440000"),
+                                            "name": openapi.Schema(type=openapi.TYPE_STRING, example="Fruit Mix"),
+                                            "trendingScore": openapi.Schema(type=openapi.TYPE_NUMBER, example=12.37),
+                                            "likes_count": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                                            "categories": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                                                type=openapi.TYPE_OBJECT)),
+                                            "goods": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                                    items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                            "author": openapi.Schema(type=openapi.TYPE_OBJECT),
+                                        }
+                                    )
+                                ),
+                                "count": openapi.Schema(type=openapi.TYPE_INTEGER, example=15),
+                                "next_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=10),
+                                "previous_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=0),
+                            }
+                        )
+                    }
+                )
+            ),
+        }
+    )
+    def post(self, request):
+        # Страница берётся проходом по индексу оценок, миксы — только для неё
+        paginator = get_pagination(request, ordering=TRENDING_ORDERING)
+        page = paginator.paginate_queryset(MixTrending.objects.values('mix', 'score'), request)
+        scores = {row['mix']: row['score'] for row in page}
+        order = {mix_id: position for position, mix_id in enumerate(scores)}
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=scores).for_list(request.user)))
+        rows.sort(key=lambda row: order[row['id']])
+        results = project_mixes(rows, request)
+        for item, row in zip(results, rows):
+            item['trendingScore'] = round(current_score(scores[row['id']]), 4)
+        return paginator.get_paginated_response(results)
 
 
 class MixesByAuthorAPIView(APIView):
@@ -1231,7 +1488,7 @@ class MixesByAuthorAPIView(APIView):
         operation_description=
         "Возвращает список миксов, созданных пользователем с указанным ID. Доступно только авторизованным пользователям через JWT.\n"
         "- Требуется поле`author_id`.\n"
-        "- Поддерживает пагинацию через параметры `limit` и `offset`.\n",
+        "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             required=['author_id'],
@@ -1241,6 +1498,11 @@ class MixesByAuthorAPIView(APIView):
                 'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
                                         example=10),
                 'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -1303,14 +1565,184 @@ class MixesByAuthorAPIView(APIView):
             }, status=400)
 
         # Фильтрация миксов по автору
-        mixes = Mixes.objects.filter(author_id=author_id)
+        mixes = Mixes.objects.filter(author_id=author_id).for_list(request.user)
+
+        # Пагинация: limit/offset или курсор
+        paginator = get_pagination(request, ordering=MIX_LIST_ORDERING)
+        page = paginator.paginate_queryset(mix_list_values(mixes, MIX_LIST_ORDERING), request)
+
+        # Сборка ответа из колонок без сериализатора и формирование ответа с пагинацией
+        return paginator.get_paginated_response(project_mixes(page, request))
+
+
+class UserRecommendedMixesView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=['Миксы'],
+        operation_summary="Рекомендованные миксы пользователя",
+        operation_description=(
+                "Возвращает миксы, рекомендованные текущему пользователю по его лайкам и избранному.\n\n"
+                "- Рекомендации — миксы, которые нравятся пользователям с похожими вкусами; "
+                "каждый микс дополнен полем `score`.\n"
+                "- Пока у пользователя нет лайков, возвращаются популярные миксы.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
+                "- Требуется аутентификация через JWT."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
+                                        example=10),
+                'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Рекомендации успешно получены",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=200),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Список миксов успешно получен"),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "results": openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            "id": openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 example="550e8400-e29b-41d4-a716-446655440000"),
+                                            "name": openapi.Schema(type=openapi.TYPE_STRING, example="Fruit Mix"),
+                                            "score": openapi.Schema(type=openapi.TYPE_NUMBER, example=1.42),
+                                            "likes_count": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                                            "categories": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                                                type=openapi.TYPE_OBJECT)),
+                                            "goods": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                                    items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                            "author": openapi.Schema(type=openapi.TYPE_OBJECT),
+                                        }
+                                    )
+                                ),
+                                "count": openapi.Schema(type=openapi.TYPE_INTEGER, example=50),
+                                "next_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=10),
+                                "previous_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=0),
+                            }
+                        )
+                    }
+                )
+            ),
+            401: openapi.Response(description="Ошибка: не авторизован"),
+        }
+    )
+    def post(self, request):
+        # Готовый список пользователя — одна строка по первичному ключу
+        stored = UserRecommendations.objects.filter(user=request.user).values_list('mixes', flat=True).first()
+        if not stored:
+            # Без лайков и избранного рекомендовать нечего: популярные миксы, которые пользователь ещё не лайкнул
+            ordering = ('-likes_count', '-id')
+            popular = Mixes.objects.exclude(likes__user=request.user).for_list(request.user).order_by(*ordering)
+            paginator = get_pagination(request, ordering=ordering)
+            page = paginator.paginate_queryset(mix_list_values(popular, ordering), request)
+            return paginator.get_paginated_response(project_mixes(page, request))
 
-        # Пагинация (если используется в проекте)
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(mixes, request)
+        ranking = Ranking([uuid.UUID(mix_id) for mix_id, _ in stored], rank=range(len(stored)))
+        paginator = get_pagination(request, ordering=('rank',))
+        page = paginator.paginate_queryset(ranking, request)
+        ranks = {row['id']: row['rank'] for row in page}
+        # Миксы, удалённые после расчёта списка, просто выпадают из страницы
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=ranks).for_list(request.user)))
+        rows.sort(key=lambda row: ranks[row['id']])
+        results = project_mixes(rows, request)
+        for item, row in zip(results, rows):
+            item['score'] = stored[ranks[row['id']]][1]
+        return paginator.get_paginated_response(results)
 
-        # Сериализация данных
-        serializer = MixesListSerializer(page, many=True, context={'request': request})
 
-        # Формирование ответа с пагинацией
-        return paginator.get_paginated_response(serializer.data)
+class UserTimelineView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=['Миксы'],
+        operation_summary="Лента подписок",
+        operation_description=(
+                "Возвращает новые миксы авторов, на которых подписан текущий пользователь, от новых к старым.\n\n"
+                "- Подписка оформляется через `/api/v1/users/follow/`.\n"
+                "- В ленте хранится не больше 500 последних миксов.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
+                "- Требуется аутентификация через JWT."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'limit': openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
+                                        example=10),
+                'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Лента подписок успешно получена",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=200),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Список миксов успешно получен"),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "results": openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            "id": openapi.Schema(type=openapi.TYPE_STRING,
+                                                                 example="550e8400-e29b-41d4-a716-446655440000"),
+                                            "name": openapi.Schema(type=openapi.TYPE_STRING, example="Fruit Mix"),
+                                            "created": openapi.Schema(type=openapi.TYPE_STRING,
+                                                                      example="2023-01-01T12:00:00Z"),
+                                            "likes_count": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                                            "categories": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                                                type=openapi.TYPE_OBJECT)),
+                                            "goods": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                                    items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                            "author": openapi.Schema(type=openapi.TYPE_OBJECT),
+                                        }
+                                    )
+                                ),
+                                "count": openapi.Schema(type=openapi.TYPE_INTEGER, example=15),
+                                "next_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=10),
+                                "previous_offset": openapi.Schema(type=openapi.TYPE_INTEGER, example=0),
+                            }
+                        )
+                    }
+                )
+            ),
+            401: openapi.Response(description="Ошибка: не авторизован"),
+        }
+    )
+    def post(self, request):
+        # Строки ленты и миксы крупных авторов сливаются в памяти; из базы читаются только миксы страницы
+        paginator = get_pagination(request, ordering=TIMELINE_ORDERING)
+        page = paginator.paginate_queryset(home_timeline(request.user), request)
+        order = {row['id']: position for position, row in enumerate(page)}
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=order).for_list(request.user)))
+        rows.sort(key=lambda row: order[row['id']])
+        return paginator.get_paginated_response(project_mixes(rows, request))
+
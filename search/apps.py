@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        # Подключаем обработчики, которые держат поисковый индекс в актуальном состоянии
+        from search import signals  # noqa: F401
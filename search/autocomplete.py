@@ -0,0 +1,109 @@
+"""Автодополнение по вкусам табаков, производителям и миксам без обращения к БД.
+
+Индекс — отсортированный список кортежей `(ключ, тип, id)`. Ключ — это
+нормализованное (латиница, нижний регистр) название, начиная с каждого
+слова, поэтому «mint» находит и «Mint», и «Grape Mint». Поиск по префиксу —
+`bisect` плюс короткий проход по диапазону совпадений."""
+import heapq
+import itertools
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from manufacturers.models import Manufacturers
+from mixes.models import Mixes
+from search.fuzzy import normalize
+from tobaccos.models import Tobaccos
+from utils.worker_index import WorkerIndex
+
+TOBACCO = 'tobacco'
+MANUFACTURER = 'manufacturer'
+MIX = 'mix'
+KINDS = (TOBACCO, MANUFACTURER, MIX)
+
+
+def label_keys(label):
+    """Ключи названия: нормализованная строка, начиная с каждого слова."""
+    key = normalize(label)
+    keys = []
+    position = 0
+    for word in key.split(' '):
+        keys.append(key[position:])
+        position += len(word) + 1
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.entries = []  # отсортированные (ключ, тип, id)
+        self.labels = {}  # (тип, id) -> (название, ключи)
+
+    def _register(self, kind, pk, label):
+        self.remove(kind, pk)
+        keys = label_keys(label)
+        if not keys or not keys[0]:
+            return ()
+        self.labels[(kind, pk)] = (label, keys)
+        return keys
+
+    def add(self, kind, pk, label):
+        """Добавляет одну запись (правка из сигнала): `insort` по каждому ключу."""
+        for key in self._register(kind, pk, label):
+            insort(self.entries, (key, kind, pk))
+
+    def extend(self, rows):
+        """Добавляет записи `(тип, id, название)` пачкой: ключи дописываются в конец, затем один `sort`."""
+        for kind, pk, label in rows:
+            self.entries.extend((key, kind, pk) for key in self._register(kind, pk, label))
+        self.entries.sort()
+
+    def remove(self, kind, pk):
+        _, keys = self.labels.pop((kind, pk), (None, ()))
+        for key in keys:
+            position = bisect_left(self.entries, (key, kind, pk))
+            if position < len(self.entries) and self.entries[position] == (key, kind, pk):
+                del self.entries[position]
+
+    def search(self, prefix, limit, kinds=KINDS):
+        """Лучшие `limit` совпадений: сначала с начала названия, затем более короткие.
+
+        Просматривается не больше `AUTOCOMPLETE_SCAN_LIMIT` ключей диапазона."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        scan_limit = settings.AUTOCOMPLETE_SCAN_LIMIT
+        best = {}
+        position = bisect_left(self.entries, (prefix,))
+        for key, kind, pk in self.entries[position:position + scan_limit]:
+            if not key.startswith(prefix):
+                break
+            if kind not in kinds:
+                continue
+            label, keys = self.labels[(kind, pk)]
+            rank = (key != keys[0], len(label), label)
+            if (kind, pk) not in best or rank < best[(kind, pk)][0]:
+                best[(kind, pk)] = (rank, kind, pk, label)
+        return [
+            {"type": kind, "id": str(pk), "name": label}
+            for _, kind, pk, label in heapq.nsmallest(limit, best.values(), key=lambda item: item[0])
+        ]
+
+
+class AutocompleteIndex(WorkerIndex):
+    rebuild_interval_setting = 'AUTOCOMPLETE_REBUILD_INTERVAL'
+    warm_on_startup_setting = 'AUTOCOMPLETE_WARM_ON_STARTUP'
+
+    def build(self):
+        index = PrefixIndex()
+        index.extend(itertools.chain(
+            ((TOBACCO, pk, taste or '') for pk, taste in Tobaccos.objects.values_list('pk', 'taste').iterator()),
+            ((MANUFACTURER, pk, name) for pk, name in Manufacturers.objects.values_list('pk', 'name').iterator()),
+            ((MIX, pk, name) for pk, name in Mixes.objects.values_list('pk', 'name').iterator()),
+        ))
+        return index
+
+    def search(self, query, limit=10, kinds=KINDS):
+        return self.query(PrefixIndex.search, query, limit, kinds)
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,80 @@
+"""Полнотекстовый поиск: MySQL FULLTEXT в продакшене, SQLite FTS5 в тестах.
+
+Каждый бэкенд возвращает первичные ключи документов, отсортированные по
+релевантности. Для прочих СУБД (и для слишком коротких запросов, которые
+FULLTEXT не индексирует) используется поиск подстрокой без ранжирования."""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(query):
+    """Разбивает поисковую строку на слова в нижнем регистре."""
+    return WORD_RE.findall(str(query).lower())
+
+
+class IContainsBackend:
+    """Запасной бэкенд: подстрока в заголовке или тексте документа."""
+
+    def search(self, model, query, limit):
+        query = str(query).strip()
+        if not query:
+            return []
+        rows = model.objects.filter(Q(title__icontains=query) | Q(body__icontains=query))
+        return list(rows.values_list('pk', flat=True)[:limit])
+
+
+class MySQLFullTextBackend(IContainsBackend):
+    """FULLTEXT-индекс InnoDB в режиме BOOLEAN MODE с префиксным поиском слов."""
+
+    # innodb_ft_min_token_size по умолчанию: более короткие слова не индексируются
+    min_token_size = 3
+
+    def search(self, model, query, limit):
+        terms = [term for term in query_terms(query) if len(term) >= self.min_token_size]
+        if not terms:
+            return super().search(model, query, limit)
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        against = ' '.join(f'{term}*' for term in terms)
+        sql = (
+            f"SELECT {pk}, MATCH(title) AGAINST (%s IN BOOLEAN MODE) * 2"
+            f" + MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) AS score"
+            f" FROM {table} WHERE MATCH(title, body) AGAINST (%s IN BOOLEAN MODE)"
+            f" ORDER BY score DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [against, against, against, limit])
+            return [model._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+
+
+class SQLiteFTS5Backend(IContainsBackend):
+    """Внешняя FTS5-таблица `<db_table>_fts`, ранжирование по bm25 с весом заголовка."""
+
+    def search(self, model, query, limit):
+        terms = query_terms(query)
+        if not terms:
+            return super().search(model, query, limit)
+        table = model._meta.db_table
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        match = ' OR '.join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT d.{pk} FROM {table}_fts AS f JOIN {table} AS d ON d.rowid = f.rowid"
+            f" WHERE {table}_fts MATCH %s ORDER BY bm25({table}_fts, 2.0, 1.0) LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match, limit])
+            return [model._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'mysql': MySQLFullTextBackend,
+    'sqlite': SQLiteFTS5Backend,
+}
+
+
+def get_backend():
+    return BACKENDS.get(connection.vendor, IContainsBackend)()
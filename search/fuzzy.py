@@ -0,0 +1,87 @@
+"""Нечёткий поиск табаков по триграммам с транслитерацией кириллицы.
+
+Вкусы и производители хранятся в основном латиницей, а пользователи набирают
+их кириллицей и с опечатками. И ключи, и запрос нормализуются и переводятся в
+латиницу, после чего сравниваются по коэффициенту Жаккара множеств триграмм
+(как `pg_trgm`). Кандидатов отбирает индекс по таблице триграмм."""
+import math
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast
+
+from search.models import TobaccoFuzzyKey, TobaccoTrigram
+from tobaccos.models import Tobaccos
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+TRANSLITERATION = str.maketrans(CYRILLIC_TO_LATIN)
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+MAX_KEY_LENGTH = 255
+KEYS_PER_TOBACCO = 2
+
+
+def normalize(text):
+    """Нижний регистр, латиница, без диакритики и знаков препинания."""
+    text = str(text or '').lower().translate(TRANSLITERATION)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return NON_WORD_RE.sub(' ', text).strip()[:MAX_KEY_LENGTH]
+
+
+def trigrams(key):
+    """Множество триграмм ключа; слова дополняются пробелами, как в `pg_trgm`."""
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def tobacco_keys(taste, manufacturer):
+    """Ключи табака: вкус и «производитель вкус»."""
+    keys = {normalize(taste), normalize(f'{manufacturer} {taste}')}
+    return [key for key in keys if key]
+
+
+def index_tobacco_keys(tobacco_id):
+    """Пересобирает ключи и триграммы одного табака."""
+    tobacco = Tobaccos.objects.filter(pk=tobacco_id).values('taste', 'manufacturer__name').first()
+    with transaction.atomic():
+        TobaccoFuzzyKey.objects.filter(tobacco_id=tobacco_id).delete()
+        if tobacco is None:
+            return
+        for key in tobacco_keys(tobacco['taste'], tobacco['manufacturer__name']):
+            grams = trigrams(key)
+            fuzzy_key = TobaccoFuzzyKey.objects.create(tobacco_id=tobacco_id, key=key, trigram_count=len(grams))
+            TobaccoTrigram.objects.bulk_create([TobaccoTrigram(key=fuzzy_key, trigram=gram) for gram in grams])
+
+
+def fuzzy_search_tobaccos(query, limit=None, threshold=None):
+    """Первичные ключи табаков по убыванию триграммного сходства с запросом.
+
+    Ключ может подойти, только если делит с запросом не меньше
+    `threshold * |триграммы запроса|` триграмм, — это условие уходит в HAVING."""
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    threshold = settings.FUZZY_SEARCH_THRESHOLD if threshold is None else threshold
+    query_grams = trigrams(normalize(query))
+    if not query_grams:
+        return []
+    size = len(query_grams)
+    candidates = (TobaccoTrigram.objects.filter(trigram__in=query_grams)
+                  .values('key', 'key__tobacco_id', 'key__trigram_count')
+                  .annotate(shared=Count('pk'))
+                  .filter(shared__gte=max(1, math.ceil(threshold * size)))
+                  .annotate(similarity=Cast(F('shared'), FloatField())
+                            / (size + F('key__trigram_count') - F('shared')))
+                  .filter(similarity__gte=threshold)
+                  .order_by('-similarity', 'key'))
+    # У табака не больше KEYS_PER_TOBACCO ключей, поэтому такого запаса хватает на limit табаков
+    rows = candidates.values_list('key__tobacco_id', flat=True)[:limit * KEYS_PER_TOBACCO]
+    return list(dict.fromkeys(rows))[:limit]
@@ -0,0 +1,53 @@
+"""Построение поисковых документов и ранжированный поиск по ним."""
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+
+from mixes.models import Mixes, MixTobacco
+from search.backends import get_backend
+from search.models import MixSearchDocument, TobaccoSearchDocument
+from tobaccos.models import Tobaccos
+
+
+def index_mix(mix_id):
+    """Пересобирает документ микса: вкусы и производители его табаков попадают в текст."""
+    mix = Mixes.objects.filter(pk=mix_id).values('name', 'description').first()
+    if mix is None:
+        MixSearchDocument.objects.filter(mix_id=mix_id).delete()
+        return
+    goods = MixTobacco.objects.filter(mix_id=mix_id).values_list('tobacco__taste', 'tobacco__manufacturer__name')
+    body = ' '.join([mix['description'] or ''] + [f'{taste or ""} {manufacturer}' for taste, manufacturer in goods])
+    MixSearchDocument.objects.update_or_create(mix_id=mix_id, defaults={'title': mix['name'], 'body': body})
+
+
+def index_tobacco(tobacco_id):
+    """Пересобирает документ табака."""
+    tobacco = Tobaccos.objects.filter(pk=tobacco_id).values('taste', 'description', 'manufacturer__name').first()
+    if tobacco is None:
+        TobaccoSearchDocument.objects.filter(tobacco_id=tobacco_id).delete()
+        return
+    body = f"{tobacco['description'] or ''} {tobacco['manufacturer__name']}"
+    TobaccoSearchDocument.objects.update_or_create(
+        tobacco_id=tobacco_id, defaults={'title': tobacco['taste'] or '', 'body': body})
+
+
+def search_mixes(query, limit=None):
+    """Первичные ключи миксов по убыванию релевантности."""
+    return get_backend().search(MixSearchDocument, query, limit or settings.SEARCH_RESULTS_LIMIT)
+
+
+def search_tobaccos(query, limit=None):
+    """Первичные ключи табаков по убыванию релевантности."""
+    return get_backend().search(TobaccoSearchDocument, query, limit or settings.SEARCH_RESULTS_LIMIT)
+
+
+def rank_queryset(queryset, pks):
+    """Оставляет в выборке найденные объекты и аннотирует их позицию в `search_rank`."""
+    if not pks:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+    rank = Case(*[When(pk=pk, then=Value(position)) for position, pk in enumerate(pks)],
+                output_field=IntegerField())
+    return queryset.filter(pk__in=pks).annotate(search_rank=rank)
+
+
+# Порядок выдачи поиска: по релевантности, затем по ключу для стабильной пагинации
+SEARCH_ORDERING = ('search_rank', 'id')
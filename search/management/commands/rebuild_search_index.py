@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from mixes.models import Mixes
+from search.fuzzy import index_tobacco_keys
+from search.indexing import index_mix, index_tobacco
+from tobaccos.models import Tobaccos
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковые документы миксов и табаков и ключи нечёткого поиска"
+
+    def handle(self, *args, **options):
+        tobaccos = 0
+        for tobacco_id in Tobaccos.objects.values_list('pk', flat=True).iterator():
+            index_tobacco(tobacco_id)
+            index_tobacco_keys(tobacco_id)
+            tobaccos += 1
+        mixes = 0
+        for mix_id in Mixes.objects.values_list('pk', flat=True).iterator():
+            index_mix(mix_id)
+            mixes += 1
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано {tobaccos} табаков и {mixes} миксов."))
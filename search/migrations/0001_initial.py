@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-17 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('mixes', '0003_mix_counters'),
+        ('tobaccos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MixSearchDocument',
+            fields=[
+                ('mix', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='mixes.mixes', verbose_name='Микс')),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('body', models.TextField(blank=True, default='', verbose_name='Текст')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ микса',
+                'verbose_name_plural': 'Поисковые документы миксов',
+                'db_table': 'app_mixsearchdocument',
+            },
+        ),
+        migrations.CreateModel(
+            name='TobaccoSearchDocument',
+            fields=[
+                ('tobacco', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='tobaccos.tobaccos', verbose_name='Табак')),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('body', models.TextField(blank=True, default='', verbose_name='Текст')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ табака',
+                'verbose_name_plural': 'Поисковые документы табаков',
+                'db_table': 'app_tobaccosearchdocument',
+            },
+        ),
+    ]
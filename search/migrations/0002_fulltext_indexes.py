@@ -0,0 +1,80 @@
+from django.db import migrations
+
+DOCUMENT_TABLES = ('app_mixsearchdocument', 'app_tobaccosearchdocument')
+
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE {table}_fts USING fts5(title, body, content='{table}', content_rowid='rowid',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER {table}_ai AFTER INSERT ON {table} BEGIN"
+    " INSERT INTO {table}_fts(rowid, title, body) VALUES (new.rowid, new.title, new.body); END",
+    "CREATE TRIGGER {table}_ad AFTER DELETE ON {table} BEGIN"
+    " INSERT INTO {table}_fts({table}_fts, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);"
+    " END",
+    "CREATE TRIGGER {table}_au AFTER UPDATE ON {table} BEGIN"
+    " INSERT INTO {table}_fts({table}_fts, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);"
+    " INSERT INTO {table}_fts(rowid, title, body) VALUES (new.rowid, new.title, new.body); END",
+)
+
+SQLITE_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS {table}_ai",
+    "DROP TRIGGER IF EXISTS {table}_ad",
+    "DROP TRIGGER IF EXISTS {table}_au",
+    "DROP TABLE IF EXISTS {table}_fts",
+)
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in DOCUMENT_TABLES:
+        if vendor == 'mysql':
+            schema_editor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {table}_title_ft (title)")
+            schema_editor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {table}_ft (title, body)")
+        elif vendor == 'sqlite':
+            for statement in SQLITE_FTS:
+                schema_editor.execute(statement.format(table=table))
+
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in DOCUMENT_TABLES:
+        if vendor == 'mysql':
+            schema_editor.execute(f"ALTER TABLE {table} DROP INDEX {table}_title_ft")
+            schema_editor.execute(f"ALTER TABLE {table} DROP INDEX {table}_ft")
+        elif vendor == 'sqlite':
+            for statement in SQLITE_FTS_DROP:
+                schema_editor.execute(statement.format(table=table))
+
+
+def fill_documents(apps, schema_editor):
+    """Индексирует уже существующие миксы и табаки."""
+    Mixes = apps.get_model('mixes', 'Mixes')
+    MixTobacco = apps.get_model('mixes', 'MixTobacco')
+    Tobaccos = apps.get_model('tobaccos', 'Tobaccos')
+    MixSearchDocument = apps.get_model('search', 'MixSearchDocument')
+    TobaccoSearchDocument = apps.get_model('search', 'TobaccoSearchDocument')
+
+    for tobacco in Tobaccos.objects.select_related('manufacturer').iterator():
+        TobaccoSearchDocument.objects.create(
+            tobacco_id=tobacco.pk, title=tobacco.taste or '',
+            body=f"{tobacco.description or ''} {tobacco.manufacturer.name}")
+
+    goods = {}
+    for mix_id, taste, manufacturer in MixTobacco.objects.values_list(
+            'mix_id', 'tobacco__taste', 'tobacco__manufacturer__name').iterator():
+        goods.setdefault(mix_id, []).append(f'{taste or ""} {manufacturer}')
+    for mix in Mixes.objects.only('pk', 'name', 'description').iterator():
+        MixSearchDocument.objects.create(
+            mix_id=mix.pk, title=mix.name,
+            body=' '.join([mix.description or ''] + goods.get(mix.pk, [])))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
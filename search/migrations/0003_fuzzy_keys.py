@@ -0,0 +1,91 @@
+# Generated by Django 5.0 on 2026-10-17 23:50
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Копия помощников из search/fuzzy.py на момент миграции: их дальнейшие правки не должны менять её результат
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+TRANSLITERATION = str.maketrans(CYRILLIC_TO_LATIN)
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+MAX_KEY_LENGTH = 255
+
+
+def normalize(text):
+    text = str(text or '').lower().translate(TRANSLITERATION)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return NON_WORD_RE.sub(' ', text).strip()[:MAX_KEY_LENGTH]
+
+
+def trigrams(key):
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def tobacco_keys(taste, manufacturer):
+    keys = {normalize(taste), normalize(f'{manufacturer} {taste}')}
+    return [key for key in keys if key]
+
+
+def fill_fuzzy_keys(apps, schema_editor):
+    """Строит ключи нечёткого поиска для уже существующих табаков."""
+    Tobaccos = apps.get_model('tobaccos', 'Tobaccos')
+    TobaccoFuzzyKey = apps.get_model('search', 'TobaccoFuzzyKey')
+    TobaccoTrigram = apps.get_model('search', 'TobaccoTrigram')
+
+    for tobacco_id, taste, manufacturer in Tobaccos.objects.values_list(
+            'pk', 'taste', 'manufacturer__name').iterator():
+        for key in tobacco_keys(taste, manufacturer):
+            grams = trigrams(key)
+            fuzzy_key = TobaccoFuzzyKey.objects.create(tobacco_id=tobacco_id, key=key, trigram_count=len(grams))
+            TobaccoTrigram.objects.bulk_create([TobaccoTrigram(key=fuzzy_key, trigram=gram) for gram in grams])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_indexes'),
+        ('tobaccos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TobaccoFuzzyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Ключ')),
+                ('trigram_count', models.PositiveSmallIntegerField(verbose_name='Количество триграмм')),
+                ('tobacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fuzzy_keys', to='tobaccos.tobaccos', verbose_name='Табак')),
+            ],
+            options={
+                'verbose_name': 'Ключ нечёткого поиска табака',
+                'verbose_name_plural': 'Ключи нечёткого поиска табаков',
+                'db_table': 'app_tobaccofuzzykey',
+            },
+        ),
+        migrations.CreateModel(
+            name='TobaccoTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, verbose_name='Триграмма')),
+                ('key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='search.tobaccofuzzykey', verbose_name='Ключ')),
+            ],
+            options={
+                'verbose_name': 'Триграмма табака',
+                'verbose_name_plural': 'Триграммы табаков',
+                'db_table': 'app_tobaccotrigram',
+                'indexes': [models.Index(fields=['trigram', 'key'], name='app_tobaccotrigram_lookup')],
+            },
+        ),
+        migrations.RunPython(fill_fuzzy_keys, migrations.RunPython.noop),
+    ]
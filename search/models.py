@@ -0,0 +1,83 @@
+from django.db import models
+
+from mixes.models import Mixes
+from tobaccos.models import Tobaccos
+
+
+class MixSearchDocument(models.Model):
+    """Поисковый документ микса: название, описание, вкусы и производители табаков.
+
+    На MySQL по колонкам построен FULLTEXT-индекс, на SQLite — внешняя FTS5-таблица
+    `app_mixsearchdocument_fts`, синхронизируемая триггерами."""
+    mix = models.OneToOneField(
+        Mixes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Микс",
+        related_name="search_document")
+
+    title = models.CharField("Заголовок", max_length=200)
+    body = models.TextField("Текст", blank=True, default='')
+
+    class Meta:
+        verbose_name = "Поисковый документ микса"
+        verbose_name_plural = "Поисковые документы миксов"
+        db_table = "app_mixsearchdocument"
+
+
+class TobaccoSearchDocument(models.Model):
+    """Поисковый документ табака: вкус, описание и производитель."""
+    tobacco = models.OneToOneField(
+        Tobaccos,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Табак",
+        related_name="search_document")
+
+    title = models.CharField("Заголовок", max_length=200)
+    body = models.TextField("Текст", blank=True, default='')
+
+    class Meta:
+        verbose_name = "Поисковый документ табака"
+        verbose_name_plural = "Поисковые документы табаков"
+        db_table = "app_tobaccosearchdocument"
+
+
+class TobaccoFuzzyKey(models.Model):
+    """Нормализованный и транслитерированный ключ табака для нечёткого поиска.
+
+    У каждого табака два ключа: вкус и «производитель вкус». Все ключи
+    приводятся к латинице, поэтому запрос на кириллице сравнивается с ними
+    в одном алфавите."""
+    tobacco = models.ForeignKey(
+        Tobaccos,
+        on_delete=models.CASCADE,
+        verbose_name="Табак",
+        related_name="fuzzy_keys")
+
+    key = models.CharField("Ключ", max_length=255)
+    trigram_count = models.PositiveSmallIntegerField("Количество триграмм")
+
+    class Meta:
+        verbose_name = "Ключ нечёткого поиска табака"
+        verbose_name_plural = "Ключи нечёткого поиска табаков"
+        db_table = "app_tobaccofuzzykey"
+
+
+class TobaccoTrigram(models.Model):
+    """Триграмма ключа нечёткого поиска; индекс по `trigram` отбирает кандидатов без перебора табаков."""
+    key = models.ForeignKey(
+        TobaccoFuzzyKey,
+        on_delete=models.CASCADE,
+        verbose_name="Ключ",
+        related_name="trigrams")
+
+    trigram = models.CharField("Триграмма", max_length=3)
+
+    class Meta:
+        verbose_name = "Триграмма табака"
+        verbose_name_plural = "Триграммы табаков"
+        db_table = "app_tobaccotrigram"
+        indexes = [
+            models.Index(fields=['trigram', 'key'], name='app_tobaccotrigram_lookup'),
+        ]
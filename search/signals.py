@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from jobs.registry import enqueue
+from manufacturers.models import Manufacturers
+from mixes.models import Mixes, MixTobacco
+from search.autocomplete import MANUFACTURER, MIX, TOBACCO, autocomplete_index
+from search.fuzzy import index_tobacco_keys
+from search.indexing import index_mix, index_tobacco
+from tobaccos.models import Tobaccos
+
+
+def mix_saved(sender, instance, **kwargs):
+    index_mix(instance.pk)
+    autocomplete_index.update(lambda index: index.add(MIX, instance.pk, instance.name))
+
+
+def mix_deleted(sender, instance, **kwargs):
+    autocomplete_index.update(lambda index: index.remove(MIX, instance.pk))
+
+
+def mix_tobacco_saved(sender, instance, **kwargs):
+    index_mix(instance.mix_id)
+
+
+def mix_tobacco_deleted(sender, instance, **kwargs):
+    # При каскадном удалении микса строка микса ещё существует, поэтому пересобираем после коммита
+    mix_id = instance.mix_id
+    transaction.on_commit(lambda: index_mix(mix_id))
+
+
+def tobacco_saved(sender, instance, **kwargs):
+    index_tobacco(instance.pk)
+    index_tobacco_keys(instance.pk)
+    autocomplete_index.update(lambda index: index.add(TOBACCO, instance.pk, instance.taste or ''))
+    for mix_id in MixTobacco.objects.filter(tobacco=instance).values_list('mix_id', flat=True).distinct():
+        index_mix(mix_id)
+
+
+def manufacturer_saved(sender, instance, created, **kwargs):
+    autocomplete_index.update(lambda index: index.add(MANUFACTURER, instance.pk, instance.name))
+    if not created:
+        # Название производителя входит в документы всех его табаков и миксов с ними: пересборка в фоне
+        enqueue('search.reindex_manufacturer', [str(instance.pk)])
+
+
+def tobacco_deleted(sender, instance, **kwargs):
+    autocomplete_index.update(lambda index: index.remove(TOBACCO, instance.pk))
+
+
+def manufacturer_deleted(sender, instance, **kwargs):
+    autocomplete_index.update(lambda index: index.remove(MANUFACTURER, instance.pk))
+
+
+post_save.connect(mix_saved, sender=Mixes, dispatch_uid='search_mix_saved')
+post_delete.connect(mix_deleted, sender=Mixes, dispatch_uid='search_mix_deleted')
+post_save.connect(mix_tobacco_saved, sender=MixTobacco, dispatch_uid='search_mix_tobacco_saved')
+post_delete.connect(mix_tobacco_deleted, sender=MixTobacco, dispatch_uid='search_mix_tobacco_deleted')
+post_save.connect(tobacco_saved, sender=Tobaccos, dispatch_uid='search_tobacco_saved')
+post_delete.connect(tobacco_deleted, sender=Tobaccos, dispatch_uid='search_tobacco_deleted')
+post_save.connect(manufacturer_saved, sender=Manufacturers, dispatch_uid='search_manufacturer_saved')
+post_delete.connect(manufacturer_deleted, sender=Manufacturers, dispatch_uid='search_manufacturer_deleted')
@@ -0,0 +1,17 @@
+from jobs.registry import task
+from mixes.models import MixTobacco
+from search.fuzzy import index_tobacco_keys
+from search.indexing import index_mix, index_tobacco
+from tobaccos.models import Tobaccos
+
+
+@task('search.reindex_manufacturer')
+def reindex_manufacturer(manufacturer_id):
+    """Пересобирает документы и ключи нечёткого поиска табаков производителя и документы миксов с ними."""
+    for tobacco_id in Tobaccos.objects.filter(manufacturer_id=manufacturer_id).values_list('pk', flat=True):
+        index_tobacco(tobacco_id)
+        index_tobacco_keys(tobacco_id)
+    mix_ids = (MixTobacco.objects.filter(tobacco__manufacturer_id=manufacturer_id)
+               .values_list('mix_id', flat=True).distinct())
+    for mix_id in mix_ids:
+        index_mix(mix_id)
@@ -0,0 +1,167 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from manufacturers.models import Manufacturers
+from mixes.models import Mixes, MixTobacco
+from search.autocomplete import autocomplete_index
+from search.indexing import search_mixes, search_tobaccos
+from search.models import MixSearchDocument
+from tobaccos.models import Tobaccos
+
+
+@pytest.fixture
+def api_client():
+    """Фикстура для создания клиента API."""
+    return APIClient()
+
+
+@pytest.fixture
+def create_catalog(db):
+    """Фикстура для создания производителя, табаков и миксов с ними."""
+    manufacturer = Manufacturers.objects.create(name="Darkside", description="")
+    mango = Tobaccos.objects.create(taste="Mango Lassi", manufacturer=manufacturer, description="Манго и йогурт")
+    mint = Tobaccos.objects.create(taste="Supernova", manufacturer=manufacturer, description="Холодок")
+    tropic = Mixes.objects.create(name="Тропики", description="Сладкий микс")
+    MixTobacco.objects.create(mix=tropic, tobacco=mango, weight=70)
+    MixTobacco.objects.create(mix=tropic, tobacco=mint, weight=30)
+    mango_mix = Mixes.objects.create(name="Mango Bomb", description="")
+    return {"manufacturer": manufacturer, "mango": mango, "mint": mint, "tropic": tropic, "mango_mix": mango_mix}
+
+
+@pytest.fixture
+def autocomplete(create_catalog):
+    """Фикстура со свежим индексом автодополнения, построенным по каталогу."""
+    autocomplete_index.reset()
+    autocomplete_index.warm()
+    yield autocomplete_index
+    autocomplete_index.reset()
+
+
+@pytest.mark.django_db
+def test_mix_search_matches_tobaccos(create_catalog):
+    """Микс находится по вкусу и производителю входящих в него табаков."""
+    assert search_mixes("darkside") == [create_catalog["tropic"].pk]
+    assert create_catalog["tropic"].pk in search_mixes("supernova")
+
+
+@pytest.mark.django_db
+def test_mix_search_ranks_title_first(create_catalog):
+    """Совпадение в названии микса ранжируется выше совпадения в составе."""
+    assert search_mixes("mango") == [create_catalog["mango_mix"].pk, create_catalog["tropic"].pk]
+
+
+@pytest.mark.django_db
+def test_search_prefix_and_cyrillic(create_catalog):
+    """Поиск работает по началу слова и без учёта регистра кириллицы."""
+    assert search_mixes("тропи") == [create_catalog["tropic"].pk]
+    assert search_tobaccos("ЙОГУРТ") == [create_catalog["mango"].pk]
+
+
+@pytest.mark.django_db
+def test_index_follows_changes(create_catalog, django_capture_on_commit_callbacks):
+    """Документы пересобираются при изменении табака и удалении его из микса."""
+    mint = create_catalog["mint"]
+    mint.taste = "Cola"
+    mint.save()
+    assert search_mixes("cola") == [create_catalog["tropic"].pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        MixTobacco.objects.filter(tobacco=mint).delete()
+    assert search_mixes("cola") == []
+
+    create_catalog["tropic"].delete()
+    assert not MixSearchDocument.objects.filter(mix_id=create_catalog["tropic"].pk).exists()
+
+
+@pytest.mark.django_db
+def test_mixes_list_search_endpoint(api_client, create_catalog):
+    """Эндпоинт списка миксов отдаёт результаты поиска по релевантности."""
+    response = api_client.post(reverse("mixes-list"), data={"search": "mango"}, format="json")
+    assert response.status_code == 200
+    names = [mix["name"] for mix in response.json()["data"]["results"]]
+    assert names == ["Mango Bomb", "Тропики"]
+
+
+@pytest.mark.django_db
+def test_fuzzy_search_transliteration_and_typos(create_catalog):
+    """Нечёткий поиск находит латинские вкусы по кириллице и с опечатками."""
+    from search.fuzzy import fuzzy_search_tobaccos
+
+    mango = create_catalog["mango"].pk
+    assert fuzzy_search_tobaccos("манго ласси")[0] == mango
+    assert fuzzy_search_tobaccos("mnago lasi")[0] == mango
+    assert fuzzy_search_tobaccos("дарксайд суперанова")[0] == create_catalog["mint"].pk
+    assert fuzzy_search_tobaccos("zzzz") == []
+
+
+@pytest.mark.django_db
+def test_fuzzy_keys_follow_manufacturer_rename(create_catalog):
+    """Ключи нечёткого поиска пересобираются при переименовании производителя."""
+    from jobs.models import Job
+    from jobs.worker import claim, run_job
+    from search.fuzzy import fuzzy_search_tobaccos
+
+    manufacturer = create_catalog["manufacturer"]
+    manufacturer.name = "Musthave"
+    manufacturer.save()
+    # Документы табаков производителя пересобирает фоновая задача
+    assert Job.objects.filter(name="search.reindex_manufacturer").count() == 1
+    for job_id in claim("test", 10):
+        assert run_job(job_id, "test")
+    assert create_catalog["mint"].pk in fuzzy_search_tobaccos("мастхэв суперново")
+
+
+@pytest.mark.django_db
+def test_tobacco_list_fuzzy_fallback(api_client, create_catalog):
+    """Список табаков переходит на нечёткий поиск, когда полнотекстовый ничего не нашёл."""
+    response = api_client.post(reverse("tobaccos-list"), data={"search": "ласи"}, format="json")
+    assert response.status_code == 200
+    assert response.json()["data"]["results"][0]["taste"] == "Mango Lassi"
+
+
+@pytest.mark.django_db
+def test_autocomplete_prefix_any_word(autocomplete):
+    """Подсказки находятся по началу любого слова; совпадения с начала названия идут первыми."""
+    names = [item["name"] for item in autocomplete.search("mango")]
+    assert names == ["Mango Bomb", "Mango Lassi"]
+    assert [item["name"] for item in autocomplete.search("las")] == ["Mango Lassi"]
+    assert [item["name"] for item in autocomplete.search("тро")] == ["Тропики"]
+    assert [item["type"] for item in autocomplete.search("dark")] == ["manufacturer"]
+
+
+@pytest.mark.django_db
+def test_autocomplete_without_sql(autocomplete, django_assert_num_queries):
+    """Построенный индекс отвечает без запросов к БД."""
+    with django_assert_num_queries(0):
+        assert autocomplete.search("super", kinds=("tobacco",))[0]["name"] == "Supernova"
+
+
+@pytest.mark.django_db
+def test_autocomplete_follows_signals(autocomplete, create_catalog):
+    """Индекс обновляется сигналами сохранения и удаления."""
+    mint = create_catalog["mint"]
+    mint.taste = "Cold Mint"
+    mint.save()
+    assert [item["name"] for item in autocomplete.search("mint")] == ["Cold Mint"]
+    assert autocomplete.search("supernova") == []
+
+    create_catalog["mango_mix"].delete()
+    assert [item["name"] for item in autocomplete.search("mango")] == ["Mango Lassi"]
+
+
+@pytest.mark.django_db
+def test_autocomplete_endpoint(api_client, autocomplete):
+    """Эндпоинт автодополнения фильтрует по типам и ограничивает количество."""
+    url = reverse("search-autocomplete")
+    response = api_client.post(url, data={"query": "man", "limit": 1}, format="json")
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["data"]["results"]] == ["Mango Bomb"]
+
+    response = api_client.post(url, data={"query": "man", "types": ["tobacco"]}, format="json")
+    assert [item["type"] for item in response.json()["data"]["results"]] == ["tobacco"]
+
+    response = api_client.post(url, data={"query": "man", "types": ["bowl"]}, format="json")
+    assert response.status_code == 400
+    response = api_client.post(url, data={"query": "man", "types": 5}, format="json")
+    assert response.status_code == 400
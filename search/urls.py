@@ -0,0 +1,6 @@
+from django.urls import path
+from search.views import AutocompleteAPIView
+
+urlpatterns = [
+    path('api/v1/search/autocomplete/', AutocompleteAPIView.as_view(), name='search-autocomplete'),
+]
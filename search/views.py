@@ -0,0 +1,80 @@
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from search.autocomplete import KINDS, autocomplete_index
+
+
+class AutocompleteAPIView(APIView):
+    """
+    Автодополнение по вкусам табаков, производителям и миксам.
+
+    ---
+    **POST** `/api/v1/search/autocomplete/`
+
+    Принимает:
+    - `query` — начало любого слова названия (латиница или кириллица)
+    - `limit` — количество подсказок (по умолчанию 10, не больше 50)
+    - `types` — список типов: `tobacco`, `manufacturer`, `mix` (по умолчанию все)
+
+    Отвечает из индекса в памяти воркера, без запросов к БД.
+
+    - Не требует аутентификации.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    default_limit = 10
+    max_limit = 50
+
+    @swagger_auto_schema(
+        tags=["Поиск"],
+        operation_summary="Автодополнение",
+        operation_description="Подсказки по префиксу среди вкусов табаков, производителей и миксов. "
+                              "Аутентификация не требуется.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["query"],
+            properties={
+                "query": openapi.Schema(type=openapi.TYPE_STRING, description="Введённый текст"),
+                "limit": openapi.Schema(type=openapi.TYPE_INTEGER, default=10,
+                                        description="Количество подсказок"),
+                "types": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING),
+                                        description="Типы подсказок: tobacco, manufacturer, mix"),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Успешный ответ",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {"type": "manufacturer", "id": "uuid", "name": "MustHave"},
+                            {"type": "tobacco", "id": "uuid", "name": "Mango Ice"},
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(description="Некорректные параметры запроса"),
+        }
+    )
+    def post(self, request):
+        query = request.data.get("query")
+        if not isinstance(query, str):
+            return Response({"error": "Поле 'query' обязательно."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.data.get("limit", self.default_limit)), self.max_limit)
+        except (ValueError, TypeError):
+            limit = self.default_limit
+
+        kinds = request.data.get("types") or KINDS
+        if not isinstance(kinds, (list, tuple)) or any(kind not in KINDS for kind in kinds):
+            return Response({"error": f"Допустимые типы: {', '.join(KINDS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": autocomplete_index.search(query, max(limit, 0), tuple(kinds))
+        }, status=status.HTTP_200_OK)
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from selection.models import ShelfTobacco
+
+
+@admin.register(ShelfTobacco)
+class ShelfTobaccoAdmin(admin.ModelAdmin):
+    list_display = ('user', 'tobacco', 'created')
+    raw_id_fields = ('user', 'tobacco')
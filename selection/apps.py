@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SelectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'selection'
+
+    def ready(self):
+        # Подключаем обработчики, которые отмечают правки справочников новым поколением каталога
+        from selection import signals  # noqa: F401
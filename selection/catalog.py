@@ -0,0 +1,89 @@
+"""Снимок справочников каталога в памяти воркера.
+
+Производители, чаши, категории вкусов и табаки по производителям меняются
+несколько раз в день, а запрашиваются на каждом шаге конструктора миксов.
+Снимок собирается один раз, хранит готовые байты ответов (вместе с общей
+обёрткой ответа API) и заменяется целиком, когда меняется
+`CatalogGeneration`."""
+import uuid
+
+from django.http import HttpResponse
+from rest_framework.settings import api_settings
+
+from bowls.models import Bowls
+from main.middleware import build_envelope
+from manufacturers.models import Manufacturers
+from selection.models import CatalogGeneration
+from tastecategories.models import TasteCategories
+from tobaccos.models import Tobaccos
+from utils.worker_index import WorkerIndex
+
+
+def encode_envelope(data, status_code=200):
+    """Байты ответа в общем формате API, закодированные рендерером из настроек DRF."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return renderer.render(build_envelope(status_code, data))
+
+
+def enveloped_response(body, status_code=200):
+    """Готовый ответ, который `ResponseMiddleware` пропускает без повторной обёртки."""
+    response = HttpResponse(body, content_type='application/json', status=status_code)
+    response.enveloped = True
+    return response
+
+
+class CatalogSnapshot:
+    """Снимок каталога: данные секций и их закодированные ответы.
+
+    После создания не изменяется; обновление — это сборка нового снимка."""
+
+    __slots__ = ('manufacturers', 'bowls', 'categories', 'tobaccos_by_manufacturer',
+                 'options_body', 'empty_tobaccos_body', 'tobaccos_bodies')
+
+    def __init__(self, manufacturers, bowls, categories, tobaccos_by_manufacturer):
+        self.manufacturers = manufacturers
+        self.bowls = bowls
+        self.categories = categories
+        self.tobaccos_by_manufacturer = tobaccos_by_manufacturer
+        self.options_body = encode_envelope({
+            "manufacturers": list(manufacturers),
+            "bowls": list(bowls),
+            "categories": list(categories),
+        })
+        self.empty_tobaccos_body = encode_envelope({"tobaccos": []})
+        self.tobaccos_bodies = {
+            manufacturer_id: encode_envelope({"tobaccos": list(tobaccos)})
+            for manufacturer_id, tobaccos in tobaccos_by_manufacturer.items()
+        }
+
+    def tobaccos_body(self, manufacturer_id):
+        return self.tobaccos_bodies.get(manufacturer_id, self.empty_tobaccos_body)
+
+
+def _rows(queryset, *fields):
+    return tuple(
+        {field: str(value) if isinstance(value, uuid.UUID) else value for field, value in zip(fields, row)}
+        for row in queryset.values_list(*fields)
+    )
+
+
+class CatalogIndex(WorkerIndex):
+    version_check_interval_setting = 'CATALOG_SNAPSHOT_CHECK_INTERVAL'
+
+    def current_version(self):
+        return CatalogGeneration.current()
+
+    def build(self):
+        tobaccos_by_manufacturer = {}
+        for row in _rows(Tobaccos.objects.order_by('taste', 'id'), 'id', 'taste', 'manufacturer_id'):
+            tobaccos_by_manufacturer.setdefault(row['manufacturer_id'], []).append(
+                {"id": row['id'], "taste": row['taste']})
+        return CatalogSnapshot(
+            manufacturers=_rows(Manufacturers.objects.order_by('name', 'id'), 'id', 'name'),
+            bowls=_rows(Bowls.objects.order_by('type', 'id'), 'id', 'type'),
+            categories=_rows(TasteCategories.objects.order_by('name', 'id'), 'id', 'name'),
+            tobaccos_by_manufacturer={key: tuple(value) for key, value in tobaccos_by_manufacturer.items()},
+        )
+
+
+catalog = CatalogIndex()
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-18 00:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('selection', '0001_catalog_generation'),
+        ('tobaccos', '0002_image_placeholder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShelfTobacco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('tobacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelves', to='tobaccos.tobaccos', verbose_name='Табак')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelf', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Табак на полке',
+                'verbose_name_plural': 'Табаки на полках',
+                'db_table': 'app_shelftobacco',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shelftobacco',
+            constraint=models.UniqueConstraint(fields=('user', 'tobacco'), name='unique_shelf_tobacco'),
+        ),
+    ]
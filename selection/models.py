@@ -1,3 +1,58 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
-# Create your models here.
+
+class CatalogGeneration(models.Model):
+    """Поколение справочников (производители, чаши, категории вкусов, табаки).
+
+    Единственная строка; номер увеличивается после каждой правки справочников,
+    по нему воркеры понимают, что снимок каталога в памяти устарел."""
+    SINGLETON_ID = 1
+
+    generation = models.PositiveBigIntegerField("Поколение", default=0)
+    updated = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Поколение каталога"
+        verbose_name_plural = "Поколения каталога"
+        db_table = "app_cataloggeneration"
+
+    def __str__(self):
+        return str(self.generation)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=cls.SINGLETON_ID).values_list('generation', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        """Увеличивает поколение атомарным UPDATE, создавая строку при первой правке."""
+        with transaction.atomic():
+            if not cls.objects.filter(pk=cls.SINGLETON_ID).update(generation=F('generation') + 1):
+                cls.objects.get_or_create(pk=cls.SINGLETON_ID, defaults={'generation': 1})
+
+
+class ShelfTobacco(models.Model):
+    """Табак на полке пользователя: по полке подбираются миксы, которые можно приготовить."""
+    user = models.ForeignKey(
+        'users.CustomUser',
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="shelf")
+    tobacco = models.ForeignKey(
+        'tobaccos.Tobaccos',
+        on_delete=models.CASCADE,
+        verbose_name="Табак",
+        related_name="shelves")
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Табак на полке"
+        verbose_name_plural = "Табаки на полках"
+        db_table = "app_shelftobacco"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tobacco'], name='unique_shelf_tobacco'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.tobacco_id}"
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from bowls.models import Bowls
+from manufacturers.models import Manufacturers
+from selection.catalog import catalog
+from selection.models import CatalogGeneration
+from tastecategories.models import TasteCategories
+from tobaccos.models import Tobaccos
+
+CATALOG_MODELS = (Manufacturers, Bowls, TasteCategories, Tobaccos)
+
+
+def bump_generation():
+    CatalogGeneration.bump()
+    # Текущий воркер сверит поколение сразу, остальные — через CATALOG_SNAPSHOT_CHECK_INTERVAL
+    catalog.expire()
+
+
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(bump_generation)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model.__name__}')
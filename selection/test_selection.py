@@ -0,0 +1,244 @@
+import uuid
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from bowls.models import Bowls
+from manufacturers.models import Manufacturers
+from selection.catalog import catalog
+from selection.models import CatalogGeneration
+from tastecategories.models import TasteCategories
+from tobaccos.models import Tobaccos
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_catalog(db):
+    """Фикстура со справочниками и пустым снимком каталога."""
+    catalog.reset()
+    darkside = Manufacturers.objects.create(name="Darkside", description="")
+    musthave = Manufacturers.objects.create(name="MustHave", description="")
+    Bowls.objects.create(type="Phunnel", description="", howTo="")
+    TasteCategories.objects.create(name="Фруктовые")
+    Tobaccos.objects.create(taste="Supernova", manufacturer=darkside, description="")
+    Tobaccos.objects.create(taste="Mango Lassi", manufacturer=darkside, description="")
+    yield {"darkside": darkside, "musthave": musthave}
+    catalog.reset()
+
+
+@pytest.mark.django_db
+def test_selection_options(api_client, create_catalog):
+    """Справочники отдаются в общем формате ответа."""
+    response = api_client.post(reverse("selection-options"), format="json")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "good" and body["errors"] is None
+    assert [item["name"] for item in body["data"]["manufacturers"]] == ["Darkside", "MustHave"]
+    assert body["data"]["bowls"][0]["type"] == "Phunnel"
+    assert body["data"]["categories"][0]["name"] == "Фруктовые"
+
+
+@pytest.mark.django_db
+def test_tobaccos_by_manufacturer(api_client, create_catalog):
+    """Табаки производителя берутся из снимка; неизвестный производитель — пустой список."""
+    url = reverse("tobaccos-by-manufacturer")
+    response = api_client.post(url, data={"manufacturer_id": str(create_catalog["darkside"].id)}, format="json")
+    assert response.status_code == 200
+    assert [item["taste"] for item in response.json()["data"]["tobaccos"]] == ["Mango Lassi", "Supernova"]
+
+    response = api_client.post(url, data={"manufacturer_id": str(create_catalog["musthave"].id)}, format="json")
+    assert response.json()["data"]["tobaccos"] == []
+
+    response = api_client.post(url, data={"manufacturer_id": "not-a-uuid"}, format="json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_snapshot_served_from_memory(api_client, create_catalog, django_assert_num_queries):
+    """Построенный снимок отдаётся без запросов к БД до проверки поколения."""
+    api_client.post(reverse("selection-options"), format="json")
+    with django_assert_num_queries(0):
+        api_client.post(reverse("selection-options"), format="json")
+
+
+@pytest.mark.django_db
+def test_snapshot_swapped_after_edit(api_client, create_catalog, django_capture_on_commit_callbacks):
+    """Правка справочника увеличивает поколение и подменяет снимок."""
+    url = reverse("tobaccos-by-manufacturer")
+    payload = {"manufacturer_id": str(create_catalog["musthave"].id)}
+    assert api_client.post(url, data=payload, format="json").json()["data"]["tobaccos"] == []
+
+    generation = CatalogGeneration.current()
+    with django_capture_on_commit_callbacks(execute=True):
+        Tobaccos.objects.create(taste="Pinkman", manufacturer=create_catalog["musthave"], description="")
+    assert CatalogGeneration.current() == generation + 1
+
+    tobaccos = api_client.post(url, data=payload, format="json").json()["data"]["tobaccos"]
+    assert [item["taste"] for item in tobaccos] == ["Pinkman"]
+
+
+@pytest.mark.django_db
+def test_snapshot_follows_other_workers(api_client, create_catalog, settings):
+    """Поколение, увеличенное другим воркером, подхватывается после интервала проверки."""
+    settings.CATALOG_SNAPSHOT_CHECK_INTERVAL = 0
+    api_client.post(reverse("selection-options"), format="json")
+
+    Bowls.objects.create(type="Killer", description="", howTo="")
+    CatalogGeneration.bump()
+
+    bowls = api_client.post(reverse("selection-options"), format="json").json()["data"]["bowls"]
+    assert [item["type"] for item in bowls] == ["Killer", "Phunnel"]
+
+
+@pytest.fixture
+def shelf_client(api_client, create_catalog):
+    """Авторизованный клиент, индекс составов миксов и миксы из табаков каталога."""
+    from mixes.containment import tobacco_mixes
+    from mixes.models import Mixes, MixTobacco
+    from users.models import CustomUser
+
+    user = CustomUser.objects.create_user(email="shelf@example.com", username="shelf", password="password123")
+    api_client.force_authenticate(user)
+    darkside = create_catalog["darkside"]
+    tobaccos = {
+        "supernova": Tobaccos.objects.get(taste="Supernova"),
+        "lassi": Tobaccos.objects.get(taste="Mango Lassi"),
+        "pinkman": Tobaccos.objects.create(taste="Pinkman", manufacturer=darkside, description=""),
+    }
+
+    def mix(name, *names, likes=0):
+        created = Mixes.objects.create(name=name, description="", author=user)
+        for tobacco_name in names:
+            MixTobacco.objects.create(mix=created, tobacco=tobaccos[tobacco_name], weight=50)
+        Mixes.objects.filter(pk=created.pk).update(likes_count=likes)
+        return created
+
+    tobacco_mixes.reset()
+    mixes = {
+        "solo": mix("Solo", "supernova"),
+        "pair": mix("Pair", "supernova", "lassi", likes=3),
+        "triple": mix("Triple", "supernova", "lassi", "pinkman", likes=5),
+        "other": mix("Other", "pinkman", likes=9),
+    }
+    yield api_client, tobaccos, mixes
+    tobacco_mixes.reset()
+
+
+@pytest.mark.django_db
+def test_shelf_update(shelf_client):
+    """Полка пополняется и разбирается; неизвестные табаки не принимаются."""
+    api_client, tobaccos, _ = shelf_client
+    url = reverse("shelf-update")
+    ids = [str(tobaccos["supernova"].id), str(tobaccos["lassi"].id)]
+    response = api_client.post(url, {"add": ids}, format="json")
+    assert [item["taste"] for item in response.json()["data"]["tobaccos"]] == ["Mango Lassi", "Supernova"]
+
+    response = api_client.post(url, {"add": ids[:1], "remove": ids[1:]}, format="json")
+    assert [item["taste"] for item in response.json()["data"]["tobaccos"]] == ["Supernova"]
+    assert api_client.post(url, {"add": [str(uuid.uuid4())]}, format="json").status_code == 400
+    assert api_client.post(url, {"add": "not-a-list"}, format="json").status_code == 400
+
+    response = api_client.post(reverse("shelf"), format="json")
+    assert [item["taste"] for item in response.json()["data"]["tobaccos"]] == ["Supernova"]
+
+
+@pytest.mark.django_db
+def test_shelf_mixes(shelf_client):
+    """Сначала миксы, которые можно приготовить целиком, затем с недостающими табаками; внутри — по лайкам."""
+    api_client, tobaccos, mixes = shelf_client
+    api_client.post(reverse("shelf-update"), {"add": [str(tobaccos["supernova"].id), str(tobaccos["lassi"].id)]},
+                    format="json")
+
+    url = reverse("shelf-mixes")
+    data = api_client.post(url, {}, format="json").json()["data"]
+    assert [item["name"] for item in data["results"]] == ["Pair", "Solo"]
+    assert data["count"] == 2 and data["results"][0]["missing"] == 0
+
+    # «Other» из одного pinkman не пересекается с полкой и не предлагается, хотя в нём не хватает одного табака
+    data = api_client.post(url, {"missing": 1}, format="json").json()["data"]
+    assert [item["name"] for item in data["results"]] == ["Pair", "Solo", "Triple"]
+    assert data["results"][2]["missingTobaccos"] == [str(tobaccos["pinkman"].id)]
+
+    # Индекс следует за изменением состава
+    from mixes.models import MixTobacco
+    MixTobacco.objects.filter(mix=mixes["triple"], tobacco=tobaccos["pinkman"]).delete()
+    data = api_client.post(url, {"cursor": "", "limit": 1}, format="json").json()["data"]
+    assert [item["name"] for item in data["results"]] == ["Triple"]
+    data = api_client.post(url, {"cursor": data["next"], "limit": 5}, format="json").json()["data"]
+    assert [item["name"] for item in data["results"]] == ["Pair", "Solo"]
+
+    # Пустая полка ни с чем не пересекается
+    api_client.post(reverse("shelf-update"), {"remove": [str(tobaccos["supernova"].id), str(tobaccos["lassi"].id)]},
+                    format="json")
+    data = api_client.post(url, {"missing": 1}, format="json").json()["data"]
+    assert data["results"] == [] and data["count"] == 0
+
+    assert api_client.post(url, {"missing": 99}, format="json").status_code == 400
+
+
+@pytest.fixture
+def pairing_index(settings, tmp_path):
+    from mixes.pairing import tobacco_pairs
+
+    settings.PAIRING_SNAPSHOT_PATH = str(tmp_path / "tobacco_pairs.npz")
+    settings.PAIRING_MIN_SUPPORT = 1
+    tobacco_pairs.reset()
+    yield tobacco_pairs
+    tobacco_pairs.reset()
+
+
+@pytest.mark.django_db
+def test_tobacco_pairings(shelf_client, pairing_index):
+    """Подсказки по PMI: случайные и редкие сочетания не попадают, подбор к нескольким табакам суммирует строки."""
+    from mixes.models import Mixes, MixTobacco
+
+    api_client, tobaccos, mixes = shelf_client
+    duo = Mixes.objects.create(name="Duo", description="")
+    for name in ("lassi", "pinkman"):
+        MixTobacco.objects.create(mix=duo, tobacco=tobaccos[name], weight=50)
+    url = reverse("tobacco-pairings")
+
+    data = api_client.post(url, {"ids": [str(tobaccos["supernova"].pk)]}, format="json").json()["data"]
+    assert [item["taste"] for item in data["tobaccos"]] == ["Mango Lassi"]
+    assert data["tobaccos"][0]["score"] == pytest.approx(0.1054, abs=1e-4)
+    assert data["tobaccos"][0]["mixesTogether"] == 2
+
+    ids = [str(tobaccos["supernova"].pk), str(tobaccos["pinkman"].pk)]
+    data = api_client.post(url, {"ids": ids}, format="json").json()["data"]
+    assert [(item["taste"], item["mixesTogether"]) for item in data["tobaccos"]] == [("Mango Lassi", 4)]
+
+    assert api_client.post(url, {"ids": "supernova"}, format="json").status_code == 400
+    assert api_client.post(url, {"ids": []}, format="json").status_code == 400
+
+
+@pytest.mark.django_db
+def test_tobacco_pairings_incremental_and_snapshot(shelf_client, pairing_index, settings):
+    """Правки составов доходят до матрицы так же, как полная сборка; новый воркер стартует со снимка на диске."""
+    from mixes.models import MixTobacco
+    from mixes.pairing import TobaccoPairs, TobaccoPairsIndex
+
+    _, tobaccos, mixes = shelf_client
+    ids = [tobacco.pk for tobacco in tobaccos.values()]
+    assert pairing_index.pairs(ids[:1])
+
+    mixes["triple"].delete()
+    MixTobacco.objects.create(mix=mixes["solo"], tobacco=tobaccos["pinkman"], weight=50)
+    MixTobacco.objects.filter(mix=mixes["pair"], tobacco=tobaccos["lassi"]).delete()
+
+    fresh = TobaccoPairsIndex().save_snapshot()
+    for tobacco_id in ids:
+        assert pairing_index.pairs([tobacco_id]) == fresh.pairs([tobacco_id], 10)
+
+    # Снимок свежий: новый воркер берёт матрицу с диска, а не из базы
+    MixTobacco.objects.all().delete()
+    loaded = TobaccoPairsIndex().get()
+    assert (loaded.total, loaded.mixes, loaded.rows) == (fresh.total, fresh.mixes, fresh.rows)
+    assert list(loaded.freq[:len(loaded.ids)]) == list(fresh.freq[:len(fresh.ids)])
+
+    settings.PAIRING_SNAPSHOT_PATH = settings.PAIRING_SNAPSHOT_PATH + ".missing"
+    assert TobaccoPairs.load(settings.PAIRING_SNAPSHOT_PATH) is None
@@ -1,7 +1,12 @@
 from django.urls import path
-from selection.views import SelectionOptionsAPIView, TobaccosByManufacturerAPIView
+from selection.views import (SelectionOptionsAPIView, ShelfAPIView, ShelfMixesAPIView, ShelfUpdateAPIView,
+                             TobaccoPairingAPIView, TobaccosByManufacturerAPIView)
 
 urlpatterns = [
     path('api/v1/selection/options/', SelectionOptionsAPIView.as_view(), name='selection-options'),
     path('api/v1/selection/tobaccos-by-manufacturer/', TobaccosByManufacturerAPIView.as_view(), name='tobaccos-by-manufacturer'),
+    path('api/v1/selection/shelf/', ShelfAPIView.as_view(), name='shelf'),
+    path('api/v1/selection/shelf/update/', ShelfUpdateAPIView.as_view(), name='shelf-update'),
+    path('api/v1/selection/shelf/mixes/', ShelfMixesAPIView.as_view(), name='shelf-mixes'),
+    path('api/v1/selection/tobacco-pairings/', TobaccoPairingAPIView.as_view(), name='tobacco-pairings'),
 ]
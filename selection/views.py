@@ -1,25 +1,38 @@
+import uuid
+
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
-from manufacturers.models import Manufacturers
-from bowls.models import Bowls
-from tobaccos.models import Tobaccos
-from .serializers import MiniManufacturerSerializer, MiniBowlSerializer, MiniTobaccoSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from selection.catalog import catalog, enveloped_response
+from selection.models import ShelfTobacco
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from mixes.containment import SHELF_ORDERING, tobacco_mixes
+from mixes.models import Mixes
+from mixes.pairing import tobacco_pairs
+from mixes.projections import mix_list_values, project_mixes
+from tobaccos.models import Tobaccos
+from tobaccos.projections import project_tobaccos, tobacco_list_values
+from utils.KeysetPagination import get_pagination
+
 
 class SelectionOptionsAPIView(APIView):
     """
-    Получение списка производителей и чаш.
+    Получение списка производителей, чаш и категорий вкусов.
 
     ---
     **POST** `/api/v1/selection/options/`
 
-    Возвращает два массива:
+    Возвращает три массива:
     - `manufacturers` — список производителей (id и name)
     - `bowls` — список чаш (id и type)
+    - `categories` — список категорий вкусов (id и name)
+
+    Ответ берётся из снимка каталога в памяти воркера.
 
     - Не требует аутентификации.
     """
@@ -28,8 +41,9 @@ class SelectionOptionsAPIView(APIView):
 
     @swagger_auto_schema(
         tags=["Вспомогательные выборки"],
-        operation_summary="Получение списка производителей и чаш",
-        operation_description="Возвращает два массива: список производителей и список чаш. Аутентификация не требуется.",
+        operation_summary="Получение списка производителей, чаш и категорий вкусов",
+        operation_description="Возвращает три массива: список производителей, список чаш и список категорий вкусов. "
+                              "Аутентификация не требуется.",
         responses={
             200: openapi.Response(
                 description="Успешный ответ",
@@ -42,6 +56,9 @@ class SelectionOptionsAPIView(APIView):
                         "bowls": [
                             {"id": "uuid", "type": "Phunnel"},
                             {"id": "uuid", "type": "Killer"},
+                        ],
+                        "categories": [
+                            {"id": "uuid", "name": "Фруктовые"},
                         ]
                     }
                 }
@@ -49,12 +66,7 @@ class SelectionOptionsAPIView(APIView):
         }
     )
     def post(self, request):
-        manufacturers = Manufacturers.objects.all()
-        bowls = Bowls.objects.all()
-        return Response({
-            "manufacturers": MiniManufacturerSerializer(manufacturers, many=True).data,
-            "bowls": MiniBowlSerializer(bowls, many=True).data,
-        }, status=status.HTTP_200_OK)
+        return enveloped_response(catalog.get().options_body)
 
 
 class TobaccosByManufacturerAPIView(APIView):
@@ -70,6 +82,8 @@ class TobaccosByManufacturerAPIView(APIView):
     Возвращает:
     - массив табаков (`id`, `taste`)
 
+    Ответ берётся из снимка каталога в памяти воркера.
+
     - Не требует аутентификации.
     """
 
@@ -106,7 +120,285 @@ class TobaccosByManufacturerAPIView(APIView):
         if not manufacturer_id:
             return Response({"error": "Поле 'manufacturer_id' обязательно."}, status=status.HTTP_400_BAD_REQUEST)
 
-        tobaccos = Tobaccos.objects.filter(manufacturer_id=manufacturer_id)
-        return Response({
-            "tobaccos": MiniTobaccoSerializer(tobaccos, many=True).data
-        }, status=status.HTTP_200_OK)
+        try:
+            manufacturer_id = str(uuid.UUID(str(manufacturer_id)))
+        except ValueError:
+            return Response({"error": "Некорректный 'manufacturer_id'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return enveloped_response(catalog.get().tobaccos_body(manufacturer_id))
+
+
+def _tobacco_ids(value):
+    """Список UUID табаков из тела запроса или None, если формат неверный."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return None
+    try:
+        return [uuid.UUID(str(item)) for item in value]
+    except ValueError:
+        return None
+
+
+def _shelf_response(request):
+    tobaccos = Tobaccos.objects.filter(shelves__user=request.user).select_related('manufacturer')
+    rows = tobacco_list_values(tobaccos.order_by('taste', 'id'))
+    return Response({"tobaccos": project_tobaccos(rows, request)}, status=status.HTTP_200_OK)
+
+
+SHELF_RESPONSE = openapi.Response(
+    description="Успешный ответ",
+    examples={
+        "application/json": {
+            "tobaccos": [
+                {"id": "uuid", "taste": "Grape Mint", "manufacturer": "Darkside"},
+            ]
+        }
+    }
+)
+
+
+class ShelfAPIView(APIView):
+    """
+    Табаки на полке текущего пользователя.
+
+    ---
+    **POST** `/api/v1/selection/shelf/`
+
+    Возвращает:
+    - массив табаков полки в формате списка табаков
+
+    - Требуется аутентификация через JWT.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=["Вспомогательные выборки"],
+        operation_summary="Табаки на полке пользователя",
+        operation_description="Возвращает табаки, которые пользователь отметил как имеющиеся у него.",
+        responses={200: SHELF_RESPONSE, 401: openapi.Response(description="Ошибка: не авторизован")}
+    )
+    def post(self, request):
+        return _shelf_response(request)
+
+
+class ShelfUpdateAPIView(APIView):
+    """
+    Изменение полки текущего пользователя.
+
+    ---
+    **POST** `/api/v1/selection/shelf/update/`
+
+    Принимает:
+    - `add` — ID табаков, которые нужно поставить на полку
+    - `remove` — ID табаков, которые нужно убрать с полки
+
+    Возвращает:
+    - полку после изменения
+
+    - Требуется аутентификация через JWT.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=["Вспомогательные выборки"],
+        operation_summary="Изменение полки пользователя",
+        operation_description="Добавляет табаки из `add` и убирает табаки из `remove`, возвращает полку целиком.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "add": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                      items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                                      description="ID табаков для добавления"),
+                "remove": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                         items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                                         description="ID табаков для удаления"),
+            }
+        ),
+        responses={
+            200: SHELF_RESPONSE,
+            400: openapi.Response(description="Некорректные или несуществующие ID табаков"),
+            401: openapi.Response(description="Ошибка: не авторизован"),
+        }
+    )
+    def post(self, request):
+        add = _tobacco_ids(request.data.get("add"))
+        remove = _tobacco_ids(request.data.get("remove"))
+        if add is None or remove is None:
+            return Response({"error": "Поля 'add' и 'remove' — списки ID табаков."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        add = set(add)
+        if add and Tobaccos.objects.filter(id__in=add).count() != len(add):
+            return Response({"error": "Табак не найден."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ShelfTobacco.objects.bulk_create([ShelfTobacco(user=request.user, tobacco_id=tobacco_id) for tobacco_id in add],
+                                         ignore_conflicts=True)
+        if remove:
+            ShelfTobacco.objects.filter(user=request.user, tobacco_id__in=remove).delete()
+        return _shelf_response(request)
+
+
+class ShelfMixesAPIView(APIView):
+    """
+    Миксы, которые можно приготовить из табаков на полке.
+
+    ---
+    **POST** `/api/v1/selection/shelf/mixes/`
+
+    Принимает:
+    - `missing` — сколько табаков микса может не хватать (по умолчанию 0)
+    - `limit`/`offset` или `cursor` — пагинация
+
+    Возвращает:
+    - миксы, упорядоченные по числу недостающих табаков, затем по лайкам;
+      у каждого — `missing` и `missingTobaccos`
+
+    Подбор идёт по индексу составов миксов в памяти воркера.
+
+    - Требуется аутентификация через JWT.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=["Вспомогательные выборки"],
+        operation_summary="Миксы из табаков на полке",
+        operation_description="Возвращает миксы, весь состав которых есть на полке пользователя или которым "
+                              "не хватает не больше `missing` табаков. Сначала миксы, где не хватает меньше, "
+                              "затем более популярные.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "missing": openapi.Schema(type=openapi.TYPE_INTEGER,
+                                          description="Допустимое число недостающих табаков", example=0),
+                "limit": openapi.Schema(type=openapi.TYPE_INTEGER, description="Максимальное количество записей",
+                                        example=10),
+                "offset": openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                "cursor": openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Успешный ответ",
+                examples={
+                    "application/json": {
+                        "count": 1,
+                        "next": None,
+                        "previous": None,
+                        "results": [
+                            {"id": "uuid", "name": "Fruit Mix", "likesCount": 5, "missing": 1,
+                             "missingTobaccos": ["uuid"]},
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(description="Некорректное значение `missing`"),
+            401: openapi.Response(description="Ошибка: не авторизован"),
+        }
+    )
+    def post(self, request):
+        try:
+            max_missing = int(request.data.get("missing", 0))
+        except (ValueError, TypeError):
+            max_missing = -1
+        if not 0 <= max_missing <= settings.SHELF_MAX_MISSING:
+            return Response({"error": f"Поле 'missing' — целое от 0 до {settings.SHELF_MAX_MISSING}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        shelf = set(ShelfTobacco.objects.filter(user=request.user).values_list('tobacco_id', flat=True))
+        ranking = tobacco_mixes.makeable(shelf, max_missing)
+        paginator = get_pagination(request, ordering=SHELF_ORDERING)
+        page = paginator.paginate_queryset(ranking, request)
+        missing = {row['id']: row['missing'] for row in page}
+        rows = list(mix_list_values(Mixes.objects.filter(pk__in=missing).for_list(request.user)))
+        order = {mix_id: position for position, mix_id in enumerate(missing)}
+        rows.sort(key=lambda row: order[row['id']])
+        results = project_mixes(rows, request)
+        shelf = {str(tobacco_id) for tobacco_id in shelf}
+        for item, row in zip(results, rows):
+            item['missing'] = missing[row['id']]
+            item['missingTobaccos'] = [good['tobacco']['id'] for good in item['goods']
+                                       if good['tobacco']['id'] not in shelf]
+        return paginator.get_paginated_response(results)
+
+
+class TobaccoPairingAPIView(APIView):
+    """
+    Табаки, которые часто сочетают с выбранными в конструкторе микса.
+
+    ---
+    **POST** `/api/v1/selection/tobacco-pairings/`
+
+    Принимает:
+    - `ids` — ID уже выбранных табаков
+    - `limit` — количество подсказок (по умолчанию 10, не больше 50)
+
+    Возвращает:
+    - табаки по убыванию силы сочетания с выбранными; у каждого —
+      `score` (сумма PMI с выбранными табаками) и `mixesTogether`
+      (в скольких миксах табак встречается вместе с ними)
+
+    Подсказки считаются по матрице совместной встречаемости табаков в памяти воркера.
+
+    - Не требует аутентификации.
+    """
+
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        tags=["Вспомогательные выборки"],
+        operation_summary="Табаки, которые часто сочетают с выбранными",
+        operation_description="Возвращает табаки, которые в миксах встречаются вместе с выбранными чаще, чем "
+                              "случайно. Сила сочетания — PMI по составам миксов. Аутентификация не требуется.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["ids"],
+            properties={
+                "ids": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                      items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                                      description="ID выбранных табаков"),
+                "limit": openapi.Schema(type=openapi.TYPE_INTEGER, description="Количество подсказок", example=10),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Успешный ответ",
+                examples={
+                    "application/json": {
+                        "tobaccos": [
+                            {"id": "uuid", "taste": "Mango Lassi", "manufacturer": "Darkside", "score": 1.2528,
+                             "mixesTogether": 14},
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(description="Некорректный список ID табаков"),
+        }
+    )
+    def post(self, request):
+        tobacco_ids = _tobacco_ids(request.data.get("ids"))
+        if not tobacco_ids:
+            return Response({"error": "Поле 'ids' — непустой список ID табаков."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.data.get("limit", settings.PAIRING_DEFAULT_LIMIT))
+        except (ValueError, TypeError):
+            limit = settings.PAIRING_DEFAULT_LIMIT
+        limit = max(0, min(limit, settings.PAIRING_MAX_LIMIT))
+
+        pairs = tobacco_pairs.pairs(tobacco_ids, limit)
+        positions = {tobacco_id: position for position, (tobacco_id, _, _) in enumerate(pairs)}
+        rows = sorted(tobacco_list_values(Tobaccos.objects.filter(pk__in=positions)),
+                      key=lambda row: positions[row['id']])
+        tobaccos = project_tobaccos(rows, request)
+        for item, row in zip(tobaccos, rows):
+            _, score, together = pairs[positions[row['id']]]
+            item['score'] = round(score, 4)
+            item['mixesTogether'] = together
+        return Response({"tobaccos": tobaccos}, status=status.HTTP_200_OK)
@@ -83,12 +83,7 @@ class TasteCategoriesListAPIView(APIView):
         page = paginator.paginate_queryset(queryset, request)
         if page is not None:
             serializer = TasteCategoriesSerializer(page, many=True)
-            return paginator.get_paginated_response({
-                "status": "ok",
-                "code": status.HTTP_200_OK,
-                "message": "Список категорий успешно получен",
-                "data": serializer.data
-            })
+            return paginator.get_paginated_response(serializer.data)
         serializer = TasteCategoriesSerializer(queryset, many=True)
         return Response({
             "status": "ok",
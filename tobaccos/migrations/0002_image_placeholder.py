@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tobaccos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tobaccos',
+            name='image_blurhash',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True, verbose_name='BlurHash изображения'),
+        ),
+        migrations.AddField(
+            model_name='tobaccos',
+            name='image_color',
+            field=models.CharField(blank=True, default=None, max_length=7, null=True, verbose_name='Преобладающий цвет изображения'),
+        ),
+    ]
@@ -59,6 +59,9 @@ class Tobaccos(models.Model):
         blank=True)
 
     image = models.ImageField(default=None, blank=True)
+    # Заглушка изображения, пока клиент загружает изображение (заполняется после загрузки)
+    image_blurhash = models.CharField("BlurHash изображения", max_length=64, null=True, blank=True, default=None)
+    image_color = models.CharField("Преобладающий цвет изображения", max_length=7, null=True, blank=True, default=None)
 
     # tobacco_leaf = models.CharField(
     #     verbose_name="Тип листа",
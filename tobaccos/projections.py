@@ -0,0 +1,42 @@
+"""Проекция списка табаков: тот же ответ, что у `TobaccosListSerializer`, из `values()`."""
+from tobaccos.models import Tobaccos
+from utils.projections import absolute_file_url, ordering_fields, storage_of, uuid_repr, variant_url
+
+# Колонки табака для списков; префикс позволяет выбрать их через связь (например, из MixTobacco)
+TOBACCO_LIST_FIELDS = (
+    'id', 'taste', 'image', 'image_blurhash', 'image_color', 'manufacturer__name',
+    'tobacco_strength', 'tobacco_resistance', 'tobacco_smokiness',
+)
+
+
+def tobacco_list_fields(prefix=''):
+    return tuple(prefix + field for field in TOBACCO_LIST_FIELDS)
+
+
+def tobacco_list_values(queryset, ordering=()):
+    """Строки табаков для `project_tobaccos`; поля порядка тоже попадают в строку (для курсора)."""
+    return queryset.values(*TOBACCO_LIST_FIELDS, *ordering_fields(ordering, TOBACCO_LIST_FIELDS))
+
+
+def project_tobacco(row, request=None, prefix=''):
+    """Представление табака как у `TobaccosListSerializer` (без сериализатора)."""
+    storage = storage_of(Tobaccos, 'image')
+    image = row[prefix + 'image']
+    return {
+        'id': uuid_repr(row[prefix + 'id']),
+        'taste': row[prefix + 'taste'],
+        'image': absolute_file_url(storage, image, request),
+        'thumbnail': variant_url(storage, image, 'thumb', request, absolute=True),
+        'image_blurhash': row[prefix + 'image_blurhash'],
+        'image_color': row[prefix + 'image_color'],
+        'manufacturer': row[prefix + 'manufacturer__name'],
+        'params': {
+            'strength': row[prefix + 'tobacco_strength'],
+            'resistance': row[prefix + 'tobacco_resistance'],
+            'smokiness': row[prefix + 'tobacco_smokiness'],
+        },
+    }
+
+
+def project_tobaccos(rows, request=None):
+    return [project_tobacco(row, request) for row in rows]
@@ -2,6 +2,17 @@ from rest_framework import serializers
 
 from manufacturers.models import Manufacturers
 from tobaccos.models import Tobaccos
+from utils.media import ImageVariantField, media_resolver
+from utils.to_camel_case import CamelCaseSerializerMixin
+
+# Параметры табака группируются в поле "params"
+TOBACCO_PARAMS_GROUP = {
+    'params': {
+        'tobacco_strength': 'strength',
+        'tobacco_resistance': 'resistance',
+        'tobacco_smokiness': 'smokiness',
+    }
+}
 
 
 class TobaccosSerializer(serializers.ModelSerializer):
@@ -11,9 +22,12 @@ class TobaccosSerializer(serializers.ModelSerializer):
         fields = ['taste', 'manufacturer', 'description', 'tobacco_strength']
 
 
-class TobaccosListSerializer(serializers.ModelSerializer):
+class TobaccosListSerializer(CamelCaseSerializerMixin, serializers.ModelSerializer):
+    camel_case = False
+    output_groups = TOBACCO_PARAMS_GROUP
     manufacturer = serializers.CharField(source='manufacturer.name', read_only=True)
     image = serializers.SerializerMethodField()  # Используем SerializerMethodField для формирования абсолютного URL
+    thumbnail = ImageVariantField('thumb', source='image', absolute=True)  # Миниатюра WebP для списков
 
     class Meta:
         model = Tobaccos
@@ -21,6 +35,9 @@ class TobaccosListSerializer(serializers.ModelSerializer):
             'id',
             'taste',
             'image',
+            'thumbnail',
+            'image_blurhash',
+            'image_color',
             'manufacturer',
             'tobacco_strength',
             'tobacco_resistance',
@@ -31,26 +48,16 @@ class TobaccosListSerializer(serializers.ModelSerializer):
         """
         Возвращает полный URL изображения.
         """
-        if obj.image:
-            request = self.context.get('request')  # Получаем объект запроса из контекста
-            if request:
-                return request.build_absolute_uri(obj.image.url)  # Формируем полный URL
-        return None  # Если изображение отсутствует, возвращаем None
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Группируем параметры в поле "params"
-        representation['params'] = {
-            'strength': representation.pop('tobacco_strength'),
-            'resistance': representation.pop('tobacco_resistance'),
-            'smokiness': representation.pop('tobacco_smokiness')
-        }
-        return representation
+        # Базу ссылок резолвер вычисляет один раз на запрос; без запроса и CDN ссылки нет
+        return media_resolver(self.context).absolute_url(obj.image.name, obj.image.storage)
 
 
-class TobaccosDetailSerializer(serializers.ModelSerializer):
+class TobaccosDetailSerializer(CamelCaseSerializerMixin, serializers.ModelSerializer):
+    camel_case = False
+    output_groups = TOBACCO_PARAMS_GROUP
     manufacturer = serializers.CharField(source='manufacturer.name', read_only=True)
     image = serializers.SerializerMethodField()  # Используем SerializerMethodField для формирования абсолютного URL
+    preview = ImageVariantField('large', source='image', absolute=True)  # Крупная копия WebP для деталей
 
     class Meta:
         model = Tobaccos
@@ -58,6 +65,7 @@ class TobaccosDetailSerializer(serializers.ModelSerializer):
             'id',
             'taste',
             'image',
+            'preview',
             'manufacturer',
             'description',
             'tobacco_strength',
@@ -69,18 +77,5 @@ class TobaccosDetailSerializer(serializers.ModelSerializer):
         """
         Возвращает полный URL изображения.
         """
-        if obj.image:
-            request = self.context.get('request')  # Получаем объект запроса из контекста
-            if request:
-                return request.build_absolute_uri(obj.image.url)  # Формируем полный URL
-        return None  # Если изображение отсутствует, возвращаем None
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Группируем параметры в поле "params"
-        representation['params'] = {
-            'strength': representation.pop('tobacco_strength'),
-            'resistance': representation.pop('tobacco_resistance'),
-            'smokiness': representation.pop('tobacco_smokiness')
-        }
-        return representation
+        # Базу ссылок резолвер вычисляет один раз на запрос; без запроса и CDN ссылки нет
+        return media_resolver(self.context).absolute_url(obj.image.name, obj.image.storage)
@@ -198,3 +198,19 @@ def test_delete_tobacco_without_token(api_client, create_tobacco):
     url = reverse("tobaccos-delete", kwargs={"pk": create_tobacco.id})
     response = api_client.delete(url)
     assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_tobacco_projection_matches_serializer(create_tobacco):
+    """Проекция списка табаков совпадает с ответом `TobaccosListSerializer` байт в байт."""
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+    from tobaccos.projections import project_tobaccos, tobacco_list_values
+    from tobaccos.serializers import TobaccosListSerializer
+
+    Tobaccos.objects.filter(pk=create_tobacco.pk).update(image="tobacco.jpg")
+    request = APIRequestFactory().post("/api/v1/tobaccos/list/")
+    queryset = Tobaccos.objects.order_by('-created', '-id')
+    expected = TobaccosListSerializer(queryset, many=True, context={"request": request}).data
+    projected = project_tobaccos(tobacco_list_values(queryset), request)
+    assert JSONRenderer().render(projected) == JSONRenderer().render(expected)
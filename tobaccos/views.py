@@ -1,4 +1,3 @@
-from django.db.models import Q
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.pagination import LimitOffsetPagination
@@ -10,9 +9,15 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from search.fuzzy import fuzzy_search_tobaccos
+from search.indexing import SEARCH_ORDERING, rank_queryset, search_tobaccos
 from tobaccos.models import Tobaccos
-from tobaccos.serializers import TobaccosSerializer, TobaccosDetailSerializer, TobaccosListSerializer
-from utils.CustomLimitOffsetPagination import CustomLimitOffsetPagination
+from tobaccos.projections import project_tobaccos, tobacco_list_values
+from tobaccos.serializers import TobaccosSerializer, TobaccosDetailSerializer
+from utils.KeysetPagination import get_pagination
+
+# Стабильный порядок списка табаков для пагинации
+TOBACCO_LIST_ORDERING = ('-created', '-id')
 
 
 class TobaccoListAPIView(APIView):
@@ -27,8 +32,9 @@ class TobaccoListAPIView(APIView):
         operation_summary="Получение списка табаков",  # Краткое описание
         operation_description=(
                 "Возвращает список всех доступных табаков.\n\n"
-                "- Поддерживает поиск по полям `taste` и `description` через параметр `search`.\n\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`."
+                "- Поддерживает полнотекстовый поиск по вкусу, описанию и производителю через параметр `search`;"
+                " при пустом результате — нечёткий поиск с учётом опечаток и кириллицы.\n\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`."
         ),
         manual_parameters=[
             openapi.Parameter(
@@ -54,6 +60,21 @@ class TobaccoListAPIView(APIView):
                 default=0,
                 required=False
             ),
+            openapi.Parameter(
+                name='cursor',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                required=False
+            ),
+            openapi.Parameter(
+                name='with_count',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Возвращать ли общее количество `count`",
+                default=True,
+                required=False
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -115,28 +136,22 @@ class TobaccoListAPIView(APIView):
         # Формируем базовый QuerySet
         queryset = Tobaccos.objects.all()
 
-        # Если передан параметр 'search', фильтруем QuerySet
+        # Если передан параметр 'search', ищем по полнотекстовому индексу и сортируем по релевантности
+        ordering = TOBACCO_LIST_ORDERING
         if search_query:
-            queryset = queryset.filter(
-                Q(taste__icontains=search_query) | Q(description__icontains=search_query)
-            )
+            # Если полнотекстовый поиск ничего не нашёл — нечёткий поиск по триграммам
+            # (опечатки, набор латинских названий кириллицей)
+            found = search_tobaccos(search_query) or fuzzy_search_tobaccos(search_query)
+            queryset = rank_queryset(queryset, found)
+            ordering = SEARCH_ORDERING
 
-        # Пагинация
-        paginator = CustomLimitOffsetPagination()
+        # Пагинация: limit/offset или курсор; из БД берутся только нужные колонки
+        queryset = tobacco_list_values(queryset.order_by(*ordering), ordering)
+        paginator = get_pagination(request, ordering=ordering)
         page = paginator.paginate_queryset(queryset, request)
 
-        # Сериализация данных
-        serializer = TobaccosListSerializer(
-            page if page is not None else queryset,
-            many=True,
-            context={'request': request}  # Передаем request для формирования абсолютных ссылок
-        )
-
-        # Возвращаем пагинированный или полный ответ
-        if page is not None:
-            return paginator.get_paginated_response(serializer.data)
-
-        return Response(serializer.data, status=200)
+        # Сборка ответа без сериализатора; request нужен для абсолютных ссылок
+        return paginator.get_paginated_response(project_tobaccos(page, request))
 
 
 class TobaccoDetailAPIView(APIView):
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils.translation import gettext_lazy as _
 import uuid
 
@@ -32,6 +33,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     is_staff = models.BooleanField(default=False, verbose_name="Персонал")
     date_joined = models.DateTimeField(auto_now_add=True, verbose_name="Дата регистрации")
+    # Денормализованный счётчик: по нему лента выбирает рассылку при записи или слияние при чтении
+    followers_count = models.PositiveIntegerField(default=0, verbose_name="Количество подписчиков")
 
     objects = CustomUserManager()
 
@@ -41,6 +44,23 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def follow(self, author):
+        """Подписывает пользователя на автора. Возвращает True, если подписки ещё не было."""
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(follower=self, author=author)
+            if created:
+                CustomUser.objects.filter(pk=author.pk).update(followers_count=F('followers_count') + 1)
+        return created
+
+    def unfollow(self, author):
+        """Отписывает пользователя от автора. Возвращает True, если подписка была удалена."""
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=self, author=author).delete()
+            if deleted:
+                CustomUser.objects.filter(pk=author.pk, followers_count__gte=deleted).update(
+                    followers_count=F('followers_count') - deleted)
+        return bool(deleted)
+
     def save(self, *args, **kwargs):
         if not self.nickname:
             self.nickname = f'User-{str(self.id)[-6:]}'
@@ -50,3 +70,22 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
         db_table = "app_customuser"
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='following',
+                                 verbose_name="Подписчик")
+    author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='followers',
+                               verbose_name="Автор")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Дата подписки")
+
+    class Meta:
+        verbose_name = "Подписка"
+        verbose_name_plural = "Подписки"
+        db_table = "app_follow"
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='unique_follow'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower_id} -> {self.author_id}'
@@ -0,0 +1,33 @@
+"""Проекция пользователей: тот же ответ, что у `CustomUserSerializer`, из `values()`."""
+from users.models import CustomUser
+from utils.projections import absolute_file_url, datetime_repr, ordering_fields, storage_of, uuid_repr, variant_url
+
+USER_FIELDS = ('id', 'email', 'username', 'nickname', 'avatar', 'date_joined')
+
+
+def user_fields(prefix=''):
+    return tuple(prefix + field for field in USER_FIELDS)
+
+
+def user_values(queryset, ordering=()):
+    """Строки пользователей для `project_users`; поля порядка тоже попадают в строку (для курсора)."""
+    return queryset.values(*USER_FIELDS, *ordering_fields(ordering, USER_FIELDS))
+
+
+def project_user(row, request=None, prefix=''):
+    """Представление пользователя как у `CustomUserSerializer` (без сериализатора)."""
+    storage = storage_of(CustomUser, 'avatar')
+    avatar = row[prefix + 'avatar']
+    return {
+        'id': uuid_repr(row[prefix + 'id']),
+        'email': row[prefix + 'email'],
+        'username': row[prefix + 'username'],
+        'nickname': row[prefix + 'nickname'],
+        'avatar': absolute_file_url(storage, avatar, request),
+        'avatar_thumbnail': variant_url(storage, avatar, 'thumb', request, absolute=True),
+        'date_joined': datetime_repr(row[prefix + 'date_joined']),
+    }
+
+
+def project_users(rows, request=None):
+    return [project_user(row, request) for row in rows]
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from djoser.serializers import SetPasswordSerializer
 
 from users.models import CustomUser
+from utils.media import ImageVariantField, media_resolver
 
 
 class CustomUserCreateSerializer(serializers.ModelSerializer):
@@ -23,17 +24,15 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
 
 class CustomUserSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()  # Используем SerializerMethodField для формирования абсолютного URL
+    avatar_thumbnail = ImageVariantField('thumb', source='avatar', absolute=True)  # Миниатюра WebP
 
     class Meta:
         model = CustomUser
-        fields = ('id', 'email', 'username', 'nickname', 'avatar', 'date_joined')
+        fields = ('id', 'email', 'username', 'nickname', 'avatar', 'avatar_thumbnail', 'date_joined')
 
     def get_avatar(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')  # Получаем объект запроса из контекста
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)  # Формируем полный URL
-        return None  # Если изображение отсутствует, возвращаем None
+        # Базу ссылок резолвер вычисляет один раз на запрос; без запроса и CDN ссылки нет
+        return media_resolver(self.context).absolute_url(obj.avatar.name, obj.avatar.storage)
 
 
 # Сериализатор для обновления пользователя
@@ -52,11 +51,8 @@ class CustomUserUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def get_avatar(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')  # Получаем объект запроса из контекста
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)  # Формируем полный URL
-        return None  # Если изображение отсутствует, возвращаем None
+        # Базу ссылок резолвер вычисляет один раз на запрос; без запроса и CDN ссылки нет
+        return media_resolver(self.context).absolute_url(obj.avatar.name, obj.avatar.storage)
 
     def validate_avatar(self, value):
         max_size_mb = 1
@@ -0,0 +1,9 @@
+from django.core.management import call_command
+
+from jobs.registry import task
+
+
+@task('users.flush_expired_tokens')
+def flush_expired_tokens():
+    """Удаляет просроченные записи чёрного списка JWT (outstanding/blacklisted tokens)."""
+    call_command('flushexpiredtokens', verbosity=0)
@@ -267,3 +267,19 @@ def test_user_profile_valid_token(api_client, get_user_token, create_user):
     api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_user_token}")
     response = api_client.post(url, format="json")
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("with_request", [False, True])
+def test_user_projection_matches_serializer(create_user, with_request):
+    """Проекция пользователей совпадает с ответом `CustomUserSerializer` байт в байт."""
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+    from users.projections import project_users, user_values
+    from users.serializers import CustomUserSerializer
+
+    CustomUser.objects.filter(pk=create_user.pk).update(avatar="avatars/user.png")
+    request = APIRequestFactory().post("/api/v1/users/list/") if with_request else None
+    queryset = CustomUser.objects.order_by('-date_joined', '-id')
+    expected = CustomUserSerializer(queryset, many=True, context={"request": request}).data
+    assert JSONRenderer().render(project_users(user_values(queryset), request)) == JSONRenderer().render(expected)
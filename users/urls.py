@@ -21,7 +21,7 @@ from users.views import (
     UserCreateAPIView,
     UserUpdateAPIView,
     UserPartialUpdateAPIView,
-    UserDeleteAPIView, UserProfileView,
+    UserDeleteAPIView, UserProfileView, UserFollowAPIView,
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
@@ -34,6 +34,8 @@ urlpatterns = [
     path('api/v1/users/partial-update/', UserPartialUpdateAPIView.as_view(), name='user-partial-update'),
     path('api/v1/users/delete/', UserDeleteAPIView.as_view(), name='user-delete'),
 
+    path('api/v1/users/follow/', UserFollowAPIView.as_view(), name='user-follow'),
+
     # Профиль пользователя
     path('api/v1/my_profile/', UserProfileView.as_view(), name='user-profile'),
 
@@ -1,12 +1,15 @@
+import uuid
+
 import sentry_sdk
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from utils.CustomLimitOffsetPagination import CustomLimitOffsetPagination
+from utils.KeysetPagination import get_pagination
 from django.shortcuts import get_object_or_404
 from .models import CustomUser
+from .projections import project_users, user_values
 from .serializers import CustomUserSerializer, CustomUserCreateSerializer, CustomUserUpdateSerializer
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -22,7 +25,7 @@ class UserListAPIView(APIView):
         operation_description=(
                 "Возвращает список всех пользователей с возможностью фильтрации по email.\n\n"
                 "- Поддерживает фильтрацию через поле `email`.\n"
-                "- Поддерживает пагинацию через параметры `limit` и `offset`.\n"
+                "- Поддерживает пагинацию через параметры `limit` и `offset` или курсор `cursor`.\n"
                 "- Требуется аутентификация администратора через JWT."
         ),
         request_body=openapi.Schema(
@@ -33,6 +36,11 @@ class UserListAPIView(APIView):
                 'limit': openapi.Schema(type=openapi.TYPE_INTEGER,
                                         description="Максимальное количество записей на странице", example=10),
                 'offset': openapi.Schema(type=openapi.TYPE_INTEGER, description="Смещение для пагинации", example=0),
+                'cursor': openapi.Schema(type=openapi.TYPE_STRING,
+                                         description="Курсор страницы; пустая строка включает курсорную пагинацию",
+                                         example=""),
+                'with_count': openapi.Schema(type=openapi.TYPE_BOOLEAN,
+                                             description="Возвращать ли общее количество `count`", example=True),
             }
         ),
         responses={
@@ -116,10 +124,12 @@ class UserListAPIView(APIView):
         email = request.data.get('email')
         if email:
             queryset = queryset.filter(email__icontains=email)
-        paginator = CustomLimitOffsetPagination()
-        page = paginator.paginate_queryset(queryset, request)
-        serializer = CustomUserSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        ordering = ('-date_joined', '-id')
+        queryset = queryset.order_by(*ordering)
+        paginator = get_pagination(request, ordering=ordering)
+        page = paginator.paginate_queryset(user_values(queryset, ordering), request)
+        # Как и прежний CustomUserSerializer без контекста, ссылки на аватары не строятся
+        return paginator.get_paginated_response(project_users(page))
 
 
 class UserDetailAPIView(APIView):
@@ -717,3 +727,79 @@ class UserProfileView(APIView):
     def post(self, request):
         serializer = CustomUserSerializer(request.user, context={'request': request})
         return Response(serializer.data)  # Логируем ошибку
+
+
+class UserFollowAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @swagger_auto_schema(
+        tags=['Пользователи'],
+        operation_summary="Подписка на автора / отписка",
+        operation_description=(
+                "Подписывает текущего пользователя на автора миксов или отписывает, если подписка уже есть.\n\n"
+                "- Требуется передать `author_id` в теле запроса.\n"
+                "- Миксы автора появляются в ленте подписок (`/api/v1/user/timeline/`) в течение нескольких секунд.\n"
+                "- Требуется аутентификация через JWT."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['author_id'],
+            properties={
+                "author_id": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID,
+                                            description="ID автора", example="82b74c74-2399-405a-83af-26761b6fcd5b"),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Подписка изменена",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "status": openapi.Schema(type=openapi.TYPE_STRING, example="ok"),
+                        "code": openapi.Schema(type=openapi.TYPE_INTEGER, example=200),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING, example="Подписка оформлена"),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "action": openapi.Schema(type=openapi.TYPE_STRING, example="followed"),
+                                "followers_count": openapi.Schema(type=openapi.TYPE_INTEGER, example=12),
+                            }
+                        ),
+                    }
+                )
+            ),
+            400: openapi.Response(description="Ошибка: `author_id` не указан или совпадает с текущим пользователем"),
+            401: openapi.Response(description="Ошибка: не авторизован"),
+            404: openapi.Response(description="Ошибка: автор не найден"),
+        }
+    )
+    def post(self, request):
+        author_id = request.data.get('author_id')
+        if not author_id:
+            return Response({"status": "bad", "code": 400, "message": "Поле 'author_id' обязательно", "data": None},
+                            status=400)
+        try:
+            author_id = uuid.UUID(str(author_id))
+        except ValueError:
+            author_id = None
+        author = CustomUser.objects.filter(pk=author_id).first() if author_id else None
+        if author is None:
+            return Response({"status": "bad", "code": 404, "message": "Автор не найден", "data": None}, status=404)
+        if author.pk == request.user.pk:
+            return Response({"status": "bad", "code": 400, "message": "Нельзя подписаться на себя", "data": None},
+                            status=400)
+
+        # Методы модели меняют подписку и счётчик подписчиков в одной транзакции
+        if request.user.unfollow(author):
+            action, message = "unfollowed", "Подписка отменена"
+        else:
+            request.user.follow(author)
+            action, message = "followed", "Подписка оформлена"
+        followers_count = CustomUser.objects.filter(pk=author.pk).values_list('followers_count', flat=True).get()
+        return Response({
+            "status": "ok",
+            "code": 200,
+            "message": message,
+            "data": {"action": action, "followers_count": followers_count}
+        }, status=200)
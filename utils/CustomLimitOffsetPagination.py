@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 
@@ -21,12 +23,48 @@ class CustomLimitOffsetPagination(LimitOffsetPagination):
         if self.limit > self.max_limit:
             self.limit = self.max_limit
 
-        self.count = queryset.count()
         self.request = request
-        return list(queryset[self.offset:self.offset + self.limit])
+        # Берём на одну строку больше, чтобы узнать о следующей странице без COUNT(*)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        if not self.wants_count(request):
+            self.count = None
+        elif not self.has_next and (rows or self.offset == 0):
+            # Последняя страница: итог известен без отдельного запроса
+            self.count = self.offset + len(rows)
+        else:
+            self.count = self.get_count(queryset)
+        return rows
+
+    @staticmethod
+    def wants_count(request):
+        """Клиент может отказаться от итогового количества, передав `with_count: false`."""
+        value = request.data.get('with_count', True)
+        if isinstance(value, str):
+            return value.lower() not in ('false', '0', 'no')
+        return bool(value)
+
+    def get_count(self, queryset):
+        """Точный COUNT(*) для отфильтрованных выборок, кэшированный — для полных таблиц.
+
+        Полная таблица считается не чаще одного раза за `PAGINATION_COUNT_CACHE_TTL` секунд,
+        у последовательности в памяти берётся длина."""
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        ttl = settings.PAGINATION_COUNT_CACHE_TTL
+        if not ttl or queryset.query.has_filters():
+            return queryset.count()
+        key = f'pagination:count:{queryset.model._meta.label_lower}'
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, ttl)
+        return count
 
     def get_paginated_response(self, data):
-        next_offset = self.offset + self.limit if (self.offset + self.limit) < self.count else None
+        next_offset = self.offset + self.limit if self.has_next else None
         previous_offset = self.offset - self.limit if (self.offset - self.limit) >= 0 else None
 
         return Response({
@@ -35,4 +73,3 @@ class CustomLimitOffsetPagination(LimitOffsetPagination):
             "previous": previous_offset,
             "results": data
         })
-
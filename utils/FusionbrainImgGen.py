@@ -1,28 +1,165 @@
+import asyncio
+import base64
 import json
 import os
+import random
+import threading
 import time
-import base64
+
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class Text2ImageError(Exception):
+    """Fusionbrain не ответил или ответил ошибкой."""
+
+
+class CircuitOpenError(Text2ImageError):
+    """Запрос не отправлен: после серии ошибок Fusionbrain временно считается недоступным."""
+
+
+class CircuitBreaker:
+    """Размыкатель: после `failure_threshold` ошибок подряд запросы не отправляются
+    `reset_timeout` секунд, затем пропускается один пробный запрос."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Сколько секунд размыкатель ещё будет открыт (0 — запросы разрешены)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            # Полуоткрытое состояние: один пробный запрос
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial = False
+
 
 class Text2ImageAPI:
-    def __init__(self, url, api_key, secret_key):
+    """Клиент Fusionbrain с постоянным пулом соединений.
+
+    Запросы ограничены таймаутами, временные ошибки повторяются с
+    экспоненциальной задержкой и случайным разбросом, серия ошибок размыкает
+    `breaker`. Идентификатор модели запрашивается один раз. Методы с
+    префиксом `a` — асинхронные обёртки для запуска многих генераций из
+    одного цикла событий."""
+
+    def __init__(self, url, api_key, secret_key, timeout=(3.05, 30), retries=3, backoff=0.5, max_backoff=8,
+                 pool_size=10, breaker=None):
         self.URL = url
         self.AUTH_HEADERS = {
             'X-Key': f'Key {api_key}',
             'X-Secret': f'Secret {secret_key}',
         }
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self.session.headers.update(self.AUTH_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._model_id = None
+        self._model_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
 
-    def get_model(self):
-        response = requests.get(self.URL + 'key/api/v1/models',
-                                headers=self.AUTH_HEADERS)
-        data = response.json()
-        return data[0]['id']
+    def __enter__(self):
+        return self
 
-    def generate(self, prompt, model, images=1, width=1024, height=1024, style=3):
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _delay(self, attempt, response=None):
+        """Задержка перед повтором: «полный разброс» от нуля до удвоенной задержки, не больше `max_backoff`."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, int(retry_after)))
+        return delay
+
+    def _request(self, method, path, idempotent=True, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Fusionbrain недоступен, повтор через {self.breaker.remaining():.0f} с")
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self.session.request(method, self.URL + path, timeout=self.timeout, **kwargs)
+                error = None if response.status_code not in RETRY_STATUSES else f"HTTP {response.status_code}"
+            except requests.ConnectTimeout as exc:
+                error = exc
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                # Запрос мог дойти: неидемпотентный запуск генерации не повторяем, чтобы не тратить квоту
+                error = exc
+                if not idempotent:
+                    self.breaker.record_failure()
+                    raise Text2ImageError(str(exc)) from exc
+            except Exception:
+                # Любая другая ошибка тоже должна закрыть пробный запрос, иначе размыкатель не замкнётся
+                self.breaker.record_failure()
+                raise
+            if error is None:
+                break
+            retryable = idempotent or response is None or response.status_code in (429, 503)
+            if attempt >= self.retries or not retryable:
+                self.breaker.record_failure()
+                raise Text2ImageError(str(error))
+            time.sleep(self._delay(attempt, response))
+            attempt += 1
+
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise Text2ImageError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise Text2ImageError("Некорректный ответ Fusionbrain") from exc
+
+    def get_model(self, refresh=False):
+        with self._model_lock:
+            if self._model_id is None or refresh:
+                data = self._request('GET', 'key/api/v1/models')
+                self._model_id = data[0]['id']
+            return self._model_id
+
+    def generate(self, prompt, model=None, images=1, width=1024, height=1024, style=3):
 
         styles = ["KANDINSKY", "UHD", "ANIME", "DEFAULT"]
 
@@ -37,25 +174,69 @@ class Text2ImageAPI:
             }
         }
         data = {
-            'model_id': (None, model),
+            'model_id': (None, model if model is not None else self.get_model()),
             'params': (None, json.dumps(params), 'application/json')
         }
-        response = requests.post(self.URL + 'key/api/v1/text2image/run',
-                                 headers=self.AUTH_HEADERS, files=data)
-        print(response)
-        data = response.json()
+        data = self._request('POST', 'key/api/v1/text2image/run', idempotent=False, files=data)
         return data['uuid']
 
+    def check_status(self, request_id):
+        """Один запрос статуса генерации, без ожидания: словарь ответа Fusionbrain."""
+        return self._request('GET', 'key/api/v1/text2image/status/' + request_id)
+
     def check_generation(self, request_id, attempts=10, delay=10):
         while attempts > 0:
-            response = requests.get(self.URL + 'key/api/v1/text2image/status/' +
-                                    request_id, headers=self.AUTH_HEADERS)
-            data = response.json()
+            data = self.check_status(request_id)
             if data['status'] == 'DONE':
                 return data['images']
             attempts -= 1
             time.sleep(delay)
 
+    # Асинхронный интерфейс: блокирующие запросы идут в потоках, соединения — из общего пула
+
+    async def agenerate(self, prompt, model=None, **params):
+        return await asyncio.to_thread(self.generate, prompt, model, **params)
+
+    async def acheck_status(self, request_id):
+        return await asyncio.to_thread(self.check_status, request_id)
+
+    async def await_generation(self, request_id, initial_delay=2, max_delay=30, timeout=300):
+        """Ждёт генерацию, опрашивая статус с удвоением задержки; возвращает список изображений."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = initial_delay
+        while True:
+            data = await self.acheck_status(request_id)
+            if data['status'] == 'DONE':
+                if data.get('censored') or not data.get('images'):
+                    raise Text2ImageError("Fusionbrain не вернул изображение")
+                return data['images']
+            if data['status'] == 'FAIL':
+                raise Text2ImageError(data.get('errorDescription') or "Генерация не удалась")
+            if loop.time() + delay > deadline:
+                raise Text2ImageError("Генерация не завершилась вовремя")
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+            delay = min(max_delay, delay * 2)
+
+    async def agenerate_image(self, prompt, **params):
+        """Полный цикл одной генерации: запуск и ожидание; возвращает base64 первого изображения."""
+        poll = {key: params.pop(key) for key in ('initial_delay', 'max_delay', 'timeout') if key in params}
+        request_id = await self.agenerate(prompt, **params)
+        images = await self.await_generation(request_id, **poll)
+        return images[0]
+
+    async def generate_many(self, prompts, concurrency=4, **params):
+        """Генерирует изображения по всем запросам, не больше `concurrency` одновременно.
+
+        Возвращает список в порядке запросов: base64 изображения или исключение."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(prompt):
+            async with semaphore:
+                return await self.agenerate_image(prompt, **params)
+
+        return await asyncio.gather(*(one(prompt) for prompt in prompts), return_exceptions=True)
+
 
 if __name__ == '__main__':
     api = Text2ImageAPI(
@@ -63,8 +244,7 @@ if __name__ == '__main__':
         os.getenv('FUSSIONBRAIN_API_KEY'),
         os.getenv('FUSSIONBRAIN_SECRET_KEY')
     )
-    model_id = api.get_model()
-    uuid = api.generate("Sun in sky", model_id)
+    uuid = api.generate("Sun in sky")
     images = api.check_generation(uuid)
 
     image_base64 = images[0]
@@ -0,0 +1,142 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from bisect import bisect_left, bisect_right
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from utils.CustomLimitOffsetPagination import CustomLimitOffsetPagination
+
+
+class KeysetPagination:
+    """Курсорная (keyset) пагинация по стабильному порядку.
+
+    Вместо OFFSET следующая страница выбирается условием «строго после
+    последней строки» по полям `ordering`, поэтому стоимость страницы не
+    зависит от глубины прокрутки. Последнее поле порядка должно быть
+    уникальным (обычно `id`), а все поля — присутствовать в строках выборки
+    (как поля модели, аннотации или ключи словаря для `values()`).
+
+    Вместо выборки можно передать уже упорядоченную последовательность строк
+    (например, выдачу индекса в памяти): страница тогда находится бинарным
+    поиском. Поля с обратным порядком у такой последовательности — числовые."""
+
+    max_limit = 100
+    default_limit = 10
+    invalid_cursor_message = "Некорректный курсор"
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            self.limit = min(int(request.data.get('limit', self.default_limit)), self.max_limit)
+        except (ValueError, TypeError):
+            self.limit = self.default_limit
+        self.request = request
+
+        cursor = request.data.get('cursor')
+        values, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+
+        if hasattr(queryset, 'order_by'):
+            ordering = self.ordering if not backwards else tuple(self._reverse(name) for name in self.ordering)
+            queryset = queryset.order_by(*ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after(ordering, values))
+            rows = list(queryset[:self.limit + 1])
+        else:
+            rows = self._sequence_page(queryset, values, backwards)
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if backwards:
+            rows.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                self.next_cursor = self.encode_cursor(rows[-1], backwards=False)
+            if (has_more and backwards) or (values is not None and not backwards):
+                self.previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.next_cursor,
+            "previous": self.previous_cursor,
+            "results": data
+        })
+
+    def _sort_key(self, values):
+        return tuple(-value if name.startswith('-') else value for name, value in zip(self.ordering, values))
+
+    def _row_key(self, row):
+        return self._sort_key([self._row_value(row, field) for field in self.fields])
+
+    def _sequence_page(self, rows, values, backwards):
+        """Строки страницы из упорядоченной последовательности, в том же виде, что и из выборки."""
+        if not backwards:
+            start = 0 if values is None else bisect_right(rows, self._sort_key(values), key=self._row_key)
+            return list(rows[start:start + self.limit + 1])
+        end = bisect_left(rows, self._sort_key(values), key=self._row_key)
+        page = list(rows[max(0, end - self.limit - 1):end])
+        page.reverse()
+        return page
+
+    @staticmethod
+    def _reverse(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _after(self, ordering, values):
+        """Строит условие «строка идёт после values» для порядка ordering."""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _row_value(self, row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def encode_cursor(self, row, backwards):
+        payload = {
+            "v": [self._row_value(row, field) for field in self.fields],
+            "b": backwards,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(str(cursor) + '=' * (-len(str(cursor)) % 4))
+            payload = json.loads(raw)
+            values, backwards = payload['v'], bool(payload['b'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values, backwards
+
+
+def get_pagination(request, ordering):
+    """Выбирает пагинатор по телу запроса.
+
+    Наличие ключа `cursor` (в том числе пустого — для первой страницы)
+    включает курсорную пагинацию, иначе используется прежний контракт
+    `limit`/`offset`."""
+    if 'cursor' in request.data:
+        return KeysetPagination(ordering)
+    return CustomLimitOffsetPagination()
@@ -0,0 +1,177 @@
+"""Локальная подделка API Fusionbrain для разработки и тестов без сети.
+
+Повторяет три метода, которыми пользуется `Text2ImageAPI`: список моделей,
+запуск генерации и статус. Генерация «готовится» `polls_until_done` опросов
+и возвращает однотонный PNG, цвет которого зависит от запроса.
+
+Запуск вручную: `python -m utils.fusionbrain_fake 8089` и
+`FUSSIONBRAIN_API_URL=http://127.0.0.1:8089/`."""
+import base64
+import hashlib
+import io
+import json
+import sys
+import threading
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+MODELS_PATH = '/key/api/v1/models'
+RUN_PATH = '/key/api/v1/text2image/run'
+STATUS_PATH = '/key/api/v1/text2image/status/'
+
+
+def fake_image(prompt, size=(64, 36)):
+    """Однотонный PNG в base64; цвет — первые байты хэша запроса."""
+    color = tuple(hashlib.sha256(prompt.encode('utf-8')).digest()[:3])
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def _multipart_fields(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeFusionbrain/1.0'
+    # Keep-alive, как у настоящего API: клиент должен переиспользовать соединения
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.fake.connection_opened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        injected = self.server.fake.injected_error()
+        if injected is not None:
+            if self.command == 'POST':
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._send(injected, {'error': 'Injected error'})
+            return False
+        if self.headers.get('X-Key', '').startswith('Key ') and self.headers.get('X-Secret', '').startswith('Secret '):
+            return True
+        self._send(401, {'error': 'Unauthorized'})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        fake = self.server.fake
+        if self.path == MODELS_PATH:
+            self._send(200, [{'id': fake.model_id, 'name': 'Kandinsky', 'version': 3.0, 'type': 'TEXT2IMAGE'}])
+        elif self.path.startswith(STATUS_PATH):
+            self._send(*fake.status(self.path[len(STATUS_PATH):]))
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path != RUN_PATH:
+            self._send(404, {'error': 'Not found'})
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        fields = _multipart_fields(self.headers.get('Content-Type', ''), body)
+        params = json.loads(fields.get('params') or b'{}')
+        prompt = params.get('generateParams', {}).get('query', '')
+        self._send(201, self.server.fake.run(prompt))
+
+
+class FakeFusionbrainServer:
+    """HTTP-сервер в фоновом потоке: `with FakeFusionbrainServer() as fake: fake.url`."""
+
+    model_id = 4
+
+    def __init__(self, polls_until_done=1, fail_prompts=(), host='127.0.0.1', port=0):
+        self.polls_until_done = polls_until_done
+        self.fail_prompts = set(fail_prompts)
+        self.prompts = []  # запросы всех запущенных генераций по порядку
+        self.connections = 0  # открытых клиентами TCP-соединений
+        self._errors = []
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def fail_next(self, status=503, times=1):
+        """Следующие `times` запросов получат ответ `status`."""
+        with self._lock:
+            self._errors.extend([status] * times)
+
+    def injected_error(self):
+        with self._lock:
+            return self._errors.pop(0) if self._errors else None
+
+    def run(self, prompt):
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self.prompts.append(prompt)
+            self._jobs[job_id] = {'prompt': prompt, 'polls': 0}
+        return {'uuid': job_id, 'status': 'INITIAL'}
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return 404, {'error': 'Not found'}
+            job['polls'] += 1
+            polls = job['polls']
+        if polls <= self.polls_until_done:
+            return 200, {'uuid': job_id, 'status': 'PROCESSING'}
+        if job['prompt'] in self.fail_prompts:
+            return 200, {'uuid': job_id, 'status': 'FAIL', 'errorDescription': 'Генерация не удалась'}
+        return 200, {'uuid': job_id, 'status': 'DONE', 'images': [fake_image(job['prompt'])], 'censored': False}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-fusionbrain', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    server = FakeFusionbrainServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8089)
+    print(f"Fake Fusionbrain: {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server._httpd.server_close()
@@ -0,0 +1,209 @@
+"""Уменьшенные копии загруженных изображений (миниатюры и WebP) и их заглушки.
+
+Копии строятся после сохранения модели в пуле процессов, вне потока запроса,
+и кладутся рядом с оригиналом под детерминированными именами:
+`tobacco.jpg` -> `tobacco__thumb.webp`, `tobacco__thumb.jpg`, `tobacco__large.webp`, ...
+Повторная сборка перезаписывает те же файлы."""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from utils.image_processing import process_image
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_SEPARATOR = '__'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Имена копий, про которые известно, что они уже лежат в хранилище
+_ready = set()
+# Имена копий, которых не было в хранилище: имя -> момент (`time.monotonic()`), до которого ответу верим
+_missing = {}
+# Файлы, копии которых построить не удалось: повторно они не ставятся, пока файл не сменится
+_failed = set()
+_READY_CACHE_LIMIT = 50000
+
+
+def derivative_name(name, variant, fmt='webp'):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}{DERIVATIVE_SEPARATOR}{variant}.{fmt}'
+
+
+def is_derivative(name):
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return any(stem.endswith(DERIVATIVE_SEPARATOR + variant) for variant in settings.IMAGE_DERIVATIVE_SIZES)
+
+
+def _mark_ready(name):
+    if len(_ready) >= _READY_CACHE_LIMIT:
+        _ready.clear()
+    _ready.add(name)
+    _missing.pop(name, None)
+
+
+def _mark_missing(name):
+    if len(_missing) >= _READY_CACHE_LIMIT:
+        _missing.clear()
+    _missing[name] = time.monotonic() + settings.IMAGE_DERIVATIVE_MISSING_TTL
+
+
+def _mark_failed(name):
+    if len(_failed) >= _READY_CACHE_LIMIT:
+        _failed.clear()
+    _failed.add(name)
+
+
+def clear_ready_cache():
+    _ready.clear()
+    _missing.clear()
+    _failed.clear()
+
+
+def derivative_ready(storage, name):
+    """Есть ли копия в хранилище.
+
+    Ответ запоминается в процессе: положительный — насовсем, отрицательный —
+    на `IMAGE_DERIVATIVE_MISSING_TTL` секунд. Поэтому строки списка без копии
+    не проверяют хранилище на каждом запросе, а копия, построенная в другом
+    процессе, подхватывается не позже чем через этот срок."""
+    if name in _ready:
+        return True
+    expires = _missing.get(name)
+    if expires is not None and expires > time.monotonic():
+        return False
+    if storage.exists(name):
+        _mark_ready(name)
+        return True
+    _mark_missing(name)
+    return False
+
+
+def save_derivatives(storage, name, derivatives):
+    for (variant, fmt), content in derivatives.items():
+        target = derivative_name(name, variant, fmt)
+        # Имя должно остаться детерминированным: хранилище не должно добавлять суффикс
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(content))
+        _mark_ready(target)
+
+
+def save_placeholder(target, name, placeholder):
+    """Записывает заглушку в строки модели, у которых всё ещё тот же файл.
+
+    `target` — `(модель, pk, поле файла, (поле blurhash, поле цвета))`;
+    `pk = None` — во все строки с этим файлом. `update()` не вызывает
+    сигналов, поэтому повторной обработки не будет."""
+    model, pk, field_name, (blurhash_field, color_field) = target
+    blurhash, color = placeholder
+    queryset = model._default_manager.filter(**{field_name: name})
+    if pk is not None:
+        queryset = queryset.filter(pk=pk)
+    queryset.update(**{blurhash_field: blurhash, color_field: color})
+
+
+def store_results(storage, name, result, target=None):
+    derivatives, placeholder = result
+    if derivatives:
+        save_derivatives(storage, name, derivatives)
+    if placeholder and target is not None:
+        save_placeholder(target, name, placeholder)
+
+
+def _task_args(with_derivatives, with_placeholder):
+    return (settings.IMAGE_DERIVATIVE_SIZES if with_derivatives else None,
+            settings.IMAGE_DERIVATIVE_QUALITY,
+            settings.IMAGE_PLACEHOLDER_COMPONENTS if with_placeholder else None)
+
+
+def build_derivatives(storage, name, target=None, with_derivatives=True):
+    """Синхронно строит и сохраняет копии файла `name` (и заглушку, если задан `target`)."""
+    with storage.open(name, 'rb') as source:
+        data = source.read()
+    store_results(storage, name, process_image(data, *_task_args(with_derivatives, target is not None)), target)
+
+
+def _build_logged(storage, name, with_derivatives, target=None):
+    try:
+        build_derivatives(storage, name, target, with_derivatives)
+    except Exception:
+        _mark_failed(name)
+        logger.exception("Не удалось построить копии изображения %s", name)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS)
+        return _executor
+
+
+def _submit(storage, name, with_derivatives, target=None):
+    try:
+        with storage.open(name, 'rb') as source:
+            data = source.read()
+    except OSError:
+        _mark_failed(name)
+        logger.exception("Не удалось прочитать изображение %s", name)
+        return
+    future = get_executor().submit(process_image, data, *_task_args(with_derivatives, target is not None))
+
+    def done(result):
+        try:
+            store_results(storage, name, result.result(), target)
+        except Exception:
+            _mark_failed(name)
+            logger.exception("Не удалось построить копии изображения %s", name)
+        finally:
+            # Колбэк выполняется в служебном потоке пула: его соединение с БД не должно висеть
+            if target is not None:
+                connection.close()
+
+    future.add_done_callback(done)
+    return future
+
+
+def schedule_derivatives(field_file, placeholder_fields=None):
+    """Ставит построение копий файла в пул процессов после коммита транзакции.
+
+    Загруженный файл получает новое имя, поэтому уже построенные копии
+    означают, что файл не менялся. `placeholder_fields` — поля модели для
+    BlurHash и преобладающего цвета: они заполняются вместе с копиями и для
+    старых файлов, у которых заглушки ещё нет. Файл, копии которого в этом
+    процессе построить не удалось, повторно не ставится. При
+    `IMAGE_DERIVATIVES_ASYNC = False` всё строится в текущем потоке, при
+    `IMAGE_DERIVATIVES_BACKEND = 'jobs'` — задачей очереди `run_jobs`."""
+    if not field_file or is_derivative(field_file.name) or field_file.name in _failed:
+        return
+    storage, name = field_file.storage, field_file.name
+    first_variant = next(iter(settings.IMAGE_DERIVATIVE_SIZES))
+    with_derivatives = not derivative_ready(storage, derivative_name(name, first_variant))
+    target = None
+    if placeholder_fields and (with_derivatives or not getattr(field_file.instance, placeholder_fields[0])):
+        instance = field_file.instance
+        target = (type(instance), instance.pk, field_file.field.attname, tuple(placeholder_fields))
+    if not with_derivatives and target is None:
+        return
+    if not settings.IMAGE_DERIVATIVES_ASYNC:
+        transaction.on_commit(lambda: _build_logged(storage, name, with_derivatives, target))
+        return
+    if settings.IMAGE_DERIVATIVES_BACKEND == 'jobs':
+        # Строка задачи пишется в той же транзакции, что и модель: on_commit не нужен
+        from jobs.registry import enqueue
+
+        field = field_file.field
+        enqueue('main.build_image', [field.model._meta.label, field.attname, name], {
+            'pk': str(target[1]) if target else None,
+            'placeholder_fields': list(placeholder_fields) if target else None,
+            'with_derivatives': with_derivatives,
+        })
+        return
+    transaction.on_commit(lambda: _submit(storage, name, with_derivatives, target))
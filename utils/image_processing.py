@@ -0,0 +1,133 @@
+"""Построение уменьшенных копий и заглушек изображений на Pillow и NumPy.
+
+Модуль не зависит от Django: функции выполняются в отдельных процессах
+пула и получают/возвращают только байты."""
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+def _save(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_derivatives(data, sizes, quality=80):
+    """Уменьшенные копии изображения.
+
+    `sizes` — `{вариант: максимальная сторона}`. Для каждого варианта
+    возвращаются WebP и копия в исходном семействе форматов (PNG для
+    изображений с прозрачностью, иначе JPEG): `{(вариант, формат): байты}`.
+    Изображения меньше варианта не увеличиваются."""
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        has_alpha = source.mode in ('RGBA', 'LA', 'PA') or (source.mode == 'P' and 'transparency' in source.info)
+        source = source.convert('RGBA' if has_alpha else 'RGB')
+        fallback = 'png' if has_alpha else 'jpg'
+
+        result = {}
+        for variant, max_side in sizes.items():
+            image = source.copy()
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            result[(variant, 'webp')] = _save(image, 'webp', quality)
+            result[(variant, fallback)] = _save(image, fallback, quality)
+        return result
+
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+# Сторона уменьшенной копии, по которой считаются заглушка и цвет
+PLACEHOLDER_SAMPLE_SIDE = 64
+
+
+def _base83(value, length):
+    return ''.join(BASE83[value // 83 ** (length - 1 - i) % 83] for i in range(length))
+
+
+def _srgb_to_linear(values):
+    values = values / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value):
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sample(data):
+    """Уменьшенная копия: RGB-пиксели (h, w, 3) и маска непрозрачных пикселей."""
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source).convert('RGBA')
+        image.thumbnail((PLACEHOLDER_SAMPLE_SIDE, PLACEHOLDER_SAMPLE_SIDE), Image.Resampling.BILINEAR)
+    rgba = np.asarray(image, dtype=np.uint8)
+    alpha = rgba[..., 3:4].astype(np.float64) / 255.0
+    # Прозрачные области заглушки показываются на белом фоне
+    rgb = rgba[..., :3] * alpha + 255.0 * (1.0 - alpha)
+    return rgb, rgba[..., 3] >= 128
+
+
+def blurhash_encode(rgb, components=(4, 3)):
+    """BlurHash (https://blurha.sh) для пикселей `(h, w, 3)` в sRGB.
+
+    Все коэффициенты косинусного разложения считаются одним матричным
+    произведением вместо цикла по пикселям."""
+    cx, cy = components
+    height, width, _ = rgb.shape
+    linear = _srgb_to_linear(rgb.astype(np.float64))
+    basis_x = np.cos(np.pi * np.outer(np.arange(cx), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(cy), np.arange(height)) / height)
+    # factors[j, i, c] = сумма по пикселям basis_y[j, y] * basis_x[i, x] * linear[y, x, c]
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(cx * cy, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((cx - 1) + (cy - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, int(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1
+    result += _base83(quantised_max, 1)
+    r, g, b = (_linear_to_srgb(value) for value in dc)
+    result += _base83((r << 16) + (g << 8) + b, 4)
+
+    scaled = np.sign(ac / maximum) * np.abs(ac / maximum) ** 0.5
+    quantised = np.clip(np.floor(scaled * 9 + 9.5), 0, 18).astype(np.int64)
+    for qr, qg, qb in quantised:
+        result += _base83(int(qr) * 19 * 19 + int(qg) * 19 + int(qb), 2)
+    return result
+
+
+def dominant_color(rgb, mask=None):
+    """Преобладающий цвет `#rrggbb`: самая частая ячейка палитры 16×16×16, усреднённая по её пикселям."""
+    pixels = rgb.reshape(-1, 3)
+    if mask is not None and mask.any():
+        pixels = pixels[mask.reshape(-1)]
+    levels = pixels.astype(np.int64) >> 4
+    buckets = (levels[:, 0] << 8) | (levels[:, 1] << 4) | levels[:, 2]
+    top = np.bincount(buckets, minlength=4096).argmax()
+    r, g, b = np.rint(pixels[buckets == top].mean(axis=0)).astype(int)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def compute_placeholder(data, components=(4, 3)):
+    """Заглушка изображения для клиентов: `(blurhash, преобладающий цвет)`."""
+    rgb, mask = _sample(data)
+    return blurhash_encode(rgb, components), dominant_color(rgb, mask)
+
+
+def process_image(data, sizes=None, quality=80, components=None):
+    """Задача пула: копии (если заданы `sizes`) и заглушка (если заданы `components`) за одно чтение файла."""
+    derivatives = render_derivatives(data, sizes, quality) if sizes else None
+    placeholder = compute_placeholder(data, components) if components else None
+    return derivatives, placeholder
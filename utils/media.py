@@ -0,0 +1,120 @@
+"""Ссылки на медиафайлы в ответах API.
+
+`MediaURLResolver` вычисляет абсолютную базу медиа один раз на запрос (или
+берёт её из `MEDIA_CDN_ORIGIN`) и дальше только приклеивает к ней имя файла.
+Это единственное место, где строятся ссылки на файлы: CDN, хэшированные
+имена и т.п. подключаются здесь."""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from utils.image_derivatives import derivative_name, derivative_ready
+
+
+class MediaURLResolver:
+    """Строит ссылки на файлы хранилища для одного запроса.
+
+    Без CDN и для файловой системы ссылки совпадают с
+    `request.build_absolute_uri(storage.url(name))`; для прочих хранилищ
+    используется их собственный `url()`."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self._base = None
+
+    @classmethod
+    def for_request(cls, request):
+        """Резолвер, общий для всех сериализаторов и проекций запроса."""
+        if request is None:
+            return cls()
+        resolver = getattr(request, '_media_url_resolver', None)
+        if resolver is None:
+            resolver = cls(request)
+            request._media_url_resolver = resolver
+        return resolver
+
+    @property
+    def base(self):
+        """Абсолютный адрес MEDIA_URL или None, если его не из чего построить."""
+        if self._base is None:
+            origin = settings.MEDIA_CDN_ORIGIN
+            if origin:
+                self._base = origin.rstrip('/') + '/' + settings.MEDIA_URL.lstrip('/')
+            elif self.request is not None:
+                self._base = self.request.build_absolute_uri(default_storage.base_url)
+        return self._base
+
+    @staticmethod
+    def _is_plain_storage(storage):
+        return isinstance(storage, FileSystemStorage) and storage.base_url == default_storage.base_url
+
+    def url(self, name, storage=None):
+        """Ссылка на файл как у `serializers.ImageField`: абсолютная, а без запроса и CDN — относительная."""
+        if not name:
+            return None
+        storage = storage or default_storage
+        base = self.base
+        if base is None:
+            return storage.url(name)
+        if self._is_plain_storage(storage):
+            return base + filepath_to_uri(name).lstrip('/')
+        url = storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+    def absolute_url(self, name, storage=None):
+        """Только абсолютная ссылка, как у `get_image`/`get_avatar`; без запроса и CDN — None."""
+        if not name or self.base is None:
+            return None
+        return self.url(name, storage)
+
+
+    def variant_url(self, name, variant, storage=None, absolute=False):
+        """Ссылка на уменьшенную WebP-копию; пока копия не построена — на оригинал."""
+        if not name:
+            return None
+        storage = storage or default_storage
+        derived = derivative_name(name, variant)
+        target = derived if derivative_ready(storage, derived) else name
+        return self.absolute_url(target, storage) if absolute else self.url(target, storage)
+
+
+def media_resolver(context):
+    """Резолвер из контекста сериализатора."""
+    return MediaURLResolver.for_request(context.get('request'))
+
+
+class MediaImageField(serializers.ImageField):
+    """`ImageField`, отдающий ссылку через `MediaURLResolver`."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media_resolver(self.context).url(value.name, value.storage)
+
+
+class ImageVariantField(serializers.Field):
+    """Только для чтения: ссылка на вариант изображения из `IMAGE_DERIVATIVE_SIZES`.
+
+    `absolute=True` повторяет поведение `get_image`/`get_avatar`: без запроса и CDN — None."""
+
+    def __init__(self, variant, absolute=False, **kwargs):
+        kwargs['read_only'] = True
+        self.variant = variant
+        self.absolute = absolute
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media_resolver(self.context).variant_url(value.name, self.variant, value.storage, self.absolute)
+
+
+class MediaURLSerializerMixin:
+    """Подставляет `MediaImageField` для всех ImageField модели в `ModelSerializer`."""
+
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
@@ -0,0 +1,42 @@
+"""Общие помощники для проекций — сборки ответов списков из `values()` без сериализаторов.
+
+Каждый помощник повторяет `to_representation` соответствующего поля DRF,
+чтобы ответ проекции совпадал с ответом сериализатора байт в байт."""
+from rest_framework import serializers
+
+from utils.media import MediaURLResolver
+
+_datetime_field = serializers.DateTimeField()
+
+
+def uuid_repr(value):
+    return None if value is None else str(value)
+
+
+def datetime_repr(value):
+    """Как `serializers.DateTimeField`: часовой пояс проекта, ISO 8601, `Z` для UTC."""
+    return None if value is None else _datetime_field.to_representation(value)
+
+
+def file_url(storage, name, request=None):
+    """Как `serializers.ImageField` модели: абсолютный URL при наличии запроса (или CDN), иначе относительный."""
+    return MediaURLResolver.for_request(request).url(name, storage)
+
+
+def absolute_file_url(storage, name, request=None):
+    """Как `get_image`/`get_avatar` сериализаторов: только абсолютный URL, иначе None."""
+    return MediaURLResolver.for_request(request).absolute_url(name, storage)
+
+
+def variant_url(storage, name, variant, request=None, absolute=False):
+    """Как `ImageVariantField`: WebP-копия, если она готова, иначе оригинал."""
+    return MediaURLResolver.for_request(request).variant_url(name, variant, storage, absolute)
+
+
+def storage_of(model, field_name):
+    return model._meta.get_field(field_name).storage
+
+
+def ordering_fields(ordering, fields):
+    """Поля порядка, которых нет среди колонок проекции: они нужны курсорной пагинации."""
+    return tuple(name.lstrip('-') for name in ordering if name.lstrip('-') not in fields)
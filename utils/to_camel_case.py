@@ -1,3 +1,65 @@
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+
 def to_camel_case(snake_str):
     components = snake_str.split('_')
     return components[0] + ''.join(x.title() for x in components[1:])
+
+
+class CamelCaseSerializerMixin:
+    """Собирает представление сразу в итоговом виде.
+
+    Имена ключей (camelCase при `camel_case = True`) вычисляются один раз на
+    класс сериализатора, а не для каждого поля каждой строки. `output_groups`
+    переносит поля во вложенные объекты, например
+    `{'params': {'tobacco_strength': 'strength'}}`; группы идут после остальных ключей."""
+
+    camel_case = True
+    output_groups = {}
+
+    @classmethod
+    def _output_key_map(cls, field_names):
+        """Карта `имя поля -> (группа, ключ)`, общая для всех экземпляров класса."""
+        key_map = cls.__dict__.get('_output_keys')
+        if key_map is None or key_map[0] != field_names:
+            grouped = {
+                field_name: (group, key)
+                for group, keys in cls.output_groups.items()
+                for field_name, key in keys.items()
+            }
+            mapping = {
+                field_name: grouped.get(field_name, (None, to_camel_case(field_name) if cls.camel_case else field_name))
+                for field_name in field_names
+            }
+            key_map = (field_names, mapping)
+            cls._output_keys = key_map
+        return key_map[1]
+
+    def _output_plan(self):
+        """Читаемые поля экземпляра вместе с их группами и ключами."""
+        plan = self.__dict__.get('_output_plan_cache')
+        if plan is None:
+            fields = [field for field in self.fields.values() if not field.write_only]
+            key_map = self._output_key_map(tuple(field.field_name for field in fields))
+            plan = [(field, *key_map[field.field_name]) for field in fields]
+            self._output_plan_cache = plan
+        return plan
+
+    def to_representation(self, instance):
+        ret = {}
+        groups = {group: {} for group in self.output_groups}
+        for field, group, key in self._output_plan():
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            value = None if check_for_none is None else field.to_representation(attribute)
+            if group is None:
+                ret[key] = value
+            else:
+                groups[group][key] = value
+        ret.update(groups)
+        return ret
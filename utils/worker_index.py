@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Все созданные индексы: их модули импортируются при подключении сигналов в `ready()` приложений
+_indexes = []
+
+
+class WorkerIndex:
+    """Структура данных в памяти процесса-воркера.
+
+    Строится лениво при первом обращении (или заранее через `warm()`),
+    дальше поддерживается инкрементально из сигналов моделей. Сигналы
+    приходят только в тот воркер, где произошло изменение, поэтому раз в
+    `rebuild_interval` секунд индекс пересобирается целиком — это ограничивает
+    расхождение между воркерами.
+
+    Если источник данных версионирован (`current_version()`), воркер не
+    чаще раза в `version_check_interval` секунд сверяет версию и при её смене
+    строит новое состояние. Новое состояние после сборки подменяется одной
+    ссылкой, но инкрементальные правки (`update()`) меняют текущее состояние
+    на месте под `_lock`, поэтому читать его нужно через `query()` — под той
+    же блокировкой."""
+
+    # Имя настройки с интервалом полной пересборки в секундах (0 — не пересобирать)
+    rebuild_interval_setting = None
+    # Имя настройки с интервалом проверки версии в секундах
+    version_check_interval_setting = None
+    # Имя настройки-флага: строить индекс при старте воркера (`warm_indexes()`)
+    warm_on_startup_setting = None
+
+    def __init__(self):
+        _indexes.append(self)
+        self._lock = threading.RLock()
+        self._state = None
+        self._built_at = 0.0
+        self._version = None
+        self._checked_at = 0.0
+
+    def build(self):
+        """Строит состояние индекса с нуля."""
+        raise NotImplementedError
+
+    def current_version(self):
+        """Версия источника данных; None — источник не версионирован."""
+        return None
+
+    @property
+    def rebuild_interval(self):
+        if self.rebuild_interval_setting is None:
+            return 0
+        return getattr(settings, self.rebuild_interval_setting, 0)
+
+    @property
+    def version_check_interval(self):
+        if self.version_check_interval_setting is None:
+            return 0
+        return getattr(settings, self.version_check_interval_setting, 0)
+
+    def _is_fresh(self, now):
+        interval = self.rebuild_interval
+        if interval and now - self._built_at > interval:
+            return False
+        return self.version_check_interval_setting is None or now - self._checked_at <= self.version_check_interval
+
+    def get(self):
+        """Возвращает актуальное состояние, при необходимости перестраивая его."""
+        state = self._state
+        if state is not None and self._is_fresh(time.monotonic()):
+            return state
+        with self._lock:
+            now = time.monotonic()
+            if self._state is not None and self._is_fresh(now):
+                return self._state
+            interval = self.rebuild_interval
+            stale = self._state is None or bool(interval and now - self._built_at > interval)
+            version = self.current_version()
+            self._checked_at = now
+            if stale or version != self._version:
+                # Версию читаем до построения: правки во время сборки вызовут ещё одну пересборку
+                state = self.build()
+                self._version = version
+                self._built_at = time.monotonic()
+                self._state = state
+                logger.info("%s построен за %.3f с", type(self).__name__, self._built_at - now)
+            return self._state
+
+    def warm(self):
+        """Строит индекс заранее, например при старте воркера."""
+        try:
+            self.get()
+        except Exception:
+            # Старт воркера не должен падать из-за недоступной БД: индекс построится при первом запросе
+            logger.exception("Не удалось построить %s при старте", type(self).__name__)
+
+    def update(self, func, *args):
+        """Применяет инкрементальное изменение, если индекс уже построен."""
+        with self._lock:
+            if self._state is not None:
+                func(self._state, *args)
+
+    def query(self, func, *args):
+        """Вызывает `func(состояние, *args)` под блокировкой, чтобы не видеть недописанную правку."""
+        state = self.get()
+        with self._lock:
+            return func(state, *args)
+
+    def expire(self):
+        """Заставляет следующее обращение сверить версию, не сбрасывая текущее состояние."""
+        self._checked_at = float('-inf')
+
+    def reset(self):
+        with self._lock:
+            self._state = None
+            self._built_at = 0.0
+            self._version = None
+            self._checked_at = 0.0
+
+
+def warm_indexes():
+    """Строит при старте воркера индексы, у которых включена настройка `warm_on_startup_setting`."""
+    for index in _indexes:
+        if index.warm_on_startup_setting and getattr(settings, index.warm_on_startup_setting, False):
+            index.warm()